@@ -3,162 +3,123 @@ import json
 import sys
 import os
 import time
-import random
-from queue import PriorityQueue
+from collections import deque
 import math
 import networkx as nx
 import io
 import base64
+import urllib.parse
+
+# The shared maze/search modules live at the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from maze_core import MazeGrid, E, W, N, S, grid_of
+from mazegen import generate
+from search_state import SearchState
+from astar import astar_search
+from bidirectional import bidirectional_bfs, bidirectional_astar
+from jps import jump_point_search
+from terrain import dijkstra_search, cheapest_manhattan
+from heuristics import HEURISTICS, DEFAULT_HEURISTIC, table_heuristic, heuristic_factory, heuristic_choice
+from hierarchy import build_hierarchy
+from result_cache import ResultCache, cache_key
+from field_cache import FieldCache
+from dstar import DStarLite
+from multiagent import plan_request
+from waypoints import route_request
+from batch import BatchRunner, parse_queries
+from wire import wants_binary, encode_result, MIMETYPE
+
+# Serialized pathfinding responses, shared by the requests of a warm instance
+result_cache = ResultCache()
+field_cache = FieldCache()  # goal-rooted distance fields, also for waypoint routes
+batch_maze = None  # built on the first batch request
 
 # Create tkinter-free versions of the algorithms
 def DFS(maze, start, goal):
     """Depth-First Search implementation without tkinter dependencies"""
-    visited_positions = []
-    path_to_goal = []
-    
-    frontiers = [start]
-    order = ['E', 'S', 'W', 'N']
-    visited_positions.append(start)
-    pathtoreverse = {}
-
-    while len(frontiers) != 0:
-        currentNode = frontiers.pop()
-        if currentNode == goal:
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    # Open bits never point outside the grid, so no bounds checks are needed
+    table = grid.expansion_table('ESWN')
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+
+    frontiers = [start_id]
+    state.visit(start_id)
+
+    while frontiers:
+        current = frontiers.pop()
+        if current == goal_id:
             break
-        for direction in order:
-            if currentNode in maze.maze_map and maze.maze_map[currentNode][direction] == True:
-                x, y = currentNode
-                if direction == 'E':
-                    childNode = (x, y+1)
-                elif direction == 'S':
-                    childNode = (x+1, y)
-                elif direction == 'W':
-                    childNode = (x, y-1)
-                elif direction == 'N':
-                    childNode = (x-1, y)
-                
-                # Check if childNode is within bounds and exists in maze
-                if (1 <= childNode[0] <= maze.rows and 
-                    1 <= childNode[1] <= maze.cols and 
-                    childNode in maze.maze_map and
-                    childNode not in visited_positions):
-                    visited_positions.append(childNode)
-                    frontiers.append(childNode)
-                    pathtoreverse[childNode] = currentNode
-
-    path_to_goal = [goal]
-    tempnode = goal
-
-    while tempnode != start:
-        tempnode = pathtoreverse[tempnode]
-        path_to_goal.append(tempnode)
-
-    path_to_goal.reverse()
-    return visited_positions, path_to_goal
+        for offset in table[walls[current]]:
+            child = current + offset
+            if not state.is_visited(child):
+                state.visit(child, current)
+                frontiers.append(child)
+
+    return state.explored(), state.path(start, goal)
 
 def BFS(maze, start, goal):
     """Breadth-First Search implementation without tkinter dependencies"""
-    visited_positions = []
-    path_to_goal = []
-    
-    frontiers = [start]
-    order = ['E', 'S', 'W', 'N']
-    visited_positions.append(start)
-    pathtoreverse = {}
-
-    while len(frontiers) != 0:
-        currentNode = frontiers.pop(0)  # Use pop(0) for queue behavior
-        if currentNode == goal:
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    table = grid.expansion_table('ESWN')
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+
+    frontiers = deque([start_id])
+    state.visit(start_id)
+
+    while frontiers:
+        current = frontiers.popleft()
+        if current == goal_id:
             break
-        for direction in order:
-            if currentNode in maze.maze_map and maze.maze_map[currentNode][direction] == True:
-                x, y = currentNode
-                if direction == 'E':
-                    childNode = (x, y+1)
-                elif direction == 'S':
-                    childNode = (x+1, y)
-                elif direction == 'W':
-                    childNode = (x, y-1)
-                elif direction == 'N':
-                    childNode = (x-1, y)
-                
-                # Check if childNode is within bounds and exists in maze
-                if (1 <= childNode[0] <= maze.rows and 
-                    1 <= childNode[1] <= maze.cols and 
-                    childNode in maze.maze_map and
-                    childNode not in visited_positions):
-                    visited_positions.append(childNode)
-                    frontiers.append(childNode)
-                    pathtoreverse[childNode] = currentNode
-
-    path_to_goal = [goal]
-    tempnode = goal
-
-    while tempnode != start:
-        tempnode = pathtoreverse[tempnode]
-        path_to_goal.append(tempnode)
-
-    path_to_goal.reverse()
-    return visited_positions, path_to_goal
-
-def heuristic(a, b):
-    """Manhattan distance heuristic"""
-    return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-def AStar(maze, start, goal):
+        for offset in table[walls[current]]:
+            child = current + offset
+            if not state.is_visited(child):
+                state.visit(child, current)
+                frontiers.append(child)
+
+    return state.explored(), state.path(start, goal)
+
+def AStar(maze, start, goal, landmarks=None, heuristic_name=DEFAULT_HEURISTIC):
     """A* Search implementation without tkinter dependencies"""
-    visited_positions = []
-    path_to_goal = []
-    
-    frontiers = PriorityQueue()
-    frontiers.put((0, start))
-    came_from = {}
-    cost_so_far = {}
-    came_from[start] = None
-    cost_so_far[start] = 0
-    visited_positions.append(start)
-
-    while not frontiers.empty():
-        current = frontiers.get()[1]
-        
-        if current == goal:
-            break
-            
-        for direction in ['E', 'S', 'W', 'N']:
-            if current in maze.maze_map and maze.maze_map[current][direction] == True:
-                x, y = current
-                if direction == 'E':
-                    next_node = (x, y+1)
-                elif direction == 'S':
-                    next_node = (x+1, y)
-                elif direction == 'W':
-                    next_node = (x, y-1)
-                elif direction == 'N':
-                    next_node = (x-1, y)
-                
-                # Check if next_node is within bounds and exists in maze
-                if (1 <= next_node[0] <= maze.rows and 
-                    1 <= next_node[1] <= maze.cols and 
-                    next_node in maze.maze_map):
-                    
-                    new_cost = cost_so_far[current] + 1
-                    
-                    if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
-                        cost_so_far[next_node] = new_cost
-                        priority = new_cost + heuristic(next_node, goal)
-                        frontiers.put((priority, next_node))
-                        came_from[next_node] = current
-                        if next_node not in visited_positions:
-                            visited_positions.append(next_node)
-
-    # Reconstruct path
-    current = goal
-    while current is not None:
-        path_to_goal.append(current)
-        current = came_from.get(current)
-    path_to_goal.reverse()
-    
-    return visited_positions, path_to_goal
+    grid = grid_of(maze)
+    # heuristic table of the goal (see heuristics.py), raised to the ALT bound with landmarks
+    h = table_heuristic(grid, heuristic_name, grid.cell_id(goal), landmarks)
+    # heapq engine with a closed set; equal f values prefer the larger g
+    return astar_search(grid, start, goal, heuristic=h, order='ESWN', tie_break='max_g')
+
+def BidirectionalBFS(maze, start, goal):
+    """Bidirectional BFS; explored lists both frontiers in discovery order"""
+    result = bidirectional_bfs(maze, start, goal, order='ESWN')
+    return result.explored, result.path
+
+def BidirectionalAStar(maze, start, goal, heuristic_name=DEFAULT_HEURISTIC):
+    """Bidirectional A* with the heuristic towards the opposite end"""
+    result = bidirectional_astar(maze, start, goal, heuristic=heuristic_factory(heuristic_name), order='ESWN')
+    return result.explored, result.path
+
+def JumpPointSearch(maze, start, goal):
+    """Jump Point Search; explored holds the jump points, path every cell"""
+    return jump_point_search(maze, start, goal)
+
+def HierarchicalSearch(maze, start, goal, hierarchy=None):
+    """Search on the contracted corridor / cluster graph of the maze"""
+    if hierarchy is None:
+        hierarchy = build_hierarchy(maze)
+    return hierarchy.query(start, goal)
+
+def Dijkstra(maze, start, goal):
+    """Cheapest path over the terrain costs of the maze, with a bucket queue"""
+    return dijkstra_search(maze, start, goal, order='NWSE')
+
+def TerrainAStar(maze, start, goal):
+    """A* over the terrain costs (Manhattan distance times the cheapest cost)"""
+    grid = grid_of(maze)
+    return dijkstra_search(grid, start, goal, heuristic=cheapest_manhattan(grid, grid.cell_id(goal)), order='NWSE')
 
 # Graph coloring algorithms (simplified versions)
 def arc_consistency(graph, domain):
@@ -283,33 +244,22 @@ class WebMaze:
     def __init__(self, rows=20, cols=20):
         self.rows = rows
         self.cols = cols
-        self.maze_map = {}
+        self.core = MazeGrid(rows, cols)
+        self.maze_map = self.core.maze_map  # read-only view over the wall masks
         self._load_maze()
+        self.fingerprint = self.core.fingerprint()  # content hash for the result cache
     
     def _load_maze(self):
         """Load maze from CSV file or create random maze"""
         try:
-            # Create a simple maze with all cells connected
+            # Create a simple maze with all cells connected; set_mask closes
+            # the directions that would leave the grid at the edges
             for i in range(1, self.rows + 1):
                 for j in range(1, self.cols + 1):
-                    self.maze_map[(i, j)] = {
-                        'E': j < self.cols,  # Can go east if not at right edge
-                        'W': j > 1,         # Can go west if not at left edge
-                        'N': i > 1,         # Can go north if not at top edge
-                        'S': i < self.rows  # Can go south if not at bottom edge
-                    }
-            
-            pass  # Use the simple maze created above
+                    self.core.set_mask((i, j), E | W | N | S)
         except:
-            # Create a simple maze if file not found
-            for i in range(1, self.rows + 1):
-                for j in range(1, self.cols + 1):
-                    self.maze_map[(i, j)] = {
-                        'E': random.choice([True, False]),
-                        'W': random.choice([True, False]),
-                        'N': random.choice([True, False]),
-                        'S': random.choice([True, False])
-                    }
+            # Generate a solvable maze if the file is missing or unreadable
+            self.core.walls[:] = generate(self.rows, self.cols).walls
 
 class WebGraph:
     """Graph class for web visualization"""
@@ -330,29 +280,152 @@ class WebGraph:
         self.domain["SL"] = ["red"]
         self.domain["HU"] = ["green"]
 
-def run_pathfinding_algorithm(algorithm, start, goal):
-    """Run pathfinding algorithm"""
-    maze = WebMaze()
-    
+def run_search(algorithm, start, goal, maze, heuristic=None):
+    """
+    (explored, path) of one pathfinding algorithm, or None if it is unknown.
+    heuristic is the heuristics.HEURISTICS name for the searches that take one.
+    """
     if algorithm == 'dfs':
-        explored, path = DFS(maze, start, goal)
+        return DFS(maze, start, goal)
     elif algorithm == 'bfs':
-        explored, path = BFS(maze, start, goal)
+        return BFS(maze, start, goal)
     elif algorithm == 'astar':
-        explored, path = AStar(maze, start, goal)
-    else:
+        return AStar(maze, start, goal, heuristic_name=heuristic_choice(algorithm, heuristic))
+    elif algorithm == 'bidirectional_bfs':
+        return BidirectionalBFS(maze, start, goal)
+    elif algorithm == 'bidirectional_astar':
+        return BidirectionalAStar(maze, start, goal, heuristic_name=heuristic_choice(algorithm, heuristic))
+    elif algorithm == 'jps':
+        return JumpPointSearch(maze, start, goal)
+    elif algorithm == 'dijkstra':
+        return Dijkstra(maze, start, goal)
+    elif algorithm == 'terrain_astar':
+        return TerrainAStar(maze, start, goal)
+    elif algorithm == 'hierarchical':
+        return HierarchicalSearch(maze, start, goal)
+    elif algorithm == 'dstar_lite':
+        return DStarLite(maze, start, goal).plan()
+    elif algorithm == 'goal_field':
+        # one reverse BFS per goal, then every start is answered in O(path length)
+        path = field_cache.route(maze, start, goal, maze.fingerprint)
+        return path, path
+    return None
+
+def run_pathfinding_algorithm(algorithm, start, goal, maze=None, heuristic=None):
+    """Run pathfinding algorithm"""
+    if maze is None:
+        maze = WebMaze()
+    if start not in maze.maze_map or goal not in maze.maze_map:
+        return {'error': 'Invalid start or goal'}
+    
+    result = run_search(algorithm, start, goal, maze, heuristic)
+    if result is None:
         return {'error': 'Invalid algorithm'}
+    explored, path = result
     
     explored_list = [[pos[0], pos[1]] for pos in explored]
     path_list = [[pos[0], pos[1]] for pos in path]
     
-    return {
+    result = {
         'explored': explored_list,
         'path': path_list,
         'explored_count': len(explored),
         'path_length': len(path),
         'algorithm': algorithm
     }
+    heuristic = heuristic_choice(algorithm, heuristic)
+    if heuristic is not None:
+        result['heuristic'] = heuristic
+    return result
+
+def run_pathfinding_json(algorithm, start, goal, heuristic=None):
+    """Serialized pathfinding result, served from the result cache when possible; start None is the bottom-right cell"""
+    maze = WebMaze()
+    if start is None:
+        start = (maze.rows, maze.cols)
+    key = cache_key(maze.fingerprint, algorithm, start, goal, heuristic=heuristic_choice(algorithm, heuristic))
+    payload = result_cache.get(key)
+    if payload is None:
+        result = run_pathfinding_algorithm(algorithm, start, goal, maze, heuristic)
+        payload = json.dumps(result)
+        if 'error' not in result:
+            result_cache.put(key, payload)
+    return payload
+
+def run_pathfinding_binary(algorithm, start, goal, heuristic=None):
+    """Pathfinding result in the binary format of wire.py, or None for an unknown algorithm; start as in run_pathfinding_json"""
+    maze = WebMaze()
+    if start is None:
+        start = (maze.rows, maze.cols)
+    key = cache_key(maze.fingerprint, algorithm, start, goal, 'binary', heuristic_choice(algorithm, heuristic))
+    payload = result_cache.get(key)
+    if payload is None:
+        if start not in maze.maze_map or goal not in maze.maze_map:
+            return None  # the JSON response reports the error
+        result = run_search(algorithm, start, goal, maze, heuristic)
+        if result is None:
+            return None
+        payload = encode_result(maze, result[0], result[1], algorithm)
+        result_cache.put(key, payload)
+    return payload
+
+def run_wall_edits(data):
+    """
+    Plan with D* Lite, then apply the requested wall edits and replan
+    incrementally. Serverless instances keep no maze between requests, so
+    the edits come with the request: [{"cell": [x, y], "direction": "E", "open": true}, ...]
+    """
+    goal = tuple(data.get('goal', [1, 1]))
+    maze = WebMaze()
+    start = tuple(data.get('start', [maze.rows, maze.cols]))
+    if start not in maze.maze_map or goal not in maze.maze_map:
+        return {'error': 'Invalid start or goal'}
+    planner = DStarLite(maze, start, goal)
+    planner.plan()
+    for edit in data.get('walls', []):
+        cell = tuple(edit.get('cell', [1, 1]))
+        direction = edit.get('direction', 'E')
+        if direction not in ('E', 'W', 'N', 'S') or cell not in maze.maze_map:
+            return {'error': 'Invalid wall'}
+        planner.set_wall(cell, direction, bool(edit.get('open', False)))
+    explored, path = planner.plan()
+    
+    return {
+        'explored': [[pos[0], pos[1]] for pos in explored],
+        'path': [[pos[0], pos[1]] for pos in path],
+        'explored_count': len(explored),
+        'path_length': len(path),
+        'algorithm': 'dstar_lite'
+    }
+
+batch_runner = BatchRunner({
+    'dfs': DFS, 'bfs': BFS, 'astar': AStar,
+    'bidirectional_bfs': BidirectionalBFS, 'bidirectional_astar': BidirectionalAStar,
+    'jps': JumpPointSearch, 'dijkstra': Dijkstra, 'terrain_astar': TerrainAStar
+})
+
+def run_pathfinding_batch(data):
+    """Run many start/goal queries with one or more algorithms on the worker pool"""
+    global batch_maze
+    if batch_maze is None:
+        batch_maze = WebMaze()
+    algorithms = data.get('algorithms') or [data.get('algorithm', 'bfs')]
+    
+    start_time = time.time()
+    try:
+        results = batch_runner.run(batch_maze, parse_queries(data, batch_maze), algorithms,
+                                   include_paths=data.get('include_paths', False),
+                                   fingerprint=batch_maze.fingerprint)
+    except KeyError:
+        return {'error': 'Invalid algorithm'}
+    except ValueError:
+        return {'error': 'Invalid start or goal'}
+    
+    return {
+        'results': results,
+        'query_count': len(results),
+        'execution_time': round(time.time() - start_time, 4)
+    }
 
 def run_graph_coloring(algorithm):
     """Run graph coloring algorithm"""
@@ -415,30 +488,53 @@ class handler(BaseHTTPRequestHandler):
             data = {}
         
         # Determine which algorithm to run based on the endpoint
-        path = self.path.split('?')[0]
+        path, _, query = self.path.partition('?')
+        content_type = 'application/json'
         
-        if 'pathfinding' in path:
+        if 'wall' in path:
+            body = json.dumps(run_wall_edits(data))
+        elif 'multi_agent' in path:
+            # a serverless call has a short time budget
+            body = json.dumps(plan_request(WebMaze(), data, time_limit=5.0))
+        elif 'waypoint' in path:
+            maze = WebMaze()
+            body = json.dumps(route_request(maze, data, field_cache, maze.fingerprint))
+        elif 'batch' in path:
+            body = json.dumps(run_pathfinding_batch(data))
+        elif 'pathfinding' in path:
             algorithm = data.get('algorithm', 'dfs')
-            start = tuple(data.get('start', [20, 20]))
+            start = tuple(data['start']) if 'start' in data else None  # the maze's bottom-right cell
             goal = tuple(data.get('goal', [1, 1]))
-            result = run_pathfinding_algorithm(algorithm, start, goal)
+            heuristic = data.get('heuristic')
+            # Binary results (see wire.py) by Accept header or ?encoding=binary
+            encoding = urllib.parse.parse_qs(query).get('encoding', [data.get('encoding')])[0]
+            payload = None
+            if heuristic is not None and heuristic not in HEURISTICS:
+                body = json.dumps({'error': 'Invalid heuristic'})
+            else:
+                if wants_binary(self.headers.get('Accept'), encoding):
+                    payload = run_pathfinding_binary(algorithm, start, goal, heuristic)
+                if payload is not None:
+                    body, content_type = payload, MIMETYPE
+                else:
+                    body = run_pathfinding_json(algorithm, start, goal, heuristic)
         elif 'graph_coloring' in path:
             algorithm = data.get('algorithm', 'arc')
-            result = run_graph_coloring(algorithm)
+            body = json.dumps(run_graph_coloring(algorithm))
         elif 'tictactoe' in path:
             board = data.get('board', ['-'] * 9)
             player_move = data.get('player_move')
-            result = play_tictactoe(board, player_move)
+            body = json.dumps(play_tictactoe(board, player_move))
         else:
-            result = {'error': 'Invalid endpoint'}
+            body = json.dumps({'error': 'Invalid endpoint'})
         
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', content_type)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
-        self.wfile.write(json.dumps(result).encode())
+        self.wfile.write(body if isinstance(body, bytes) else body.encode())
 
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -3,60 +3,102 @@ import json
 import sys
 import os
 import time
-import random
-from queue import PriorityQueue
+import threading
 import math
 import networkx as nx
-import matplotlib.pyplot as plt
 import io
 import base64
 from http.server import BaseHTTPRequestHandler
 import urllib.parse
 
 # Import our existing algorithms
-from task1 import DFS, BFS, AStar, heuristic
+from task1 import DFS, BFS, AStar, BidirectionalBFS, BidirectionalAStar, JumpPointSearch, HierarchicalSearch, Dijkstra, TerrainAStar
+from hierarchy import build_hierarchy
+from mazegen import generate
+import mazefile
+from maze_csv import load_csv
+from result_cache import ResultCache, cache_key
+from field_cache import FieldCache
+from dstar import DStarLite
+from multiagent import plan_request
+from waypoints import route_request
+from heuristics import heuristic_choice, register_maze_file
 from task2 import arc_consistency, dfs_backtracking
 from task3 import minimax, computer_move, winner
 
 # Global variables for maze and graph
 maze_data = None
 graph_data = None
+# Maze served by the API: the CSV layout or a binary file from mazefile.py
+MAZE_FILE = os.environ.get('MAZE_FILE', 'maze_config.csv')
+result_cache = ResultCache()  # serialized /api/run_algorithm responses
+field_cache = FieldCache()  # goal-rooted distance fields for 'goal_field' and waypoint routes
 
 class WebMaze:
     """Simplified maze class for web visualization"""
     def __init__(self, rows=20, cols=20):
         self.rows = rows
         self.cols = cols
-        self.maze_map = {}
+        self.hierarchy = None  # corridor/cluster graph, built on first use
+        self.planner = None  # D* Lite planner towards the last requested goal
+        # requests run on several threads: the planner, the hierarchy and the
+        # wall masks are only changed while holding the lock
+        self.lock = threading.RLock()
         self._load_maze()
+        self.fingerprint = self.core.fingerprint()  # content hash for the result cache
+        if self.maze_file is not None:
+            # the 'alt' landmarks are read from (or saved once to) <maze file>.alt.npz
+            register_maze_file(self.core, self.maze_file, self.fingerprint)
+    
+    def dstar(self, goal):
+        """The D* Lite planner for goal, replacing the one kept for another goal; call with the lock held"""
+        if self.planner is None or self.planner.goal != goal:
+            self.planner = DStarLite(self.core, goal, goal)
+        return self.planner
+    
+    def dstar_plan(self, start, goal):
+        """(explored, path) of the kept D* Lite planner from start to goal"""
+        with self.lock:
+            return self.dstar(goal).plan(start)
+    
+    def toggle_wall(self, cell, direction, start, goal):
+        """
+        Flip one wall through the planner and replan from start.
+        Returns (is_open, explored, path); is_open is None for a border wall.
+        """
+        with self.lock:
+            is_open = self.dstar(goal).toggle_wall(cell, direction)
+            if is_open is None:
+                return None, [], []
+            # the maze changed, so every cached result of it is stale
+            self.fingerprint = self.core.fingerprint()
+            self.hierarchy = None
+            explored, path = self.planner.plan(start)
+        return is_open, explored, path
+    
+    def hierarchy_graph(self):
+        """The corridor/cluster graph of the maze, built on first use"""
+        with self.lock:
+            if self.hierarchy is None:
+                self.hierarchy = build_hierarchy(self)  # one-time corridor/cluster build
+            return self.hierarchy
     
     def _load_maze(self):
-        """Load maze from CSV file"""
+        """Load maze from the binary maze file or CSV file"""
         try:
-            with open('maze_config.csv', 'r') as f:
-                import csv
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                for row in reader:
-                    if len(row) >= 5:
-                        coords = row[0].strip('()').split(',')
-                        x, y = int(coords[0]), int(coords[1])
-                        self.maze_map[(x, y)] = {
-                            'E': int(row[1]) == 1,
-                            'W': int(row[2]) == 1,
-                            'N': int(row[3]) == 1,
-                            'S': int(row[4]) == 1
-                        }
-        except:
-            # Create a simple maze if file not found
-            for i in range(1, self.rows + 1):
-                for j in range(1, self.cols + 1):
-                    self.maze_map[(i, j)] = {
-                        'E': random.choice([True, False]),
-                        'W': random.choice([True, False]),
-                        'N': random.choice([True, False]),
-                        'S': random.choice([True, False])
-                    }
+            if mazefile.is_maze_file(MAZE_FILE):
+                # Mapped, not parsed
+                self.core = mazefile.open_maze(MAZE_FILE)
+            else:
+                self.core = load_csv(MAZE_FILE)
+            self.maze_file = MAZE_FILE
+        except (OSError, ValueError):
+            # Generate a solvable maze if the file is missing or unreadable
+            self.core = generate(self.rows, self.cols)
+            self.maze_file = None
+        # the dimensions come from the file
+        self.rows, self.cols = self.core.rows, self.core.cols
+        self.maze_map = self.core.maze_map  # read-only view over the wall masks
 
 class WebGraph:
     """Graph class for web visualization"""
@@ -116,6 +158,10 @@ def render_template(template_name, **kwargs):
 
 def jsonify(data):
     """Simple JSON response for Vercel"""
+    return json_response(json.dumps(data))
+
+def json_response(body):
+    """JSON response for an already serialized body"""
     return {
         'statusCode': 200,
         'headers': {
@@ -124,7 +170,7 @@ def jsonify(data):
             'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
             'Access-Control-Allow-Headers': 'Content-Type'
         },
-        'body': json.dumps(data)
+        'body': body
     }
 
 def html_response(html_content):
@@ -141,33 +187,113 @@ def html_response(html_content):
 def handle_algorithm_request(data):
     """Handle algorithm execution requests"""
     algorithm = data.get('algorithm')
-    start = tuple(data.get('start', [20, 20]))
     goal = tuple(data.get('goal', [1, 1]))
+    try:
+        heuristic = heuristic_choice(algorithm, data.get('heuristic'))
+    except ValueError:
+        return jsonify({'error': 'Invalid heuristic'})
     
     global maze_data
     if maze_data is None:
         maze_data = WebMaze()
+    start = tuple(data.get('start', [maze_data.rows, maze_data.cols]))
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    key = cache_key(maze_data.fingerprint, algorithm, start, goal, heuristic=heuristic)
+    payload = result_cache.get(key)
+    if payload is not None:
+        return json_response(payload)
     
     if algorithm == 'dfs':
         explored, path = DFS(maze_data, start, goal)
     elif algorithm == 'bfs':
         explored, path = BFS(maze_data, start, goal)
     elif algorithm == 'astar':
-        explored, path = AStar(maze_data, start, goal)
+        explored, path = AStar(maze_data, start, goal, heuristic_name=heuristic)
+    elif algorithm == 'bidirectional_bfs':
+        explored, path = BidirectionalBFS(maze_data, start, goal)
+    elif algorithm == 'bidirectional_astar':
+        explored, path = BidirectionalAStar(maze_data, start, goal, heuristic_name=heuristic)
+    elif algorithm == 'jps':
+        explored, path = JumpPointSearch(maze_data, start, goal)
+    elif algorithm == 'dijkstra':
+        explored, path = Dijkstra(maze_data, start, goal)
+    elif algorithm == 'terrain_astar':
+        explored, path = TerrainAStar(maze_data, start, goal)
+    elif algorithm == 'hierarchical':
+        explored, path = HierarchicalSearch(maze_data, start, goal, maze_data.hierarchy_graph())
+    elif algorithm == 'dstar_lite':
+        explored, path = maze_data.dstar_plan(start, goal)
+    elif algorithm == 'goal_field':
+        # one reverse BFS per goal, then every start is answered in O(path length)
+        path = field_cache.route(maze_data, start, goal, maze_data.fingerprint)
+        explored = path
     else:
         return jsonify({'error': 'Invalid algorithm'})
     
     explored_list = [[pos[0], pos[1]] for pos in explored]
     path_list = [[pos[0], pos[1]] for pos in path]
     
-    return jsonify({
+    result = {
         'explored': explored_list,
         'path': path_list,
         'explored_count': len(explored),
         'path_length': len(path),
         'algorithm': algorithm
+    }
+    if heuristic is not None:
+        result['heuristic'] = heuristic
+    payload = json.dumps(result)
+    result_cache.put(key, payload)
+    return json_response(payload)
+
+def handle_toggle_wall_request(data):
+    """Open or close one wall and replan incrementally with D* Lite"""
+    cell = tuple(data.get('cell', [1, 1]))
+    direction = data.get('direction', 'E')
+    goal = tuple(data.get('goal', [1, 1]))
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    start = tuple(data.get('start', [maze_data.rows, maze_data.cols]))
+    if direction not in ('E', 'W', 'N', 'S') or cell not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid wall'})
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    is_open, explored, path = maze_data.toggle_wall(cell, direction, start, goal)
+    if is_open is None:
+        return jsonify({'error': 'Border walls cannot be opened'})
+    
+    return jsonify({
+        'cell': list(cell),
+        'direction': direction,
+        'open': is_open,
+        'explored': [[pos[0], pos[1]] for pos in explored],
+        'path': [[pos[0], pos[1]] for pos in path],
+        'explored_count': len(explored),
+        'path_length': len(path),
+        'algorithm': 'dstar_lite'
     })
 
+def handle_multi_agent_request(data):
+    """Collision-free, time-indexed paths for several agents at once (CBS / ECBS)"""
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    
+    return jsonify(plan_request(maze_data, data))
+
+def handle_waypoint_request(data):
+    """One route from start through several waypoints to the goal, in the shortest order found"""
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    
+    return jsonify(route_request(maze_data, data, field_cache, maze_data.fingerprint))
+
 def handle_graph_coloring_request(data):
     """Handle graph coloring requests"""
     algorithm = data.get('algorithm')
@@ -271,6 +397,12 @@ class handler(BaseHTTPRequestHandler):
         
         if path == '/api/run_algorithm':
             response = handle_algorithm_request(data)
+        elif path == '/api/toggle_wall':
+            response = handle_toggle_wall_request(data)
+        elif path == '/api/multi_agent':
+            response = handle_multi_agent_request(data)
+        elif path == '/api/waypoint_route':
+            response = handle_waypoint_request(data)
         elif path == '/api/run_graph_coloring':
             response = handle_graph_coloring_request(data)
         elif path == '/api/play_tictactoe':
@@ -1,18 +1,30 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 import json
 import sys
 import os
 import time
-import random
-from queue import PriorityQueue
+import threading
 import math
 import networkx as nx
-import matplotlib.pyplot as plt
 import io
 import base64
 
 # Import our existing algorithms
-from task1 import DFS, BFS, AStar, heuristic
+from task1 import DFS, BFS, AStar, BidirectionalBFS, BidirectionalAStar, JumpPointSearch, HierarchicalSearch, Dijkstra, TerrainAStar
+from hierarchy import build_hierarchy
+from mazegen import generate
+import mazefile
+from maze_csv import load_csv
+from result_cache import ResultCache, cache_key
+from field_cache import FieldCache
+from dstar import DStarLite
+from batch import BatchRunner, parse_queries
+from streaming import search_steps, search_events, encode_events, FORMATS, CHUNK_SIZE, STEP_SEARCHES
+from wire import wants_binary, encode_result, encode_steps, MIMETYPE
+from sessions import SessionStore
+from multiagent import plan_request
+from waypoints import route_request
+from heuristics import heuristic_choice, register_maze_file
 from task2 import arc_consistency, dfs_backtracking
 from task3 import minimax, computer_move, winner
 
@@ -21,42 +33,82 @@ app = Flask(__name__)
 # Global variables for maze and graph
 maze_data = None
 graph_data = None
+# Maze served by the API: the CSV layout or a binary file from mazefile.py
+MAZE_FILE = os.environ.get('MAZE_FILE', 'maze_config.csv')
+result_cache = ResultCache()  # serialized /api/run_algorithm responses
+field_cache = FieldCache()  # goal-rooted distance fields for 'goal_field' and waypoint routes
+search_sessions = SessionStore()  # step/seek sessions of /api/search_session
+batch_runner = BatchRunner({
+    'dfs': DFS, 'bfs': BFS, 'astar': AStar,
+    'bidirectional_bfs': BidirectionalBFS, 'bidirectional_astar': BidirectionalAStar,
+    'jps': JumpPointSearch, 'dijkstra': Dijkstra, 'terrain_astar': TerrainAStar
+})
 
 class WebMaze:
     """Simplified maze class for web visualization"""
     def __init__(self, rows=20, cols=20):
         self.rows = rows
         self.cols = cols
-        self.maze_map = {}
+        self.hierarchy = None  # corridor/cluster graph, built on first use
+        self.planner = None  # D* Lite planner towards the last requested goal
+        # requests run on several threads: the planner, the hierarchy and the
+        # wall masks are only changed while holding the lock
+        self.lock = threading.RLock()
         self._load_maze()
+        self.fingerprint = self.core.fingerprint()  # content hash for the result cache
+        if self.maze_file is not None:
+            # the 'alt' landmarks are read from (or saved once to) <maze file>.alt.npz
+            register_maze_file(self.core, self.maze_file, self.fingerprint)
+    
+    def dstar(self, goal):
+        """The D* Lite planner for goal, replacing the one kept for another goal; call with the lock held"""
+        if self.planner is None or self.planner.goal != goal:
+            self.planner = DStarLite(self.core, goal, goal)
+        return self.planner
+    
+    def dstar_plan(self, start, goal):
+        """(explored, path) of the kept D* Lite planner from start to goal"""
+        with self.lock:
+            return self.dstar(goal).plan(start)
+    
+    def toggle_wall(self, cell, direction, start, goal):
+        """
+        Flip one wall through the planner and replan from start.
+        Returns (is_open, explored, path); is_open is None for a border wall.
+        """
+        with self.lock:
+            is_open = self.dstar(goal).toggle_wall(cell, direction)
+            if is_open is None:
+                return None, [], []
+            # the maze changed, so every cached result of it is stale
+            self.fingerprint = self.core.fingerprint()
+            self.hierarchy = None
+            explored, path = self.planner.plan(start)
+        return is_open, explored, path
+    
+    def hierarchy_graph(self):
+        """The corridor/cluster graph of the maze, built on first use"""
+        with self.lock:
+            if self.hierarchy is None:
+                self.hierarchy = build_hierarchy(self)  # one-time corridor/cluster build
+            return self.hierarchy
     
     def _load_maze(self):
-        """Load maze from CSV file"""
+        """Load maze from the binary maze file or CSV file"""
         try:
-            with open('maze_config.csv', 'r') as f:
-                import csv
-                reader = csv.reader(f)
-                next(reader)  # Skip header
-                for row in reader:
-                    if len(row) >= 5:
-                        coords = row[0].strip('()').split(',')
-                        x, y = int(coords[0]), int(coords[1])
-                        self.maze_map[(x, y)] = {
-                            'E': int(row[1]) == 1,
-                            'W': int(row[2]) == 1,
-                            'N': int(row[3]) == 1,
-                            'S': int(row[4]) == 1
-                        }
-        except:
-            # Create a simple maze if file not found
-            for i in range(1, self.rows + 1):
-                for j in range(1, self.cols + 1):
-                    self.maze_map[(i, j)] = {
-                        'E': random.choice([True, False]),
-                        'W': random.choice([True, False]),
-                        'N': random.choice([True, False]),
-                        'S': random.choice([True, False])
-                    }
+            if mazefile.is_maze_file(MAZE_FILE):
+                # Mapped, not parsed
+                self.core = mazefile.open_maze(MAZE_FILE)
+            else:
+                self.core = load_csv(MAZE_FILE)
+            self.maze_file = MAZE_FILE
+        except (OSError, ValueError):
+            # Generate a solvable maze if the file is missing or unreadable
+            self.core = generate(self.rows, self.cols)
+            self.maze_file = None
+        # the dimensions come from the file
+        self.rows, self.cols = self.core.rows, self.core.cols
+        self.maze_map = self.core.maze_map  # read-only view over the wall masks
 
 class WebGraph:
     """Graph class for web visualization"""
@@ -93,40 +145,280 @@ def graph_coloring():
 def game_theory():
     return render_template('game_theory.html')
 
+def run_search(algorithm, start, goal, heuristic=None):
+    """
+    Run one pathfinding algorithm on the served maze; (explored, path), or None if unknown.
+    heuristic is the heuristics.HEURISTICS name for the searches that take one.
+    """
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    
+    if algorithm == 'dfs':
+        return DFS(maze_data, start, goal)
+    elif algorithm == 'bfs':
+        return BFS(maze_data, start, goal)
+    elif algorithm == 'astar':
+        return AStar(maze_data, start, goal, heuristic_name=heuristic_choice(algorithm, heuristic))
+    elif algorithm == 'bidirectional_bfs':
+        return BidirectionalBFS(maze_data, start, goal)
+    elif algorithm == 'bidirectional_astar':
+        return BidirectionalAStar(maze_data, start, goal, heuristic_name=heuristic_choice(algorithm, heuristic))
+    elif algorithm == 'jps':
+        return JumpPointSearch(maze_data, start, goal)
+    elif algorithm == 'dijkstra':
+        return Dijkstra(maze_data, start, goal)
+    elif algorithm == 'terrain_astar':
+        return TerrainAStar(maze_data, start, goal)
+    elif algorithm == 'hierarchical':
+        return HierarchicalSearch(maze_data, start, goal, maze_data.hierarchy_graph())
+    elif algorithm == 'dstar_lite':
+        return maze_data.dstar_plan(start, goal)
+    elif algorithm == 'goal_field':
+        # one reverse BFS per goal, then every start is answered in O(path length)
+        path = field_cache.route(maze_data, start, goal, maze_data.fingerprint)
+        return path, path
+    return None
+
 @app.route('/api/run_algorithm', methods=['POST'])
 def run_algorithm():
     data = request.get_json()
     algorithm = data.get('algorithm')
-    start = tuple(data.get('start', [20, 20]))
     goal = tuple(data.get('goal', [1, 1]))
+    try:
+        heuristic = heuristic_choice(algorithm, data.get('heuristic'))
+    except ValueError:
+        return jsonify({'error': 'Invalid heuristic'})
     
     # Initialize maze
     global maze_data
     if maze_data is None:
         maze_data = WebMaze()
+    start = tuple(data.get('start', [maze_data.rows, maze_data.cols]))
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    # Binary results (see wire.py) on request, by Accept header or ?encoding=binary
+    binary = wants_binary(request.headers.get('Accept'), request.args.get('encoding', data.get('encoding')))
+    mimetype = MIMETYPE if binary else 'application/json'
+    
+    # Repeat queries are answered from the cache without searching again
+    key = cache_key(maze_data.fingerprint, algorithm, start, goal, 'binary' if binary else 'json', heuristic)
+    payload = result_cache.get(key)
+    if payload is not None:
+        return app.response_class(payload, mimetype=mimetype)
+    
+    if binary and algorithm in STEP_SEARCHES:
+        # encoded straight from the cell ids of the search
+        steps = search_steps(maze_data, algorithm, start, goal, chunk_size=None, heuristic=heuristic)
+        payload = encode_steps(maze_data, steps, algorithm)
+        result_cache.put(key, payload)
+        return app.response_class(payload, mimetype=mimetype)
     
     # Run selected algorithm
-    if algorithm == 'dfs':
-        explored, path = DFS(maze_data, start, goal)
-    elif algorithm == 'bfs':
-        explored, path = BFS(maze_data, start, goal)
-    elif algorithm == 'astar':
-        explored, path = AStar(maze_data, start, goal)
-    else:
+    result = run_search(algorithm, start, goal, heuristic)
+    if result is None:
         return jsonify({'error': 'Invalid algorithm'})
+    explored, path = result
+    
+    if binary:
+        payload = encode_result(maze_data, explored, path, algorithm)
+        result_cache.put(key, payload)
+        return app.response_class(payload, mimetype=mimetype)
     
     # Convert to list format for JSON
     explored_list = [[pos[0], pos[1]] for pos in explored]
     path_list = [[pos[0], pos[1]] for pos in path]
     
-    return jsonify({
+    result = {
         'explored': explored_list,
         'path': path_list,
         'explored_count': len(explored),
         'path_length': len(path),
         'algorithm': algorithm
+    }
+    if heuristic is not None:
+        result['heuristic'] = heuristic
+    payload = json.dumps(result)
+    result_cache.put(key, payload)
+    return app.response_class(payload, mimetype=mimetype)
+
+@app.route('/api/run_algorithm_stream', methods=['GET', 'POST'])
+def run_algorithm_stream():
+    """Stream explored cells while the search runs, as NDJSON or Server-Sent Events"""
+    if request.method == 'POST':
+        data = request.get_json()
+    else:
+        # EventSource can only send GET requests: start=20,20&goal=1,1
+        data = request.args.to_dict()
+        for name in ('start', 'goal'):
+            if name in data:
+                data[name] = data[name].split(',')
+    algorithm = data.get('algorithm')
+    goal = tuple(int(v) for v in data.get('goal', [1, 1]))
+    fmt = data.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({'error': 'Invalid format'})
+    chunk_size = max(1, int(data.get('chunk_size', CHUNK_SIZE)))
+    try:
+        heuristic = heuristic_choice(algorithm, data.get('heuristic'))
+    except ValueError:
+        return jsonify({'error': 'Invalid heuristic'})
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    start = tuple(int(v) for v in data.get('start', [maze_data.rows, maze_data.cols]))
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    def search(maze, start, goal):
+        return run_search(algorithm, start, goal, heuristic)
+    
+    events = search_events(maze_data, algorithm, start, goal, search, chunk_size, heuristic)
+    return Response(stream_with_context(encode_events(events, fmt)), mimetype=FORMATS[fmt],
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/search_session', methods=['POST'])
+def create_search_session():
+    """Start a resumable search; its cells are fetched with next/seek"""
+    data = request.get_json()
+    algorithm = data.get('algorithm')
+    goal = tuple(data.get('goal', [1, 1]))
+    try:
+        heuristic = heuristic_choice(algorithm, data.get('heuristic'))
+    except ValueError:
+        return jsonify({'error': 'Invalid heuristic'})
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    start = tuple(data.get('start', [maze_data.rows, maze_data.cols]))
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    def search(maze, start, goal):
+        return run_search(algorithm, start, goal, heuristic)
+    
+    created = search_sessions.create(maze_data, algorithm, start, goal, search,
+                                     fingerprint=maze_data.fingerprint, heuristic=heuristic)
+    if created is None:
+        return jsonify({'error': 'Invalid algorithm'})
+    session_id, session = created
+    return jsonify(dict(session.to_dict(), session=session_id))
+
+@app.route('/api/search_session/<session_id>', methods=['POST', 'DELETE'])
+def step_search_session(session_id):
+    """Move a search session: {"action": "next", "count": N} or {"action": "seek", "step": k}"""
+    if request.method == 'DELETE':
+        return jsonify({'deleted': search_sessions.delete(session_id)})
+    
+    session = search_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'})
+    if maze_data is None or session.fingerprint != maze_data.fingerprint:
+        # the maze was edited after the search started
+        search_sessions.delete(session_id)
+        return jsonify({'error': 'The maze has changed, start a new session'})
+    
+    data = request.get_json()
+    action = data.get('action', 'next')
+    with session.lock:
+        if action == 'next':
+            added, removed = session.next(max(0, int(data.get('count', 1))))
+        elif action == 'seek':
+            added, removed = session.seek(int(data.get('step', 0)))
+        else:
+            return jsonify({'error': 'Invalid action'})
+        return jsonify(dict(session.to_dict(added, removed), session=session_id))
+
+@app.route('/api/toggle_wall', methods=['POST'])
+def toggle_wall():
+    """Open or close one wall and replan incrementally with D* Lite"""
+    data = request.get_json()
+    cell = tuple(data.get('cell', [1, 1]))
+    direction = data.get('direction', 'E')
+    goal = tuple(data.get('goal', [1, 1]))
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    start = tuple(data.get('start', [maze_data.rows, maze_data.cols]))
+    if direction not in ('E', 'W', 'N', 'S') or cell not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid wall'})
+    if start not in maze_data.maze_map or goal not in maze_data.maze_map:
+        return jsonify({'error': 'Invalid start or goal'})
+    
+    is_open, explored, path = maze_data.toggle_wall(cell, direction, start, goal)
+    if is_open is None:
+        return jsonify({'error': 'Border walls cannot be opened'})
+    
+    return jsonify({
+        'cell': list(cell),
+        'direction': direction,
+        'open': is_open,
+        'explored': [[pos[0], pos[1]] for pos in explored],
+        'path': [[pos[0], pos[1]] for pos in path],
+        'explored_count': len(explored),
+        'path_length': len(path),
+        'algorithm': 'dstar_lite'
     })
 
+@app.route('/api/run_algorithm_batch', methods=['POST'])
+def run_algorithm_batch():
+    """Run many start/goal queries with one or more algorithms on the worker pool"""
+    data = request.get_json()
+    algorithms = data.get('algorithms') or [data.get('algorithm', 'bfs')]
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    queries = parse_queries(data, maze_data)
+    
+    start_time = time.time()
+    try:
+        results = batch_runner.run(maze_data, queries, algorithms,
+                                   include_paths=data.get('include_paths', False),
+                                   fingerprint=maze_data.fingerprint)
+    except KeyError:
+        return jsonify({'error': 'Invalid algorithm'})
+    except ValueError:
+        return jsonify({'error': 'Invalid start or goal'})
+    end_time = time.time()
+    
+    return jsonify({
+        'results': results,
+        'query_count': len(results),
+        'execution_time': round(end_time - start_time, 4)
+    })
+
+@app.route('/api/multi_agent', methods=['POST'])
+def multi_agent():
+    """Collision-free, time-indexed paths for several agents at once (CBS / ECBS)"""
+    data = request.get_json()
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    
+    return jsonify(plan_request(maze_data, data))
+
+@app.route('/api/waypoint_route', methods=['POST'])
+def waypoint_route():
+    """One route from start through several waypoints to the goal, in the shortest order found"""
+    data = request.get_json()
+    
+    global maze_data
+    if maze_data is None:
+        maze_data = WebMaze()
+    
+    return jsonify(route_request(maze_data, data, field_cache, maze_data.fingerprint))
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    return jsonify({'results': result_cache.stats(), 'fields': field_cache.stats(),
+                    'sessions': search_sessions.stats()})
+
 @app.route('/api/run_graph_coloring', methods=['POST'])
 def run_graph_coloring():
     data = request.get_json()
@@ -197,13 +489,17 @@ def performance_comparison():
     if maze_data is None:
         maze_data = WebMaze()
     
-    start = (20, 20)
+    start = (maze_data.rows, maze_data.cols)
     goal = (1, 1)
     
     results = {}
     
     # Test each algorithm
-    for algorithm, func in [('DFS', DFS), ('BFS', BFS), ('A*', AStar)]:
+    for algorithm, func in [('DFS', DFS), ('BFS', BFS), ('A*', AStar),
+                            ('Bidirectional BFS', BidirectionalBFS),
+                            ('Bidirectional A*', BidirectionalAStar),
+                            ('Jump Point Search', JumpPointSearch),
+                            ('Dijkstra', Dijkstra)]:
         start_time = time.time()
         explored, path = func(maze_data, start, goal)
         end_time = time.time()
@@ -212,7 +508,7 @@ def performance_comparison():
             'explored_count': len(explored),
             'path_length': len(path),
             'execution_time': round(end_time - start_time, 4),
-            'optimal': algorithm in ['BFS', 'A*']
+            'optimal': algorithm != 'DFS'
         }
     
     return jsonify(results)
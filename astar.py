@@ -0,0 +1,145 @@
+"""
+heapq based A* over the compact maze grid.
+
+Compared with the queue.PriorityQueue versions this engine
+
+    * works on integer cell ids (see maze_core) instead of (x, y) tuples,
+    * keeps a closed bitmap so every cell is expanded at most once,
+    * skips stale heap entries lazily instead of re-expanding them,
+    * breaks ties between equal f values in a configurable way, and
+    * can cap the size of the open list.
+
+astar_steps is the same search as a generator that hands out the explored
+cells in chunks while it runs, for streaming responses.
+
+Heuristics are plain callables taking a cell id. The factory below builds
+the Manhattan distance to a fixed goal id; heuristics.py has the others as
+precomputed tables.
+"""
+
+import heapq
+from array import array
+from itertools import count
+
+from maze_core import grid_of
+from search_state import SearchState, collect
+
+
+def manhattan(grid, goal_id):
+    '''Manhattan distance to goal_id, as a function of a cell id'''
+    cols = grid.cols
+    gx, gy = divmod(goal_id, cols)
+
+    def h(cid):
+        x, y = divmod(cid, cols)
+        return abs(x - gx) + abs(y - gy)
+    return h
+
+
+# Secondary heap key for entries with equal f, from (g, insertion counter)
+TIE_BREAKS = {
+    'max_g': lambda g, n: -g,   # prefer the deeper node (closest to the goal)
+    'min_g': lambda g, n: g,    # prefer the shallower node
+    'fifo': lambda g, n: n,     # prefer the node pushed first
+}
+
+
+def astar_search(maze, start, goal, heuristic=None, order='NWSE', tie_break='max_g',
+                 max_open=None, stats=None):
+    '''
+    Run A* from start to goal with unit step costs.
+    maze-->      A MazeGrid or anything maze_core.grid_of accepts
+    start, goal--> (x, y) cells
+    heuristic--> Callable cell id -> estimate, default Manhattan to the goal
+    order-->     Order in which the directions of a cell are expanded
+    tie_break--> Key of TIE_BREAKS used when two entries have the same f;
+                 ties left after that are broken by cell id, i.e. by (x, y)
+    max_open-->  If set, the open list is trimmed back to its max_open best
+                 entries whenever it grows past that. The search then works
+                 like a beam and the path is no longer guaranteed optimal.
+    stats-->     Optional dict that receives expanded/pushed/stale/peak_open
+                 counters
+    Returns the explored cells (in discovery order) and the path, both as
+    lists of (x, y) tuples. The path is empty if the goal is unreachable.
+    '''
+    grid = grid_of(maze)
+    explored, path = collect(astar_steps(grid, start, goal, heuristic, order, tie_break, max_open, stats))
+    return grid.cells(explored), grid.cells(path)
+
+
+def astar_steps(maze, start, goal, heuristic=None, order='NWSE', tie_break='max_g',
+                max_open=None, stats=None, chunk_size=None):
+    '''
+    Generator form of astar_search with the same arguments.
+    chunk_size--> Yield the ids of newly discovered cells (an array) every
+                  time that many have piled up; None yields them all at the end
+    The remaining ids are always yielded last, and the generator returns the
+    path as a list of ids (see search_state.collect).
+    '''
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    table = grid.expansion_table(order)
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    h = heuristic or manhattan(grid, goal_id)
+    tie = TIE_BREAKS[tie_break]
+    counter = count()
+
+    g = array('l', [-1]) * grid.size     # best known cost, -1 = not seen
+    closed = bytearray((grid.size + 7) >> 3)
+    push, pop = heapq.heappush, heapq.heappop
+
+    g[start_id] = 0
+    state.visit(start_id)
+    heap = [(h(start_id), tie(0, next(counter)), start_id, 0)]
+    expanded = pushed = stale = 0
+    peak_open = 1
+    sent, flush_at = 0, chunk_size
+
+    while heap:
+        _, _, current, cost = pop(heap)
+        if closed[current >> 3] >> (current & 7) & 1 or cost != g[current]:
+            stale += 1          # superseded by a cheaper entry, or already expanded
+            continue
+        if current == goal_id:
+            break
+        closed[current >> 3] |= 1 << (current & 7)
+        expanded += 1
+
+        new_cost = cost + 1
+        for offset in table[walls[current]]:
+            child = current + offset
+            if closed[child >> 3] >> (child & 7) & 1:
+                continue
+            old_cost = g[child]
+            if old_cost < 0 or new_cost < old_cost:
+                g[child] = new_cost
+                if state.is_visited(child):
+                    state.set_parent(child, current)
+                else:
+                    state.visit(child, current)
+                push(heap, (new_cost + h(child), tie(new_cost, next(counter)), child, new_cost))
+                pushed += 1
+
+        if chunk_size and len(state.order) >= flush_at:
+            yield state.order[sent:]
+            sent = len(state.order)
+            flush_at = sent + chunk_size
+
+        if len(heap) > peak_open:
+            peak_open = len(heap)
+        if max_open is not None and len(heap) > max_open:
+            # a sorted list is a valid heap; forget the cost of dropped live
+            # entries so those cells can be pushed again later
+            heap.sort()
+            for _, _, cid, dropped_cost in heap[max_open:]:
+                if g[cid] == dropped_cost:
+                    g[cid] = -1
+            del heap[max_open:]
+
+    if stats is not None:
+        stats.update(expanded=expanded, pushed=pushed, stale=stale, peak_open=peak_open)
+
+    yield state.order[sent:]
+    return state.path_ids(start_id, goal_id)
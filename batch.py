@@ -0,0 +1,145 @@
+"""
+Batch pathfinding on a process pool.
+
+A batch runs every query (a start/goal pair) with every requested algorithm
+on one maze. The maze is shipped to the workers once, as the compact form
+of maze_core (rows, cols, one wall byte per cell and the terrain costs if
+it has any), when the pool starts; after that only small chunks of queries
+and their results cross process boundaries. The pool is kept between
+batches as long as the maze stays the same.
+
+Where worker processes cannot be started (some serverless runtimes have no
+working multiprocessing primitives) the batch runs in the calling process.
+"""
+
+import os
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from maze_core import MazeGrid, grid_of
+
+
+# Set in every worker by _init_worker
+_grid = None
+_functions = None
+
+
+def _init_worker(rows, cols, walls, costs, functions):
+    global _grid, _functions
+    _grid = MazeGrid(rows, cols, bytearray(walls), bytearray(costs) if costs is not None else None)
+    _functions = functions
+
+
+def _run_query(grid, functions, algorithm, start, goal, include_paths):
+    explored, path = functions[algorithm](grid, start, goal)
+    result = {
+        'algorithm': algorithm,
+        'start': list(start),
+        'goal': list(goal),
+        'explored_count': len(explored),
+        'path_length': len(path),
+    }
+    if include_paths:
+        result['path'] = [[x, y] for x, y in path]
+    return result
+
+
+def _run_chunk(chunk, include_paths):
+    return [_run_query(_grid, _functions, algorithm, start, goal, include_paths)
+            for algorithm, start, goal in chunk]
+
+
+class BatchRunner:
+    '''
+    Runs batches for one maze at a time on a shared ProcessPoolExecutor.
+    functions--> Mapping algorithm name -> search(maze, start, goal) returning
+                 (explored, path). The callables must be importable module
+                 level functions so they can be sent to the workers.
+    workers-->   Pool size, default os.cpu_count()
+    '''
+
+    def __init__(self, functions, workers=None, chunk_size=64):
+        self.functions = dict(functions)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def _pool_for(self, grid, fingerprint):
+        '''
+        The pool whose workers hold this maze, restarted when the maze changes;
+        fingerprint (MazeGrid.fingerprint) covers the walls and the costs
+        '''
+        with self._lock:
+            if self._pool is None or self._fingerprint != fingerprint:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_init_worker,
+                    initargs=(grid.rows, grid.cols, bytes(grid.walls),
+                              bytes(grid.costs) if grid.costs is not None else None,
+                              self.functions))
+                self._fingerprint = fingerprint
+            return self._pool
+
+    def _reset(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = None
+            self._fingerprint = None
+
+    def run(self, maze, queries, algorithms, include_paths=False, fingerprint=None):
+        '''
+        Run every (start, goal) pair of queries with every algorithm.
+        Results come back in query order, the algorithms of one query next
+        to each other. Raises KeyError for an unknown algorithm and ValueError
+        for a start or goal outside the maze.
+        '''
+        for algorithm in algorithms:
+            if algorithm not in self.functions:
+                raise KeyError(algorithm)
+        grid = grid_of(maze)
+        for query in queries:
+            for cell in query:
+                if cell not in grid:
+                    raise ValueError(f'cell {cell} is outside the maze')
+        jobs = [(algorithm, tuple(start), tuple(goal))
+                for start, goal in queries for algorithm in algorithms]
+        if not jobs:
+            return []
+
+        # Small batches are not worth the round trip to the workers
+        if len(jobs) <= self.chunk_size or self.workers == 1:
+            return [_run_query(grid, self.functions, *job, include_paths) for job in jobs]
+
+        chunks = [jobs[i:i + self.chunk_size] for i in range(0, len(jobs), self.chunk_size)]
+        try:
+            pool = self._pool_for(grid, fingerprint or grid.fingerprint())
+            results = []
+            for part in pool.map(_run_chunk, chunks, [include_paths] * len(chunks)):
+                results.extend(part)
+            return results
+        except (OSError, NotImplementedError, BrokenProcessPool, pickle.PicklingError):
+            self._reset()
+            return [_run_query(grid, self.functions, *job, include_paths) for job in jobs]
+
+
+def parse_queries(data, maze):
+    '''
+    Read the queries of a batch request body on maze. Each query is either
+    {"start": [x, y], "goal": [x, y]} or [[sx, sy], [gx, gy]]; a missing
+    start or goal takes the default, the bottom-right cell / (1, 1).
+    '''
+    grid = grid_of(maze)
+    queries = []
+    for query in data.get('queries', []):
+        if isinstance(query, dict):
+            start, goal = query.get('start', [grid.rows, grid.cols]), query.get('goal', [1, 1])
+        else:
+            start, goal = query
+        queries.append((tuple(int(v) for v in start), tuple(int(v) for v in goal)))
+    return queries
@@ -0,0 +1,175 @@
+"""
+Bidirectional BFS and bidirectional A* over the compact maze grid.
+
+Both searches grow one frontier from the start and one from the goal and
+stop when they meet, so on open grids each side only covers roughly a disc
+of half the path length instead of the full one.
+
+The backward search follows the wall masks of the cells it expands, which
+is only valid because maze walls are symmetric (the E wall of (x, y) is the
+W wall of (x, y+1)), as they are in the CSV mazes.
+
+The explored list interleaves the cells discovered by the two searches in
+the order they were found, so animating it shows both frontiers growing;
+`from_goal` flags which side discovered every explored cell. A cell that
+both searches reach is listed once, so the explored count compares with
+the other algorithms; `forward_count` and `backward_count` are the cells
+each side reached on its own, the cells where they overlap counted twice.
+"""
+
+import heapq
+from array import array
+from collections import namedtuple
+
+from maze_core import grid_of
+from search_state import SearchState
+from astar import manhattan
+
+
+BidirectionalResult = namedtuple('BidirectionalResult', 'explored from_goal path forward_count backward_count')
+
+
+def _join(grid, forward, backward, start_id, goal_id, meet):
+    '''Stitch the start -> meet and meet -> goal halves into one path'''
+    if meet is None:
+        return []
+    head = forward.path_ids(start_id, meet)
+    tail = backward.path_ids(goal_id, meet)
+    tail.reverse()
+    return grid.cells(head + tail[1:])
+
+
+def bidirectional_bfs(maze, start, goal, order='NWSE'):
+    '''
+    Breadth First Search from both ends. The side with the smaller frontier
+    expands one full layer at a time, so the first meeting cell found lies
+    on a shortest path.
+    Returns a BidirectionalResult of (x, y) lists.
+    '''
+    grid = grid_of(maze)
+    walls = grid.walls
+    table = grid.expansion_table(order)
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+
+    if start_id == goal_id:
+        return BidirectionalResult([start], [False], [start], 1, 0)
+
+    forward, backward = SearchState(grid), SearchState(grid)
+    forward.visit(start_id)
+    backward.visit(goal_id)
+    explored, from_goal = [start_id, goal_id], [False, True]
+
+    frontiers = [[start_id], [goal_id]]
+    states = (forward, backward)
+    meet = None
+    while frontiers[0] and frontiers[1] and meet is None:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        state, other = states[side], states[1 - side]
+        layer = []
+        for current in frontiers[side]:
+            for offset in table[walls[current]]:
+                child = current + offset
+                if not state.is_visited(child):
+                    state.visit(child, current)
+                    if other.is_visited(child):
+                        meet = child    # listed already by the other side
+                        break
+                    explored.append(child)
+                    from_goal.append(bool(side))
+                    layer.append(child)
+            if meet is not None:
+                break
+        frontiers[side] = layer
+
+    return BidirectionalResult(grid.cells(explored), from_goal,
+                               _join(grid, forward, backward, start_id, goal_id, meet),
+                               len(forward.order), len(backward.order))
+
+
+class _Side:
+    '''Open list, costs and parents of one direction of bidirectional A*'''
+
+    def __init__(self, grid, root_id, h, from_goal):
+        self.state = SearchState(grid)
+        self.g = array('l', [-1]) * grid.size
+        self.closed = bytearray((grid.size + 7) >> 3)
+        self.h = h
+        self.from_goal = from_goal
+        self.g[root_id] = 0
+        self.state.visit(root_id)
+        self.heap = [(h(root_id), 0, root_id, 0)]
+
+    def is_closed(self, cid):
+        return self.closed[cid >> 3] >> (cid & 7) & 1
+
+    def top(self):
+        '''Drop stale entries and return the smallest live f, or None'''
+        heap = self.heap
+        while heap:
+            _, _, cid, cost = heap[0]
+            if self.is_closed(cid) or cost != self.g[cid]:
+                heapq.heappop(heap)
+            else:
+                return heap[0][0]
+        return None
+
+
+def bidirectional_astar(maze, start, goal, heuristic=manhattan, order='NWSE'):
+    '''
+    A* from both ends with front-to-end heuristics: the forward side
+    estimates the distance to the goal, the backward side the distance to
+    the start. heuristic is a factory (grid, target id) -> h(cell id), as in
+    astar.py, and must be consistent.
+
+    mu is the length of the best start -> goal path seen so far through a
+    cell reached by both sides. The search stops once the smallest f of
+    either open list is at least mu, since no unexplored path can be shorter.
+    Returns a BidirectionalResult of (x, y) lists.
+    '''
+    grid = grid_of(maze)
+    walls = grid.walls
+    table = grid.expansion_table(order)
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    if start_id == goal_id:
+        return BidirectionalResult([start], [False], [start], 1, 0)
+
+    forward = _Side(grid, start_id, heuristic(grid, goal_id), False)
+    backward = _Side(grid, goal_id, heuristic(grid, start_id), True)
+    explored, from_goal = [start_id, goal_id], [False, True]
+    mu, meet = float('inf'), None
+
+    while True:
+        f_forward, f_backward = forward.top(), backward.top()
+        if f_forward is None or f_backward is None:
+            break
+        if f_forward >= mu or f_backward >= mu:
+            break
+        side, other = (forward, backward) if len(forward.heap) <= len(backward.heap) else (backward, forward)
+
+        _, _, current, cost = heapq.heappop(side.heap)
+        side.closed[current >> 3] |= 1 << (current & 7)
+        new_cost = cost + 1
+        for offset in table[walls[current]]:
+            child = current + offset
+            if side.is_closed(child):
+                continue
+            old_cost = side.g[child]
+            if old_cost < 0 or new_cost < old_cost:
+                side.g[child] = new_cost
+                if side.state.is_visited(child):
+                    side.state.set_parent(child, current)
+                else:
+                    side.state.visit(child, current)
+                    if not other.state.is_visited(child):   # else listed by the other side
+                        explored.append(child)
+                        from_goal.append(side.from_goal)
+                heapq.heappush(side.heap, (new_cost + side.h(child), -new_cost, child, new_cost))
+                other_cost = other.g[child]
+                if other_cost >= 0 and new_cost + other_cost < mu:
+                    mu, meet = new_cost + other_cost, child
+
+    return BidirectionalResult(grid.cells(explored), from_goal,
+                               _join(grid, forward.state, backward.state, start_id, goal_id, meet),
+                               len(forward.state.order), len(backward.state.order))
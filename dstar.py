@@ -0,0 +1,175 @@
+"""
+D* Lite incremental replanning for mazes whose walls change.
+
+The planner searches backwards from the goal and keeps its g/rhs values
+and open list between calls. When a wall is opened or closed only the two
+cells on either side of it become inconsistent, and the next plan() call
+repairs the values spreading out from them until the start is consistent
+again. Cells whose distance to the goal did not change are never touched,
+so the cost of an edit follows the size of the affected region instead of
+the size of the maze. The start may also move between calls (the km key
+offset of D* Lite keeps the queued keys valid).
+
+Walls are assumed to be symmetric, so the predecessors of a cell are its
+open neighbours. Edits should go through set_wall(), or be reported with
+walls_changed() when the grid is edited directly.
+"""
+
+import heapq
+from array import array
+
+from maze_core import grid_of, BITS, STEP
+
+
+INF = 1 << 60
+
+
+class DStarLite:
+    '''
+    Incremental shortest path planner from a (movable) start to a fixed goal.
+    maze-->        A MazeGrid or anything maze_core.grid_of accepts; the
+                   planner edits and reads this grid in place
+    start, goal--> (x, y) cells
+    '''
+
+    def __init__(self, maze, start, goal):
+        self.grid = grid_of(maze)
+        self.goal_id = self.grid.cell_id(goal)
+        self.start_id = self.grid.cell_id(start)
+        self._last_id = self.start_id
+        self._table = self.grid.expansion_table('NWSE')
+        size = self.grid.size
+        self.g = array('q', [INF]) * size
+        self.rhs = array('q', [INF]) * size
+        self.km = 0
+        self.expanded = 0  # cells expanded by the last plan() call
+        self._open = {}    # cell id -> current key, heap entries not matching it are stale
+        self._heap = []
+        self._explored = []
+        self.rhs[self.goal_id] = 0
+        self._push(self.goal_id)
+
+    @property
+    def goal(self):
+        return self.grid.cell(self.goal_id)
+
+    @property
+    def start(self):
+        return self.grid.cell(self.start_id)
+
+    def _h(self, cid):
+        '''Manhattan distance between the start and cid'''
+        cols = self.grid.cols
+        x, y = divmod(cid, cols)
+        sx, sy = divmod(self.start_id, cols)
+        return abs(x - sx) + abs(y - sy)
+
+    def _key(self, cid):
+        best = min(self.g[cid], self.rhs[cid])
+        return (best + self._h(cid) + self.km, best)
+
+    def _push(self, cid):
+        key = self._key(cid)
+        self._open[cid] = key
+        heapq.heappush(self._heap, (key, cid))
+
+    def _top_key(self):
+        heap = self._heap
+        while heap and self._open.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else (INF, INF)
+
+    def _update(self, cid):
+        '''Recompute rhs of cid from its open neighbours and requeue it if inconsistent'''
+        g, walls = self.g, self.grid.walls
+        if cid != self.goal_id:
+            best = INF
+            for offset in self._table[walls[cid]]:
+                cost = g[cid + offset]
+                if cost < best:
+                    best = cost
+            self.rhs[cid] = best + 1 if best < INF else INF
+        self._open.pop(cid, None)
+        if g[cid] != self.rhs[cid]:
+            self._push(cid)
+
+    def _compute(self):
+        g, rhs, walls, table = self.g, self.rhs, self.grid.walls, self._table
+        start = self.start_id
+        expanded = 0
+        while (self._top_key() < self._key(start) or rhs[start] != g[start]) and self._heap:
+            old_key, cid = heapq.heappop(self._heap)
+            new_key = self._key(cid)
+            if old_key < new_key:
+                self._open[cid] = new_key
+                heapq.heappush(self._heap, (new_key, cid))
+                continue
+            del self._open[cid]
+            expanded += 1
+            self._explored.append(cid)
+            if g[cid] > rhs[cid]:
+                g[cid] = rhs[cid]
+            else:
+                g[cid] = INF
+                self._update(cid)
+            for offset in table[walls[cid]]:
+                self._update(cid + offset)
+        self.expanded = expanded
+
+    def plan(self, start=None):
+        '''
+        Bring the plan up to date, optionally from a new start cell.
+        Returns the cells expanded by this call (in order) and the path from
+        the start to the goal, both as (x, y) lists. The path is empty if
+        the goal cannot be reached.
+        '''
+        if start is not None:
+            self.start_id = self.grid.cell_id(start)
+            self.km += self._h(self._last_id)
+            self._last_id = self.start_id
+        self._explored = []
+        self._compute()
+        return self.grid.cells(self._explored), self.path()
+
+    def path(self):
+        '''Follow the smallest g values from the start to the goal'''
+        g, walls, table = self.g, self.grid.walls, self._table
+        cid = self.start_id
+        if g[cid] >= INF:
+            return []
+        path = [cid]
+        while cid != self.goal_id:
+            cid = min((cid + offset for offset in table[walls[cid]]), key=g.__getitem__)
+            path.append(cid)
+        return self.grid.cells(path)
+
+    def distance(self):
+        '''Length of the current shortest path in steps, or -1 if unreachable'''
+        cost = self.g[self.start_id]
+        return cost if cost < INF else -1
+
+    def set_wall(self, cell, direction, is_open):
+        '''
+        Open or close the wall on the `direction` side of cell (and the
+        matching wall of the neighbour). Returns False if the wall is on the
+        border of the maze, where nothing can be opened.
+        '''
+        dx, dy = STEP[direction]
+        other = (cell[0] + dx, cell[1] + dy)
+        if other not in self.grid.maze_map:
+            return False
+        self.grid.set_open(cell, direction, is_open)
+        self.walls_changed([cell, other])
+        return True
+
+    def toggle_wall(self, cell, direction):
+        '''Flip one wall; returns whether it is open afterwards, or None on the border'''
+        is_open = not self.grid.walls[self.grid.cell_id(cell)] & BITS[direction]
+        if not self.set_wall(cell, direction, is_open):
+            return None
+        return is_open
+
+    def walls_changed(self, cells):
+        '''Repair the values around cells whose wall masks were edited directly'''
+        for cell in cells:
+            self._update(self.grid.cell_id(cell))
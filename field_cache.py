@@ -0,0 +1,99 @@
+"""
+Goal-rooted distance fields shared between queries.
+
+One reverse BFS from a goal (wavefront.distance_field rooted at the goal)
+gives every cell its distance to the goal and its next hop towards it. With
+the field cached, a shortest path from any start is read off by following
+next hops, in O(path length) and without searching. This relies on the
+maze walls being symmetric, as they are in the CSV mazes.
+
+FieldCache keeps the fields of recently used (maze, goal) pairs under a
+byte budget. When several threads ask for a field that is not cached yet,
+only the first one computes it and the others wait for its result.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from maze_core import grid_of
+from wavefront import distance_field
+
+
+class FieldCache:
+    '''
+    Thread-safe LRU of DistanceField objects keyed by (maze fingerprint, goal id).
+    max_bytes--> Budget for the dist/parent arrays of all cached fields
+                 (5 bytes per cell and field). The most recent field is
+                 always kept, even if it is larger than the budget.
+    '''
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._fields = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def field(self, maze, goal, fingerprint=None):
+        '''
+        The distance field rooted at goal, computed at most once per
+        (maze, goal) while it stays cached.
+        fingerprint--> MazeGrid.fingerprint() of maze, if the caller keeps it
+        '''
+        grid = grid_of(maze)
+        key = (fingerprint or grid.fingerprint(), grid.cell_id(goal))
+        with self._lock:
+            cached = self._fields.get(key)
+            if cached is not None:
+                self._fields.move_to_end(key)
+                self.hits += 1
+                return cached
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+        if not owner:
+            return pending.result()  # another request is already computing it
+
+        try:
+            computed = distance_field(grid, goal)
+        except BaseException as error:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(error)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._store(key, computed)
+        pending.set_result(computed)
+        return computed
+
+    def _store(self, key, computed):
+        self._fields[key] = computed
+        self.nbytes += computed.nbytes
+        while self.nbytes > self.max_bytes and len(self._fields) > 1:
+            _, evicted = self._fields.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def route(self, maze, start, goal, fingerprint=None):
+        '''Shortest path from start to goal as (x, y) tuples, empty if unreachable'''
+        computed = self.field(maze, goal, fingerprint)
+        grid = computed.grid
+        return grid.cells(computed.route_ids(grid.cell_id(start)))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'fields': len(self._fields),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,167 @@
+"""
+A* heuristics as precomputed tables.
+
+The heuristics of astar.py are closures that redo their arithmetic (divmod,
+abs, and a square root for the Euclidean distance) every time A* pushes a
+cell. Here each heuristic is materialized once per goal as a NumPy array
+over all cells instead, built with a handful of vectorized operations, and
+A* looks the estimate of a cell up by its id:
+
+    h = table_heuristic(grid, 'euclidean', goal_id)   # memoryview lookup
+    astar_search(grid, start, goal, heuristic=h)
+
+Every heuristic is registered by name in HEURISTICS, so the searches and
+the API can take the choice as a string:
+
+    manhattan  |dx| + |dy|, exact on an open grid
+    euclidean  the straight line distance
+    octile     max(|dx|, |dy|) + (sqrt(2) - 1) * min(|dx|, |dy|)
+    alt        landmark (ALT) bound through the maze corridors, never below
+               Manhattan (see landmarks.py)
+    zero       no estimate, A* then expands like Dijkstra / BFS
+
+All of them are admissible and consistent for unit steps between the four
+neighbours of a cell.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from maze_core import grid_of
+from landmarks import LandmarkTable, load_or_build
+
+
+# Heuristic of task1.AStar, and of the API when a request does not name one
+DEFAULT_HEURISTIC = 'euclidean'
+
+# API algorithms that take a heuristic
+HEURISTIC_SEARCHES = ('astar', 'bidirectional_astar')
+
+# Landmark tables built for 'alt' when the caller brings none, by maze fingerprint
+LANDMARK_TABLES = 4
+_landmarks = OrderedDict()
+_landmarks_lock = threading.Lock()
+# Maze files by fingerprint, whose landmark tables are saved next to them
+_maze_files = {}
+
+
+def _offsets(grid, goal_id):
+    '''|dx| and |dy| from every cell to goal_id'''
+    gx, gy = divmod(goal_id, grid.cols)
+    ids = np.arange(grid.size, dtype=np.int32)
+    return np.abs(ids // grid.cols - gx), np.abs(ids % grid.cols - gy)
+
+
+def manhattan_table(grid, goal_id, landmarks=None):
+    dx, dy = _offsets(grid, goal_id)
+    return dx + dy
+
+
+def euclidean_table(grid, goal_id, landmarks=None):
+    dx, dy = _offsets(grid, goal_id)
+    # the same float values as math.sqrt, so A* breaks its ties as before
+    return np.sqrt((dx * dx + dy * dy).astype(np.float64))
+
+
+def octile_table(grid, goal_id, landmarks=None):
+    dx, dy = _offsets(grid, goal_id)
+    return np.maximum(dx, dy) + (np.sqrt(2) - 1) * np.minimum(dx, dy)
+
+
+def alt_table(grid, goal_id, landmarks=None):
+    if landmarks is None:
+        landmarks = landmarks_for(grid)
+    return landmarks.heuristic_table(goal_id, base=manhattan_table(grid, goal_id))
+
+
+def zero_table(grid, goal_id, landmarks=None):
+    return np.zeros(grid.size, dtype=np.int32)
+
+
+HEURISTICS = {
+    'manhattan': manhattan_table,
+    'euclidean': euclidean_table,
+    'octile': octile_table,
+    'alt': alt_table,
+    'zero': zero_table,
+}
+
+
+def register_maze_file(maze, maze_path, fingerprint=None):
+    '''
+    Note that maze was loaded from maze_path: landmarks_for then loads its
+    tables from the file next to it (landmarks.load_or_build), and builds
+    and saves them there only if there are none yet. A maze edited since
+    has another fingerprint and gets tables built in memory.
+    '''
+    _maze_files[fingerprint or grid_of(maze).fingerprint()] = maze_path
+
+
+def landmarks_for(maze, fingerprint=None):
+    '''
+    A LandmarkTable of the maze with the default number of landmarks, loaded
+    or built on first use (see register_maze_file) and kept for the
+    LANDMARK_TABLES most recent mazes
+    '''
+    grid = grid_of(maze)
+    key = fingerprint or grid.fingerprint()
+    with _landmarks_lock:
+        table = _landmarks.get(key)
+        if table is not None:
+            _landmarks.move_to_end(key)
+            return table
+    maze_path = _maze_files.get(key)
+    table = load_or_build(grid, maze_path) if maze_path is not None else LandmarkTable.build(grid)
+    with _landmarks_lock:
+        _landmarks[key] = table
+        while len(_landmarks) > LANDMARK_TABLES:
+            _landmarks.popitem(last=False)
+    return table
+
+
+def heuristic_table(maze, name, goal_id, landmarks=None):
+    '''
+    The heuristic called name towards goal_id for every cell, as an array by
+    cell id (int32 for the integer heuristics, float64 otherwise).
+    landmarks--> LandmarkTable of the maze for 'alt'; with any other
+                 heuristic the larger of it and the ALT bound is used
+    Raises ValueError for a name that is not in HEURISTICS.
+    '''
+    grid = grid_of(maze)
+    if name not in HEURISTICS:
+        raise ValueError(f"unknown heuristic {name!r}, expected one of {', '.join(HEURISTICS)}")
+    table = HEURISTICS[name](grid, goal_id, landmarks)
+    if landmarks is not None and name != 'alt':
+        table = landmarks.heuristic_table(goal_id, base=table)
+    return table
+
+
+def table_heuristic(maze, name, goal_id, landmarks=None):
+    '''heuristic_table as the callable cell id -> estimate that the searches take'''
+    # memoryview indexing returns plain ints/floats, much faster than numpy scalars
+    return memoryview(heuristic_table(maze, name, goal_id, landmarks)).__getitem__
+
+
+def heuristic_factory(name, landmarks=None):
+    '''
+    The heuristic called name as a factory (grid, target id) -> h(cell id),
+    as bidirectional.bidirectional_astar takes it
+    '''
+    def factory(grid, target_id):
+        return table_heuristic(grid, name, target_id, landmarks)
+    return factory
+
+
+def heuristic_choice(algorithm, name=None):
+    '''
+    The heuristic an API search runs with: name, or DEFAULT_HEURISTIC if it
+    is None, for the algorithms in HEURISTIC_SEARCHES; None for the others.
+    Raises ValueError for a name that is not in HEURISTICS.
+    '''
+    if name is not None and name not in HEURISTICS:
+        raise ValueError(f"unknown heuristic {name!r}, expected one of {', '.join(HEURISTICS)}")
+    if algorithm not in HEURISTIC_SEARCHES:
+        return None
+    return name or DEFAULT_HEURISTIC
@@ -0,0 +1,460 @@
+"""
+Corridor contraction and a cluster-level (HPA*-style) abstraction for
+large mazes.
+
+Perfect mazes are mostly corridors: cells with exactly two open sides.
+CorridorGraph keeps only the other cells (junctions, dead ends and
+isolated cells) as nodes and replaces every corridor between two of them
+by one weighted edge, remembering for each corridor cell which edge it
+lies on and how far along. Searching this graph touches one entry per
+junction instead of one per cell.
+
+ClusterGraph goes one level higher for very large mazes. The maze is cut
+into square clusters; the nodes that have a corridor edge into another
+cluster become border nodes, and the shortest distance between every two
+border nodes of a cluster (staying inside it) is precomputed. A query then
+only searches:
+
+    start -> border nodes of its cluster (inside that cluster),
+    the border-node graph,
+    border nodes of the goal's cluster -> goal (inside that cluster),
+
+and refines the abstract path back to corridor edges and finally cells.
+Every path decomposes into such pieces, so the result is still a shortest
+path.
+
+Both classes build once and answer `query(start, goal)` with the same
+(explored, path) lists of (x, y) cells as the other searches; explored
+holds the graph nodes that were settled. Walls are assumed to be symmetric.
+"""
+
+import heapq
+from array import array
+
+from maze_core import grid_of
+
+
+_POPCOUNT = tuple(bin(mask).count('1') for mask in range(16))
+_INF = float('inf')
+
+
+def _best_first(sources, targets, neighbors, h=None, best=_INF, allowed=None):
+    '''
+    Dijkstra (or A* with a consistent h) over graph nodes.
+    sources-->   node -> starting cost
+    targets-->   node -> remaining cost from that node to the goal
+    neighbors--> node -> iterable of (node, cost, edge label)
+    allowed-->   Optional node -> bool filter
+    best-->      Cost of a path already known without this search
+    Returns (best cost, node the best path leaves the graph at or None,
+    parent dict node -> (previous node, edge label), settled nodes, costs).
+    '''
+    g = {}
+    parent = {}
+    heap = []
+    for node, cost in sources.items():
+        if cost < g.get(node, _INF):
+            g[node] = cost
+            heap.append(((cost + h(node)) if h else cost, cost, node))
+    heapq.heapify(heap)
+    closed = set()
+    settled = []
+    end = None
+    while heap:
+        f, cost, node = heapq.heappop(heap)
+        if f >= best:
+            break
+        if node in closed or cost != g[node]:
+            continue
+        closed.add(node)
+        settled.append(node)
+        remaining = targets.get(node)
+        if remaining is not None and cost + remaining < best:
+            best, end = cost + remaining, node
+        for other, length, edge in neighbors(node):
+            if allowed is not None and not allowed(other):
+                continue
+            new_cost = cost + length
+            if new_cost < g.get(other, _INF):
+                g[other] = new_cost
+                parent[other] = (node, edge)
+                heapq.heappush(heap, ((new_cost + h(other)) if h else new_cost, new_cost, other))
+    return best, end, parent, settled, g
+
+
+def _chain(parent, node):
+    '''Walk parents back to a source; returns nodes and edge labels in forward order'''
+    nodes, edges = [node], []
+    while node in parent:
+        node, edge = parent[node]
+        nodes.append(node)
+        edges.append(edge)
+    nodes.reverse()
+    edges.reverse()
+    return nodes, edges
+
+
+class CorridorGraph:
+    '''
+    Junction graph of a maze with every corridor contracted to one edge.
+    node_of-->   cell id -> node index, -1 for corridor cells
+    node_cell--> node index -> cell id
+    edge_of, edge_pos--> cell id -> edge index and distance from the edge's
+                 first node, for corridor cells
+    edge_u, edge_v, edge_len, edge_step--> end nodes, length and first id
+                 offset (from edge_u) of every edge
+    adj_start, adj_node, adj_len, adj_edge--> adjacency in CSR form
+    '''
+
+    def __init__(self, maze):
+        grid = grid_of(maze)
+        self.grid = grid
+        walls = grid.walls
+        size = grid.size
+        table = grid.expansion_table('ESWN')
+
+        node_of = array('i', [-1]) * size
+        node_cell = array('i')
+        for cid in range(size):
+            if _POPCOUNT[walls[cid]] != 2:
+                node_of[cid] = len(node_cell)
+                node_cell.append(cid)
+        edge_of = array('i', [-1]) * size
+        edge_pos = array('i', [0]) * size
+        edge_u, edge_v, edge_len, edge_step = array('i'), array('i'), array('i'), array('i')
+
+        def trace(start_cell, step):
+            '''Follow a corridor from a node until the next node'''
+            e = len(edge_len)
+            prev, cur, length = start_cell, start_cell + step, 1
+            while node_of[cur] < 0:
+                edge_of[cur] = e
+                edge_pos[cur] = length
+                a, b = table[walls[cur]]
+                prev, cur = cur, (cur + a if cur + a != prev else cur + b)
+                length += 1
+            edge_u.append(node_of[start_cell])
+            edge_v.append(node_of[cur])
+            edge_len.append(length)
+            edge_step.append(step)
+
+        for node in range(len(node_cell)):
+            cell = node_cell[node]
+            for step in table[walls[cell]]:
+                other = cell + step
+                if node_of[other] >= 0:
+                    if other > cell:          # direct node-node edge, add it once
+                        trace(cell, step)
+                elif edge_of[other] < 0:      # corridor not traced from its other end yet
+                    trace(cell, step)
+        # rings made only of corridor cells have no node; promote one cell each
+        for cid in range(size):
+            if node_of[cid] < 0 and edge_of[cid] < 0:
+                node_of[cid] = len(node_cell)
+                node_cell.append(cid)
+                trace(cid, table[walls[cid]][0])
+
+        self.node_of, self.node_cell = node_of, node_cell
+        self.edge_of, self.edge_pos = edge_of, edge_pos
+        self.edge_u, self.edge_v, self.edge_len, self.edge_step = edge_u, edge_v, edge_len, edge_step
+
+        # CSR adjacency; loops (corridors returning to their own node) never
+        # shorten a path and are left out
+        nodes = len(node_cell)
+        degree = array('i', [0]) * (nodes + 1)
+        for e in range(len(edge_len)):
+            if edge_u[e] != edge_v[e]:
+                degree[edge_u[e] + 1] += 1
+                degree[edge_v[e] + 1] += 1
+        for i in range(nodes):
+            degree[i + 1] += degree[i]
+        adj_start = degree
+        fill = array('i', adj_start[:-1])
+        total = adj_start[-1]
+        adj_node, adj_len, adj_edge = array('i', [0]) * total, array('i', [0]) * total, array('i', [0]) * total
+        for e in range(len(edge_len)):
+            u, v = edge_u[e], edge_v[e]
+            if u == v:
+                continue
+            for a, b in ((u, v), (v, u)):
+                i = fill[a]
+                adj_node[i], adj_len[i], adj_edge[i] = b, edge_len[e], e
+                fill[a] += 1
+        self.adj_start, self.adj_node, self.adj_len, self.adj_edge = adj_start, adj_node, adj_len, adj_edge
+
+    @property
+    def nodes(self):
+        return len(self.node_cell)
+
+    @property
+    def edges(self):
+        return len(self.edge_len)
+
+    def neighbors(self, node):
+        adj_node, adj_len, adj_edge = self.adj_node, self.adj_len, self.adj_edge
+        for i in range(self.adj_start[node], self.adj_start[node + 1]):
+            yield adj_node[i], adj_len[i], adj_edge[i]
+
+    def manhattan_to(self, cid):
+        '''Consistent node heuristic: corridors are never shorter than Manhattan'''
+        cols, node_cell = self.grid.cols, self.node_cell
+        gx, gy = divmod(cid, cols)
+
+        def h(node):
+            x, y = divmod(node_cell[node], cols)
+            return abs(x - gx) + abs(y - gy)
+        return h
+
+    # ---- cells <-> graph ---------------------------------------------------
+    def edge_cells(self, e):
+        '''Cell ids of edge e from edge_u to edge_v, both ends included'''
+        walls, table = self.grid.walls, self.grid.expansion_table('ESWN')
+        prev = self.node_cell[self.edge_u[e]]
+        cur = prev + self.edge_step[e]
+        cells = [prev, cur]
+        for _ in range(self.edge_len[e] - 1):
+            a, b = table[walls[cur]]
+            prev, cur = cur, (cur + a if cur + a != prev else cur + b)
+            cells.append(cur)
+        return cells
+
+    def attachments(self, cid):
+        '''Nodes a cell reaches without passing another node, with distances'''
+        node = self.node_of[cid]
+        if node >= 0:
+            return {node: 0}
+        e, k = self.edge_of[cid], self.edge_pos[cid]
+        u, v, length = self.edge_u[e], self.edge_v[e], self.edge_len[e]
+        found = {u: k}
+        if length - k < found.get(v, _INF):
+            found[v] = length - k
+        return found
+
+    def segment(self, cid, node, cost):
+        '''Cells from cid along its corridor to an attached node (at distance cost)'''
+        if self.node_of[cid] >= 0:
+            return [cid]
+        e, k = self.edge_of[cid], self.edge_pos[cid]
+        cells = self.edge_cells(e)
+        if self.edge_u[e] == node and k == cost:
+            return cells[k::-1]
+        return cells[k:]
+
+    def expand(self, nodes, edges):
+        '''Cells along a chain of nodes joined by the given edges'''
+        cells = [self.node_cell[nodes[0]]]
+        for node, e in zip(nodes[1:], edges):
+            part = self.edge_cells(e)
+            if part[0] != cells[-1]:        # edge stored in the other direction
+                part.reverse()
+            cells.extend(part[1:])
+        return cells
+
+    def direct(self, s, t):
+        '''Distance between two cells of the same corridor, or None'''
+        e = self.edge_of[s]
+        if e >= 0 and e == self.edge_of[t]:
+            return abs(self.edge_pos[s] - self.edge_pos[t])
+        return None
+
+    def direct_cells(self, s, t):
+        cells = self.edge_cells(self.edge_of[s])
+        ks, kt = self.edge_pos[s], self.edge_pos[t]
+        if ks <= kt:
+            return cells[ks:kt + 1]
+        part = cells[kt:ks + 1]
+        part.reverse()
+        return part
+
+    def _stitch(self, s, t, sources, targets, parent, end):
+        '''Cell path s -> (graph path ending at end) -> t'''
+        nodes, edges = _chain(parent, end)
+        cells = self.segment(s, nodes[0], sources[nodes[0]])
+        cells.extend(self.expand(nodes, edges)[1:])
+        tail = self.segment(t, end, targets[end])
+        tail.reverse()
+        cells.extend(tail[1:])
+        return cells
+
+    # ---- queries -----------------------------------------------------------
+    def query(self, start, goal):
+        grid = self.grid
+        s, t = grid.cell_id(start), grid.cell_id(goal)
+        if s == t:
+            return [start], [start]
+        sources, targets = self.attachments(s), self.attachments(t)
+        direct = self.direct(s, t)
+        best = _INF if direct is None else direct
+        cost, end, parent, settled, _ = _best_first(sources, targets, self.neighbors,
+                                                    self.manhattan_to(t), best)
+        explored = grid.cells(self.node_cell[n] for n in settled)
+        if end is None:
+            path = self.direct_cells(s, t) if direct is not None else []
+        else:
+            path = self._stitch(s, t, sources, targets, parent, end)
+        return explored, grid.cells(path)
+
+
+class ClusterGraph:
+    '''
+    Border-node abstraction of a CorridorGraph over square clusters.
+    cluster_size--> Side of a cluster in cells
+    cluster_of-->   node index -> cluster index
+    border-->       node index -> list of abstract (node, cost, label) edges;
+                    the label is a corridor edge index for edges between
+                    clusters and -1 for precomputed distances inside one
+    '''
+
+    def __init__(self, corridors, cluster_size=64):
+        self.corridors = corridors
+        self.cluster_size = cluster_size
+        grid = corridors.grid
+        cols, node_cell = grid.cols, corridors.node_cell
+        clusters_per_row = (grid.cols + cluster_size - 1) // cluster_size
+        cluster_of = array('i', [0]) * corridors.nodes
+        for node in range(corridors.nodes):
+            x, y = divmod(node_cell[node], cols)
+            cluster_of[node] = (x // cluster_size) * clusters_per_row + y // cluster_size
+        self.cluster_of = cluster_of
+
+        border = {}
+        members = {}
+        for e in range(corridors.edges):
+            u, v = corridors.edge_u[e], corridors.edge_v[e]
+            if cluster_of[u] != cluster_of[v]:
+                length = corridors.edge_len[e]
+                border.setdefault(u, []).append((v, length, e))
+                border.setdefault(v, []).append((u, length, e))
+        for node in border:
+            members.setdefault(cluster_of[node], []).append(node)
+        self.members = members
+
+        # distances between the border nodes of each cluster, inside it
+        for cluster, nodes in members.items():
+            inside = self._inside(cluster)
+            for i, node in enumerate(nodes):
+                others = {other: 0 for other in nodes[i + 1:]}
+                if not others:
+                    continue
+                _, _, _, _, cost = _best_first({node: 0}, {}, corridors.neighbors, allowed=inside)
+                for other in others:
+                    d = cost.get(other)
+                    if d is not None:
+                        border[node].append((other, d, -1))
+                        border[other].append((node, d, -1))
+        self.border = border
+
+    def _inside(self, cluster):
+        cluster_of = self.cluster_of
+        return lambda node: cluster_of[node] == cluster
+
+    def _neighbors(self, node):
+        return self.border.get(node, ())
+
+    def _local(self, sources, extra_targets):
+        '''
+        Dijkstra from sources restricted to each source's cluster. Returns the
+        cost to every border node reached, the cost to extra_targets, and the
+        parents for refinement.
+        '''
+        corridors = self.corridors
+        reached, parents = {}, {}
+        best, end = _INF, None
+        by_cluster = {}
+        for node, cost in sources.items():
+            by_cluster.setdefault(self.cluster_of[node], {})[node] = cost
+        for cluster, group in by_cluster.items():
+            targets = {n: c for n, c in extra_targets.items() if self.cluster_of[n] == cluster}
+            found, last, parent, _, cost = _best_first(group, targets, corridors.neighbors,
+                                                       allowed=self._inside(cluster))
+            parents[cluster] = parent
+            if found < best:
+                best, end = found, (cluster, last)
+            for node in self.members.get(cluster, ()):
+                if node in cost and cost[node] < reached.get(node, (_INF,))[0]:
+                    reached[node] = (cost[node], cluster)
+        return reached, parents, best, end
+
+    def _local_chain(self, parents, cluster, node):
+        return _chain(parents[cluster], node)
+
+    def query(self, start, goal):
+        corridors = self.corridors
+        grid = corridors.grid
+        s, t = grid.cell_id(start), grid.cell_id(goal)
+        if s == t:
+            return [start], [start]
+        s_attach, t_attach = corridors.attachments(s), corridors.attachments(t)
+
+        # start side: into the border of the start clusters (or straight to the goal)
+        out, out_parents, inside_best, inside_end = self._local(s_attach, t_attach)
+        # goal side: the same search run from the goal (walls are symmetric)
+        into, into_parents, _, _ = self._local(t_attach, {})
+
+        direct = corridors.direct(s, t)
+        best = _INF if direct is None else direct
+        mode = 'direct' if direct is not None else None
+        if inside_best < best:
+            best, mode = inside_best, 'inside'
+
+        sources = {node: cost for node, (cost, _) in out.items()}
+        targets = {node: cost for node, (cost, _) in into.items()}
+        h = corridors.manhattan_to(t)
+        cost, end, parent, settled, _ = _best_first(sources, targets, self._neighbors, h, best)
+        if end is not None:
+            mode = 'abstract'
+        explored = grid.cells(corridors.node_cell[n] for n in settled)
+
+        if mode is None:
+            return explored, []
+        if mode == 'direct':
+            return explored, grid.cells(corridors.direct_cells(s, t))
+        if mode == 'inside':
+            cluster, last = inside_end
+            nodes, edges = self._local_chain(out_parents, cluster, last)
+            return explored, grid.cells(self._cells(s, t, s_attach, t_attach, nodes, edges))
+
+        # start -> first border node, inside the start cluster
+        nodes, edges = _chain(parent, end)
+        head_nodes, head_edges = self._local_chain(out_parents, out[nodes[0]][1], nodes[0])
+        chain_nodes, chain_edges = head_nodes, head_edges
+        # abstract edges: corridor edges between clusters, or refined inside one
+        for node, label in zip(nodes[1:], edges):
+            if label >= 0:
+                chain_nodes.append(node)
+                chain_edges.append(label)
+            else:
+                prev = chain_nodes[-1]
+                _, _, local_parent, _, _ = _best_first({prev: 0}, {node: 0}, corridors.neighbors,
+                                                       allowed=self._inside(self.cluster_of[prev]))
+                more_nodes, more_edges = _chain(local_parent, node)
+                chain_nodes.extend(more_nodes[1:])
+                chain_edges.extend(more_edges)
+        # last border node -> goal, inside the goal cluster (walked backwards)
+        tail_nodes, tail_edges = self._local_chain(into_parents, into[end][1], end)
+        tail_nodes.reverse()
+        tail_edges.reverse()
+        chain_nodes.extend(tail_nodes[1:])
+        chain_edges.extend(tail_edges)
+        return explored, grid.cells(self._cells(s, t, s_attach, t_attach, chain_nodes, chain_edges))
+
+    def _cells(self, s, t, s_attach, t_attach, nodes, edges):
+        corridors = self.corridors
+        cells = corridors.segment(s, nodes[0], s_attach[nodes[0]])
+        cells.extend(corridors.expand(nodes, edges)[1:])
+        tail = corridors.segment(t, nodes[-1], t_attach[nodes[-1]])
+        tail.reverse()
+        cells.extend(tail[1:])
+        return cells
+
+
+def build_hierarchy(maze, cluster_size=64, cluster_threshold=250000):
+    '''
+    One-time build for path queries on a fixed maze: a CorridorGraph, with
+    a ClusterGraph on top once the maze has at least cluster_threshold cells.
+    Both answer query(start, goal) -> (explored, path).
+    '''
+    corridors = CorridorGraph(maze)
+    if corridors.grid.size >= cluster_threshold:
+        return ClusterGraph(corridors, cluster_size)
+    return corridors
@@ -0,0 +1,89 @@
+"""
+Import-time budget for the web entry points.
+
+Every entry point is imported in a fresh interpreter (a cold start, as on a
+serverless deploy) and the time it takes is compared with its budget. The
+script also fails if an entry point pulls in a module that has no place in
+a headless web worker, such as tkinter or matplotlib, and lists the slowest
+imports (from python -X importtime) to show where the time goes.
+
+    python import_budget.py             # exit status 1 if over budget
+    python import_budget.py --top 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# entry point -> (directory added to sys.path, module name, budget in seconds)
+ENTRY_POINTS = {
+    'app.py': (ROOT, 'app', 1.0),
+    'api/index.py': (os.path.join(ROOT, 'api'), 'index', 1.0),
+    'api/algorithm.py': (os.path.join(ROOT, 'api'), 'algorithm', 1.0),
+}
+
+# Modules a web worker must never import
+FORBIDDEN = ('tkinter', 'matplotlib')
+
+_PROBE = '''
+import sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *[m for m in {forbidden!r} if m in sys.modules])
+'''
+
+
+def measure(path, module):
+    '''
+    Import module in a fresh interpreter. Returns the import time in
+    seconds, the forbidden modules it loaded and the -X importtime report.
+    '''
+    probe = _PROBE.format(path=path, module=module, forbidden=FORBIDDEN)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{result.stderr[-2000:]}')
+    elapsed, *loaded = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), loaded, result.stderr
+
+
+def slowest(report, top):
+    '''The top (cumulative microseconds, module) pairs of an importtime report'''
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold import time of the web entry points")
+    parser.add_argument("--top", type=int, default=8, help="Number of slowest imports to list")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args()
+
+    failed = False
+    for name, (path, module, budget) in ENTRY_POINTS.items():
+        budget *= args.scale
+        elapsed, loaded, report = measure(path, module)
+        ok = elapsed <= budget and not loaded
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {elapsed:.3f}s (budget {budget:.3f}s)")
+        if loaded:
+            print(f"     imports {', '.join(loaded)}")
+        for cumulative, imported in slowest(report, args.top):
+            print(f"     {cumulative / 1e6:7.3f}s  {imported}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Jump Point Search for uniform-cost, 4-connected mazes.
+
+Walls sit between cells (the E/W/N/S bits of maze_core), so the pruning
+rules are phrased in terms of open edges. Among all shortest paths the
+search only follows "horizontal first" ones: a path that steps vertically
+from p to c and then horizontally from c to e is skipped whenever the
+equally long p -> p+h -> e detour is open, because that detour makes the
+horizontal step earlier. What is left:
+
+    * moving horizontally, the search may turn north or south at any cell,
+    * moving vertically, it keeps going straight and only turns where a
+      horizontal move is forced (its horizontal-first detour is walled off).
+
+Straight runs are scanned cell by cell without touching the heap, and only
+the cells where something can change (the goal, forced turns, and the
+cells of a horizontal run from which a vertical scan finds such a cell)
+become jump points. On open arenas this pushes a handful of cells instead
+of nearly the whole grid.
+
+The explored list holds the jump points in the order they were found; the
+path is expanded back to every cell between consecutive jump points.
+"""
+
+import heapq
+
+from maze_core import grid_of, E, W, N, S
+
+
+# Direction indices used in the search states; START has no direction yet
+_E, _W, _N, _S, _START = range(5)
+
+
+def jump_point_search(maze, start, goal, stats=None):
+    '''
+    A* over jump points with the Manhattan heuristic.
+    maze-->        A MazeGrid or anything maze_core.grid_of accepts
+    start, goal--> (x, y) cells
+    stats-->       Optional dict that receives pushed/expanded counters
+    Returns the jump points (in discovery order) and the full cell path,
+    both as lists of (x, y) tuples. The path is empty if the goal is
+    unreachable.
+    '''
+    grid = grid_of(maze)
+    walls = grid.walls
+    cols = grid.cols
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    gx, gy = divmod(goal_id, cols)
+
+    def h(cid):
+        x, y = divmod(cid, cols)
+        return abs(x - gx) + abs(y - gy)
+
+    def forced(cur, prev, vbit):
+        '''Is a horizontal turn at cur forced after a vertical step from prev?'''
+        m, pm = walls[cur], walls[prev]
+        return ((m & E and not (pm & E and walls[prev + 1] & vbit)) or
+                (m & W and not (pm & W and walls[prev - 1] & vbit)))
+
+    def jump_vertical(cur, vbit, voff):
+        while walls[cur] & vbit:
+            prev, cur = cur, cur + voff
+            if cur == goal_id or forced(cur, prev, vbit):
+                return cur
+        return None
+
+    def jump_horizontal(cur, hbit, hoff):
+        while walls[cur] & hbit:
+            cur += hoff
+            if cur == goal_id:
+                return cur
+            if jump_vertical(cur, N, -cols) is not None or jump_vertical(cur, S, cols) is not None:
+                return cur
+        return None
+
+    horizontal = {_E: (E, 1), _W: (W, -1)}
+    vertical = {_N: (N, -cols), _S: (S, cols)}
+
+    def successors(cid, direction):
+        '''Jump points reachable from a state, as (cell id, direction) pairs'''
+        if direction == _START:
+            moves = (_E, _W, _N, _S)
+        elif direction in horizontal:
+            moves = (direction, _N, _S)
+        else:
+            vbit, voff = vertical[direction]
+            moves = [direction]
+            prev = cid - voff
+            m, pm = walls[cid], walls[prev]
+            if m & E and not (pm & E and walls[prev + 1] & vbit):
+                moves.append(_E)
+            if m & W and not (pm & W and walls[prev - 1] & vbit):
+                moves.append(_W)
+        for move in moves:
+            if move in horizontal:
+                found = jump_horizontal(cid, *horizontal[move])
+            else:
+                found = jump_vertical(cid, *vertical[move])
+            if found is not None:
+                yield found, move
+
+    # States are cell * 5 + direction, since the successors depend on how
+    # a jump point was entered. Jump points are sparse, so dicts are used.
+    start_state = start_id * 5 + _START
+    g = {start_state: 0}
+    parent = {start_state: None}
+    closed = set()
+    seen = {start_id}
+    explored = [start_id]
+    heap = [(h(start_id), 0, start_state)]
+    pushed, expanded = 1, 0
+    end_state = None
+
+    while heap:
+        _, neg_cost, state = heapq.heappop(heap)
+        if state in closed or -neg_cost != g[state]:
+            continue
+        cid, direction = divmod(state, 5)
+        if cid == goal_id:
+            end_state = state
+            break
+        closed.add(state)
+        expanded += 1
+        cost = -neg_cost
+        for child, move in successors(cid, direction):
+            child_state = child * 5 + move
+            if child_state in closed:
+                continue
+            steps = abs(child - cid) if move in horizontal else abs(child - cid) // cols
+            new_cost = cost + steps
+            if new_cost < g.get(child_state, new_cost + 1):
+                g[child_state] = new_cost
+                parent[child_state] = state
+                heapq.heappush(heap, (new_cost + h(child), -new_cost, child_state))
+                pushed += 1
+                if child not in seen:
+                    seen.add(child)
+                    explored.append(child)
+
+    if stats is not None:
+        stats.update(pushed=pushed, expanded=expanded)
+
+    path = []
+    if end_state is not None:
+        jump_points = []
+        while end_state is not None:
+            jump_points.append(end_state // 5)
+            end_state = parent[end_state]
+        jump_points.reverse()
+        path = [start_id]
+        for a, b in zip(jump_points, jump_points[1:]):
+            step = (1 if b > a else -1) if a // cols == b // cols else (cols if b > a else -cols)
+            path.extend(range(a + step, b + step, step))
+
+    return grid.cells(explored), grid.cells(path)
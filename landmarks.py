@@ -0,0 +1,163 @@
+"""
+Landmark (ALT) heuristic for A* on fixed mazes.
+
+A one-time preprocessing step picks K landmark cells spread over the maze
+(farthest-point selection) and stores the BFS distance from every landmark
+to every cell. For any cell v and goal g the triangle inequality gives
+
+    d(v, g) >= |d(L, g) - d(L, v)|
+
+for every landmark L, and the maximum over the landmarks is an admissible
+and consistent A* heuristic that follows the corridors of the maze instead
+of the straight line. Walls are assumed to be symmetric, as in the CSV mazes.
+
+The tables are compact (uint16, or uint32 for very long mazes) and can be
+saved next to the maze file, e.g. maze_config.csv.alt.npz:
+
+    python landmarks.py maze_config.csv -k 8
+
+The web apps and task1 load them from there the first time an 'alt' search
+needs them, and build and save them if the file is missing or outdated
+(load_or_build, through heuristics.register_maze_file).
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from maze_core import MazeGrid, grid_of
+from wavefront import distance_field
+
+
+def landmark_path(maze_path):
+    '''Where the landmark tables of a maze file are stored'''
+    return maze_path + '.alt.npz'
+
+
+def select_landmarks(maze, k, seed=(1, 1)):
+    '''
+    Pick up to k landmark ids by farthest-point selection: start from the
+    cell farthest from seed, then repeatedly add the cell farthest from all
+    landmarks chosen so far. Returns the ids and their BFS distance arrays.
+    '''
+    grid = grid_of(maze)
+    dist = distance_field(grid, seed).dist
+    landmarks, fields = [], []
+    nearest = dist
+    while len(landmarks) < k:
+        candidate = int(np.argmax(nearest))
+        if landmarks and nearest[candidate] <= 0:
+            break  # every reachable cell already is a landmark
+        field = distance_field(grid, grid.cell(candidate)).dist
+        landmarks.append(candidate)
+        fields.append(field)
+        # unreachable cells stay at -1 and are never picked
+        nearest = field if len(landmarks) == 1 else np.minimum(nearest, field)
+    return landmarks, fields
+
+
+class LandmarkTable:
+    '''
+    BFS distances from K landmarks to every cell of one maze.
+    landmarks-->   Landmark cell ids
+    distances-->   (K, rows*cols) uint16/uint32 array, `sentinel` where a
+                   cell cannot be reached from the landmark
+    fingerprint--> MazeGrid.fingerprint() of the maze the table belongs to
+    '''
+
+    def __init__(self, rows, cols, landmarks, distances, fingerprint):
+        self.rows = rows
+        self.cols = cols
+        self.landmarks = [int(l) for l in landmarks]
+        self.distances = distances
+        self.fingerprint = fingerprint
+        self.sentinel = int(np.iinfo(distances.dtype).max)
+
+    @classmethod
+    def build(cls, maze, k=8, seed=(1, 1)):
+        grid = grid_of(maze)
+        landmarks, fields = select_landmarks(grid, k, seed)
+        longest = max(int(f.max()) for f in fields)
+        dtype = np.uint16 if longest < np.iinfo(np.uint16).max else np.uint32
+        sentinel = np.iinfo(dtype).max
+        distances = np.empty((len(fields), grid.size), dtype=dtype)
+        for row, field in zip(distances, fields):
+            row[:] = np.where(field < 0, sentinel, field)
+        return cls(grid.rows, grid.cols, landmarks, distances, grid.fingerprint())
+
+    def save(self, path):
+        # write through a file object so numpy does not append another .npz
+        with open(path, 'wb') as f:
+            np.savez(f, rows=self.rows, cols=self.cols, landmarks=np.array(self.landmarks),
+                     distances=self.distances, fingerprint=self.fingerprint)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(int(data['rows']), int(data['cols']), data['landmarks'],
+                       data['distances'], str(data['fingerprint']))
+
+    def matches(self, maze):
+        '''True if the table was built for exactly this maze'''
+        return self.fingerprint == grid_of(maze).fingerprint()
+
+    def heuristic_table(self, goal_id, base=None):
+        '''
+        The ALT heuristic towards goal_id for every cell at once, as an array
+        by cell id (int32, or float64 with a float base). With base (an array
+        of another admissible heuristic) the larger of the two is used.
+        '''
+        if base is None:
+            best = np.zeros(self.rows * self.cols, dtype=np.int32)
+        else:
+            best = np.asarray(base)
+        for row in self.distances:
+            goal_distance = int(row[goal_id])
+            if goal_distance == self.sentinel:
+                continue
+            diff = np.abs(row.astype(np.int32) - goal_distance)
+            best = np.maximum(best, np.where(row == self.sentinel, 0, diff))
+        return best
+
+    @property
+    def nbytes(self):
+        return self.distances.nbytes
+
+
+def load_or_build(maze, maze_path, k=8):
+    '''
+    Load the landmark tables saved next to maze_path, or build and save
+    them if there are none yet or they belong to a different maze.
+    '''
+    grid = grid_of(maze)
+    path = landmark_path(maze_path)
+    if os.path.exists(path):
+        try:
+            table = LandmarkTable.load(path)
+            if table.matches(grid):
+                return table
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable or outdated file, rebuild it
+    table = LandmarkTable.build(grid, k)
+    try:
+        table.save(path)
+    except OSError:
+        pass  # read-only deploys still get the in-memory table
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute ALT landmark tables for a maze CSV")
+    parser.add_argument("maze", help="Maze CSV file, e.g. maze_config.csv")
+    parser.add_argument("-k", "--landmarks", type=int, default=8, help="Number of landmarks")
+    args = parser.parse_args()
+
+    grid = MazeGrid.from_csv(args.maze)
+    table = LandmarkTable.build(grid, args.landmarks)
+    table.save(landmark_path(args.maze))
+    print(f"Saved {len(table.landmarks)} landmarks ({table.nbytes} bytes) to {landmark_path(args.maze)}")
+
+
+if __name__ == "__main__":
+    main()
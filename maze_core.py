@@ -0,0 +1,288 @@
+"""
+Compact maze core shared by the Tk maze, the web mazes and the searches.
+
+Walls are stored as one byte per cell in a flat bytearray. Every byte holds
+a 4-bit mask of the directions that are open from that cell (E, W, N, S) and
+cells are addressed by an integer id:
+
+    id = (x - 1) * cols + (y - 1)
+
+for the 1-based (x, y) cells used everywhere else in the project (x is the
+row, y is the column). Sorting ids therefore sorts cells the same way as
+sorting the (x, y) tuples.
+
+`MazeGrid.maze_map` is a read-only view that behaves like the old
+dict-of-dicts maze_map, so code doing `maze.maze_map[cell]['E']` keeps
+working without one dictionary being allocated per cell.
+"""
+
+import csv
+import hashlib
+from collections.abc import Mapping
+from types import MappingProxyType
+
+
+# Direction bits of the wall mask (a set bit means the direction is open)
+E, W, N, S = 1, 2, 4, 8
+DIRECTIONS = ('E', 'W', 'N', 'S')
+BITS = {'E': E, 'W': W, 'N': N, 'S': S}
+OPPOSITE = {'E': 'W', 'W': 'E', 'N': 'S', 'S': 'N'}
+# (dx, dy) for a step in every direction, the same moves task1.py makes
+STEP = {'E': (0, 1), 'W': (0, -1), 'N': (-1, 0), 'S': (1, 0)}
+
+# One shared read-only {'E','W','N','S'} -> 0/1 mapping per possible mask, so
+# indexing the maze_map view never allocates.
+_MASK_VIEWS = tuple(
+    MappingProxyType({d: 1 if mask & BITS[d] else 0 for d in DIRECTIONS})
+    for mask in range(16)
+)
+
+
+def mask_from_flags(e, w, n, s):
+    '''Build a wall mask from four truthy E, W, N, S flags'''
+    return (E if e else 0) | (W if w else 0) | (N if n else 0) | (S if s else 0)
+
+
+class MazeMapView(Mapping):
+    '''
+    Read-only maze_map compatible view over a MazeGrid.
+    Keys are (x, y) cells, values are {'E','W','N','S'} -> 0/1 mappings.
+    Iteration follows the column-major order of maze.grid and the CSV files.
+    '''
+    __slots__ = ('_grid',)
+
+    def __init__(self, grid):
+        self._grid = grid
+
+    def __getitem__(self, cell):
+        grid = self._grid
+        try:
+            x, y = cell
+        except (TypeError, ValueError):
+            raise KeyError(cell) from None
+        if not (1 <= x <= grid.rows and 1 <= y <= grid.cols):
+            raise KeyError(cell)
+        return _MASK_VIEWS[grid.walls[(x - 1) * grid.cols + (y - 1)]]
+
+    def __contains__(self, cell):
+        try:
+            x, y = cell
+            return 1 <= x <= self._grid.rows and 1 <= y <= self._grid.cols
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        rows, cols = self._grid.rows, self._grid.cols
+        for y in range(1, cols + 1):
+            for x in range(1, rows + 1):
+                yield (x, y)
+
+    def __len__(self):
+        return self._grid.size
+
+
+class MazeGrid:
+    '''
+    A rows x cols maze stored as a flat bytearray of wall masks.
+    rows, cols--> Dimensions of the maze
+    walls-->      Optional bytes-like object (bytearray, memoryview, NumPy
+                  uint8 array) with one mask per cell in id order. It is used
+                  as-is, without copying.
+    costs-->      Optional bytes-like object of the same layout holding the
+                  cost (1..255) of entering every cell, for weighted terrain
+                  (see terrain.py). None means every step costs 1.
+    '''
+
+    def __init__(self, rows, cols, walls=None, costs=None):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        if walls is None:
+            walls = bytearray(self.size)
+        elif len(walls) != self.size:
+            raise ValueError(f'expected {self.size} wall masks, got {len(walls)}')
+        if costs is not None and len(costs) != self.size:
+            raise ValueError(f'expected {self.size} cell costs, got {len(costs)}')
+        self.walls = walls
+        self.costs = costs
+        self.maze_map = MazeMapView(self)
+        self._offsets = {'E': 1, 'W': -1, 'N': -cols, 'S': cols}
+        self._tables = {}
+
+    # ---- cell ids -------------------------------------------------------
+    def cell_id(self, cell):
+        '''Id of an (x, y) cell; raises ValueError for a cell outside the maze'''
+        x, y = cell
+        if not (1 <= x <= self.rows and 1 <= y <= self.cols):
+            raise ValueError(f'cell {cell} is outside the {self.rows}x{self.cols} maze')
+        return (x - 1) * self.cols + (y - 1)
+
+    def cell(self, cid):
+        x, y = divmod(cid, self.cols)
+        return (x + 1, y + 1)
+
+    def cells(self, ids):
+        '''Convert an iterable of cell ids back to (x, y) tuples'''
+        cols = self.cols
+        return [(cid // cols + 1, cid % cols + 1) for cid in ids]
+
+    def __contains__(self, cell):
+        return cell in self.maze_map
+
+    # ---- walls ----------------------------------------------------------
+    def mask(self, cell):
+        return int(self.walls[self.cell_id(cell)])
+
+    def is_open(self, cell, direction):
+        return bool(self.walls[self.cell_id(cell)] & BITS[direction])
+
+    def set_mask(self, cell, mask):
+        '''
+        Set the open directions of one cell. Directions leading out of the
+        maze are dropped so an open bit always points at a real cell.
+        '''
+        x, y = cell
+        mask = int(mask)
+        if x == 1:
+            mask &= ~N
+        if x == self.rows:
+            mask &= ~S
+        if y == 1:
+            mask &= ~W
+        if y == self.cols:
+            mask &= ~E
+        self.walls[self.cell_id(cell)] = mask
+
+    def set_open(self, cell, direction, is_open=True, both_sides=True):
+        '''
+        Open or close one wall. With both_sides the matching wall of the
+        neighbouring cell is updated as well.
+        '''
+        bit = BITS[direction]
+        mask = self.mask(cell)
+        self.set_mask(cell, mask | bit if is_open else mask & ~bit)
+        if both_sides:
+            dx, dy = STEP[direction]
+            other = (cell[0] + dx, cell[1] + dy)
+            if other in self.maze_map:
+                obit = BITS[OPPOSITE[direction]]
+                omask = self.mask(other)
+                self.set_mask(other, omask | obit if is_open else omask & ~obit)
+
+    # ---- terrain costs --------------------------------------------------
+    def cost(self, cell):
+        '''Cost of entering cell, 1 on a maze without terrain'''
+        return 1 if self.costs is None else int(self.costs[self.cell_id(cell)])
+
+    def set_cost(self, cell, cost):
+        '''Set the cost of entering one cell; adds a cost layer of 1s if missing'''
+        if not 1 <= cost <= 255:
+            raise ValueError(f'cell costs range from 1 to 255, got {cost}')
+        if self.costs is None:
+            self.costs = bytearray(b'\x01') * self.size
+        self.costs[self.cell_id(cell)] = cost
+
+    # ---- neighbour expansion ---------------------------------------------
+    def expansion_table(self, order='NWSE'):
+        '''
+        Return a 16-entry table mapping a wall mask to the id offsets of the
+        open neighbours, listed in the given direction order. Expanding a
+        cell is then a single lookup:
+
+            for offset in table[walls[cid]]:
+                child = cid + offset
+        '''
+        table = self._tables.get(order)
+        if table is None:
+            offsets = self._offsets
+            table = tuple(
+                tuple(offsets[d] for d in order if mask & BITS[d])
+                for mask in range(16)
+            )
+            self._tables[order] = table
+        return table
+
+    def neighbors(self, cid, order='NWSE'):
+        return [cid + offset for offset in self.expansion_table(order)[self.walls[cid]]]
+
+    # ---- conversions ------------------------------------------------------
+    @classmethod
+    def from_maze_map(cls, maze_map, rows=None, cols=None):
+        '''Build a grid from a dict-of-dicts maze_map'''
+        if rows is None:
+            rows = max(x for x, _ in maze_map)
+        if cols is None:
+            cols = max(y for _, y in maze_map)
+        grid = cls(rows, cols)
+        for cell, walls in maze_map.items():
+            if cell in grid.maze_map:
+                grid.set_mask(cell, mask_from_flags(walls['E'], walls['W'], walls['N'], walls['S']))
+        return grid
+
+    @classmethod
+    def from_csv(cls, path, validate=True):
+        '''
+        Load a maze from a CSV file in the `cell,E,W,N,S` layout of
+        maze_config.csv (optionally with a cost column), with the streaming
+        loader of maze_csv.py.
+        '''
+        from maze_csv import load_csv  # maze_csv builds on this module
+        grid = load_csv(path, validate)
+        if cls is not MazeGrid:
+            grid = cls(grid.rows, grid.cols, grid.walls, grid.costs)
+        return grid
+
+    def to_csv(self, path):
+        '''
+        Write the maze in the `cell,E,W,N,S` layout of maze_config.csv, with a
+        sixth `cost` column if the maze has terrain costs
+        '''
+        walls, costs, cols = self.walls, self.costs, self.cols
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['  cell  ', 'E', 'W', 'N', 'S'] + (['cost'] if costs is not None else []))
+            for y in range(1, cols + 1):
+                for x in range(1, self.rows + 1):
+                    cid = (x - 1) * cols + (y - 1)
+                    mask = walls[cid]
+                    row = [f'({x}, {y})', mask & E and 1, mask & W and 1,
+                           mask & N and 1, mask & S and 1]
+                    if costs is not None:
+                        row.append(costs[cid])
+                    writer.writerow(row)
+
+    def fingerprint(self):
+        '''Content hash of the dimensions, walls and costs, e.g. to key caches'''
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f'{self.rows}x{self.cols}:'.encode())
+        h.update(memoryview(self.walls).cast('B'))
+        if self.costs is not None:
+            h.update(b'costs:')
+            h.update(memoryview(self.costs).cast('B'))
+        return h.hexdigest()
+
+    def to_numpy(self):
+        '''Zero-copy (rows, cols) NumPy uint8 view of the wall masks'''
+        import numpy as np
+        return np.frombuffer(self.walls, dtype=np.uint8).reshape(self.rows, self.cols)
+
+    @property
+    def nbytes(self):
+        return len(self.walls)
+
+
+def grid_of(maze):
+    '''
+    Return the MazeGrid behind any maze-like object: a MazeGrid itself, an
+    object exposing one as `core` (maze, WebMaze), or anything with a plain
+    dict maze_map (converted on every call, so edits to the dict are seen).
+    '''
+    if isinstance(maze, MazeGrid):
+        return maze
+    core = getattr(maze, 'core', None)
+    if isinstance(core, MazeGrid):
+        return core
+    maze_map = maze.maze_map
+    if isinstance(maze_map, MazeMapView):
+        return maze_map._grid
+    return MazeGrid.from_maze_map(maze_map, getattr(maze, 'rows', None), getattr(maze, 'cols', None))
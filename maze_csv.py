@@ -0,0 +1,198 @@
+"""
+Single-pass streaming loader for mazes in the `cell,E,W,N,S` CSV layout.
+
+The file is read once, in blocks of about 1MB. Every block is parsed as a
+whole with NumPy: the runs of digits are located and their values built
+with a handful of vectorized passes, six numbers per line (x, y, E, W, N,
+S). There is no per-row `csv`/`split`/`strip` work and memory use does not
+grow with the file beyond the wall masks themselves (one byte per cell).
+
+Terrain mazes carry a seventh number per line, the cost of entering the
+cell (`cell,E,W,N,S,cost`, 1..255). It is loaded into MazeGrid.costs, one
+more byte per cell, and used by the weighted searches of terrain.py.
+
+Rows and columns are inferred while reading. Files written column by
+column, like maze_config.csv ("(1, 1)", "(2, 1)", ...), are appended in
+file order and transposed once at the end; files in any other order are
+placed by their coordinates instead. The loaded walls are then checked for
+symmetry: the E wall of (x, y) must match the W wall of (x, y+1) and the S
+wall of (x, y) the N wall of (x+1, y).
+"""
+
+import numpy as np
+
+from maze_core import MazeGrid, E, W, N, S
+
+
+_BLOCK = 1 << 20
+
+
+def _blocks(f):
+    '''Yield blocks of whole lines; the header line is skipped'''
+    f.readline()
+    tail = b''
+    while True:
+        data = f.read(_BLOCK)
+        if not data:
+            if tail:
+                yield tail
+            return
+        data = tail + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            tail = data
+            continue
+        tail = data[cut:]
+        yield data[:cut]
+
+
+def _parse(block, columns=None):
+    '''
+    x, y, wall mask and cost arrays of the rows in one block. Every non-empty
+    line must hold six numbers, "(x, y)",E,W,N,S, or seven with a cost.
+    columns--> Numbers per line; None takes it from the first line
+    Returns the number of columns as well; costs is None with six.
+    '''
+    data = np.frombuffer(block, dtype=np.uint8)
+    digit = (data >= ord('0')) & (data <= ord('9'))
+    edges = np.diff(digit.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    lengths = np.flatnonzero(edges == -1) - starts
+
+    per_line = np.bincount(np.searchsorted(np.flatnonzero(data == ord('\n')), starts))
+    filled = per_line[per_line != 0]
+    if not filled.size:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty.astype(np.uint8), None, columns
+    if columns is None:
+        columns = 7 if filled[0] == 7 else 6
+    if np.any((per_line != 0) & (per_line != columns)):
+        line = int(np.flatnonzero((per_line != 0) & (per_line != columns))[0])
+        text = block.split(b'\n')[line].decode(errors='replace').strip()
+        raise ValueError(f'malformed maze row: {text!r}')
+
+    # numbers are short, so build them one digit position at a time
+    values = np.zeros(starts.size, dtype=np.int64)
+    for k in range(int(lengths.max()) if starts.size else 0):
+        more = lengths > k
+        values[more] = values[more] * 10 + (data[starts[more] + k] - ord('0'))
+
+    values = values.reshape(-1, columns)
+    masks = ((values[:, 2] != 0) * E | (values[:, 3] != 0) * W |
+             (values[:, 4] != 0) * N | (values[:, 5] != 0) * S).astype(np.uint8)
+    costs = None
+    if columns == 7:
+        if values.size and (values[:, 6].min() < 1 or values[:, 6].max() > 255):
+            row = int(np.flatnonzero((values[:, 6] < 1) | (values[:, 6] > 255))[0])
+            raise ValueError(f'cell cost {values[row, 6]} of ({values[row, 0]}, {values[row, 1]}) '
+                             f'is outside 1..255')
+        costs = values[:, 6].astype(np.uint8)
+    return values[:, 0], values[:, 1], masks, costs, columns
+
+
+def symmetry_errors(grid, limit=10):
+    '''
+    Count the cells whose E or S wall disagrees with the W or N wall of the
+    neighbour. Returns the count and up to limit ((x, y), direction) examples.
+    '''
+    walls = grid.to_numpy()
+    total, examples = 0, []
+    for direction, mismatch in (
+            ('E', ((walls[:, :-1] & E) != 0) != ((walls[:, 1:] & W) != 0)),
+            ('S', ((walls[:-1, :] & S) != 0) != ((walls[1:, :] & N) != 0))):
+        total += int(np.count_nonzero(mismatch))
+        for x, y in np.argwhere(mismatch)[:limit - len(examples)].tolist():
+            examples.append(((x + 1, y + 1), direction))
+    return total, examples
+
+
+def load_csv(path, validate=True):
+    '''
+    Load a CSV maze into a MazeGrid in one pass.
+    validate--> Raise ValueError if the walls are not symmetric
+    Directions leading out of the maze are dropped, as in MazeGrid.set_mask.
+    A cost column, if present, becomes the costs of the grid.
+    '''
+    ordered = True          # cells so far came column by column
+    rows = None             # known once the second column starts
+    columns = None          # numbers per line, 7 with a cost column
+    count = 0
+    masks_in_order = bytearray()
+    costs_in_order = bytearray()
+    scattered = []          # (xs, ys, masks, costs) blocks once the order breaks
+
+    with open(path, 'rb') as f:
+        for block in _blocks(f):
+            xs, ys, masks, costs, columns = _parse(block, columns)
+            if not xs.size:
+                continue
+            if ordered:
+                index = np.arange(count, count + xs.size)
+                if rows is None:
+                    later = np.flatnonzero(ys != 1)
+                    if later.size:
+                        rows = count + int(later[0])
+                if rows == 0:
+                    ordered = False  # the file does not start with the first column
+                elif rows is None:
+                    ordered = bool(((ys == 1) & (xs == index + 1)).all())
+                else:
+                    ordered = bool(((xs == index % rows + 1) & (ys == index // rows + 1)).all())
+                if ordered:
+                    masks_in_order += masks.tobytes()
+                    if costs is not None:
+                        costs_in_order += costs.tobytes()
+                else:
+                    # keep what was read so far with explicit coordinates
+                    done = np.arange(count)
+                    height = rows or max(count, 1)
+                    scattered.append((done % height + 1, done // height + 1,
+                                      np.frombuffer(masks_in_order, dtype=np.uint8),
+                                      np.frombuffer(costs_in_order, dtype=np.uint8)))
+                    masks_in_order = costs_in_order = None
+            if not ordered:
+                scattered.append((xs, ys, masks, costs))
+            count += xs.size
+
+    if not count:
+        raise ValueError(f'{path}: no maze cells found')
+
+    with_costs = columns == 7
+    costs = None
+    if ordered:
+        rows = rows or count
+        cols = -(-count // rows)
+        walls = np.zeros(rows * cols, dtype=np.uint8)
+        walls[:count] = np.frombuffer(masks_in_order, dtype=np.uint8)
+        # file order is column by column, grid ids are row by row
+        walls = walls.reshape(cols, rows).T
+        if with_costs:
+            costs = np.ones(rows * cols, dtype=np.uint8)
+            costs[:count] = np.frombuffer(costs_in_order, dtype=np.uint8)
+            costs = costs.reshape(cols, rows).T
+    else:
+        xs = np.concatenate([b[0] for b in scattered])
+        ys = np.concatenate([b[1] for b in scattered])
+        if xs.min() < 1 or ys.min() < 1:
+            raise ValueError(f'{path}: cell coordinates start at (1, 1)')
+        rows, cols = int(xs.max()), int(ys.max())
+        walls = np.zeros((rows, cols), dtype=np.uint8)
+        walls[xs - 1, ys - 1] = np.concatenate([b[2] for b in scattered])
+        if with_costs:
+            costs = np.ones((rows, cols), dtype=np.uint8)
+            costs[xs - 1, ys - 1] = np.concatenate([b[3] for b in scattered])
+
+    walls[0, :] &= ~N & 0xF
+    walls[-1, :] &= ~S & 0xF
+    walls[:, 0] &= ~W & 0xF
+    walls[:, -1] &= ~E & 0xF
+    grid = MazeGrid(rows, cols, bytearray(np.ascontiguousarray(walls).tobytes()),
+                    None if costs is None else bytearray(np.ascontiguousarray(costs).tobytes()))
+
+    if validate:
+        total, examples = symmetry_errors(grid, limit=1)
+        if total:
+            cell, direction = examples[0]
+            raise ValueError(f'{path}: the {direction} wall of {cell} does not match its '
+                             f'neighbour ({total} asymmetric wall{"s" if total > 1 else ""})')
+    return grid
@@ -3,9 +3,12 @@ DO NOT MODIFY THIS FILE
 '''
 
 
-import csv
 from tkinter import *
 from enum import Enum
+import numpy as np
+from maze_core import MazeGrid
+from maze_csv import load_csv
+import mazefile
 
 class COLOR(Enum):
     '''
@@ -195,11 +198,12 @@ class maze:
         rows--> No. of rows of the maze
         cols--> No. of columns of the maze
         Need to pass just the two arguments. The rest will be assigned automatically
-        maze_map--> Will be set to a Dicationary. Keys will be cells and
+        core--> The MazeGrid holding the walls as one 4-bit mask per cell
+        maze_map--> Read-only view of core that works like a Dicationary. Keys will be cells and
                     values will be another dictionary with keys=['E','W','N','S'] for
                     East West North South and values will be 0 or 1. 0 means that 
                     direction(EWNS) is blocked. 1 means that direction is open.
-        grid--> A list of all cells
+        grid--> All cells of the maze (column by column)
         path--> Shortest path from start(bottom right) to goal(by default top left)
                 It will be a dictionary
         _win,_cell_width,_canvas -->    _win and )canvas are for Tkinter window and canvas
@@ -211,34 +215,30 @@ class maze:
         '''
         self.rows=rows
         self.cols=cols
-        self.maze_map={}
         self.grid=[]
         self.path={} 
         self._cell_width=50  
         self._win=None 
         self._canvas=None
         self._agents=[]
+        self._cellLines={}
 
     @property
     def grid(self):
         return self._grid
     @grid.setter        
     def grid(self,n):
-        self._grid=[]
-        y=0
-        for n in range(self.cols):
-            x = 1
-            y = 1+y
-            for m in range(self.rows):
-                self.grid.append((x,y))
-                self.maze_map[x,y]={'E':0,'W':0,'N':0,'S':0}
-                x = x + 1 
+        # All walls start closed; the view iterates the cells column by column
+        self.core=MazeGrid(self.rows,self.cols)
+        self.maze_map=self.core.maze_map
+        self._grid=self.maze_map
     
     
     def LoadMaze(self,x=1,y=1,loadMaze=None, theme=COLOR.dark):
         '''
         Function to load a maze from CSV file
-        loadMaze--> Provide the CSV file to generate a desried maze
+        loadMaze--> Provide the CSV file to generate a desried maze, or a binary
+                    maze file (see mazefile.py), which is memory-mapped
         theme--> Dark or Light
         '''
 
@@ -251,24 +251,16 @@ class maze:
                 raise ValueError(f'{theme} is not a valid theme COLOR!')        
         
         if loadMaze is not None:
-            # Load maze from CSV file
-            with open(loadMaze,'r') as f:
-                last=list(f.readlines())[-1]
-                c=last.split(',')
-                c[0]=int(c[0].lstrip('"('))
-                c[1]=int(c[1].rstrip(')"'))
-                self.rows=c[0]
-                self.cols=c[1]
-                self.grid=[]
-
-            with open(loadMaze,'r') as f:
-                r=csv.reader(f)
-                next(r)
-                for i in r:
-                    c=i[0].split(',')
-                    c[0]=int(c[0].lstrip('('))
-                    c[1]=int(c[1].rstrip(')'))
-                    self.maze_map[tuple(c)]={'E':int(i[1]),'W':int(i[2]),'N':int(i[3]),'S':int(i[4])}
+            # Binary maze files are mapped, CSV files streamed in one pass;
+            # either way the size comes from the file
+            if mazefile.is_maze_file(loadMaze):
+                self.core=mazefile.open_maze(loadMaze)
+            else:
+                self.core=load_csv(loadMaze)
+            self.rows=self.core.rows
+            self.cols=self.core.cols
+            self.maze_map=self.core.maze_map
+            self._grid=self.maze_map
 
         self._drawMaze(self.theme)
         agent(self,*self._goal,filled=True,color=COLOR.green)
@@ -306,40 +298,66 @@ class maze:
         self._cell_width=round(min(((scr_height-self.rows-k*self._LabWidth)/(self.rows)),((scr_width-self.cols-k*self._LabWidth)/(self.cols)),90),3)
         
         # Creating Maze lines
+        # Every wall is drawn once (not once from each side) and walls in line
+        # along a grid line are merged, so a long wall is a single canvas item
         if self._win is not None:
             if self.grid is not None:
-                for cell in self.grid:
-                    x,y=cell
-                    w=self._cell_width
-                    x=x*w-w+self._LabWidth
-                    y=y*w-w+self._LabWidth
-                    if self.maze_map[cell]['E']==False:
-                        l=self._canvas.create_line(y + w, x, y + w, x + w,width=2,fill=theme.value[1],tag='line')
-                    if self.maze_map[cell]['W']==False:
-                        l=self._canvas.create_line(y, x, y, x + w,width=2,fill=theme.value[1],tag='line')
-                    if self.maze_map[cell]['N']==False:
-                        l=self._canvas.create_line(y, x, y + w, x,width=2,fill=theme.value[1],tag='line')
-                    if self.maze_map[cell]['S']==False:
-                        l=self._canvas.create_line(y, x + w, y + w, x + w,width=2,fill=theme.value[1],tag='line')
+                w=self._cell_width
+                L=self._LabWidth
+                for x0,y0,x1,y1 in self._wallRuns():
+                    self._canvas.create_line(y0*w+L, x0*w+L, y1*w+L, x1*w+L,width=2,fill=theme.value[1],tag='line')
+        self._cellLines={}
+
+    def _wallRuns(self):
+        '''
+        The closed walls as straight runs along the grid lines.
+        Yields (x0,y0,x1,y1) in grid line units: row line x0 from column
+        line y0 to y1 for horizontal runs, and the other way round for
+        vertical ones.
+        '''
+        walls=self.core.to_numpy()
+        closed=lambda bit: (walls & bit)==0
+        # horizontal[i,j]: wall on row line i (above row i+1) across column j+1
+        horizontal=np.zeros((self.rows+1,self.cols),dtype=bool)
+        horizontal[:-1]|=closed(4)
+        horizontal[1:]|=closed(8)
+        # vertical[j,i]: wall on column line j (left of column j+1) across row i+1
+        vertical=np.zeros((self.cols+1,self.rows),dtype=bool)
+        vertical[:-1]|=closed(2).T
+        vertical[1:]|=closed(1).T
+        for lines,isRow in ((horizontal,True),(vertical,False)):
+            edges=np.diff(lines.astype(np.int8),axis=1,prepend=0,append=0)
+            starts=np.argwhere(edges==1)
+            ends=np.argwhere(edges==-1)
+            for (line,a),(_,b) in zip(starts.tolist(),ends.tolist()):
+                yield (line,a,line,b) if isRow else (a,line,b,line)
 
     def _redrawCell(self,x,y,theme):
         '''
         To redraw a cell.
         With Full sized square agent, it can overlap with maze lines
-        So the cell is redrawn so that cell lines are on top
+        So the cell lines are raised on top. They are created the first
+        time a cell is redrawn and reused after that
         '''
-        w=self._cell_width
         cell=(x,y)
-        x=x*w-w+self._LabWidth
-        y=y*w-w+self._LabWidth
-        if self.maze_map[cell]['E']==False:
-            self._canvas.create_line(y + w, x, y + w, x + w,width=2,fill=theme.value[1])
-        if self.maze_map[cell]['W']==False:
-            self._canvas.create_line(y, x, y, x + w,width=2,fill=theme.value[1])
-        if self.maze_map[cell]['N']==False:
-            self._canvas.create_line(y, x, y + w, x,width=2,fill=theme.value[1])
-        if self.maze_map[cell]['S']==False:
-            self._canvas.create_line(y, x + w, y + w, x + w,width=2,fill=theme.value[1])
+        lines=self._cellLines.get(cell)
+        if lines is None:
+            w=self._cell_width
+            x=x*w-w+self._LabWidth
+            y=y*w-w+self._LabWidth
+            lines=[]
+            if self.maze_map[cell]['E']==False:
+                lines.append(self._canvas.create_line(y + w, x, y + w, x + w,width=2,fill=theme.value[1]))
+            if self.maze_map[cell]['W']==False:
+                lines.append(self._canvas.create_line(y, x, y, x + w,width=2,fill=theme.value[1]))
+            if self.maze_map[cell]['N']==False:
+                lines.append(self._canvas.create_line(y, x, y + w, x,width=2,fill=theme.value[1]))
+            if self.maze_map[cell]['S']==False:
+                lines.append(self._canvas.create_line(y, x + w, y + w, x + w,width=2,fill=theme.value[1]))
+            self._cellLines[cell]=lines
+        else:
+            for line in lines:
+                self._canvas.tag_raise(line)
 
 
     _tracePathList=[]
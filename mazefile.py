@@ -0,0 +1,167 @@
+"""
+Binary maze files.
+
+Layout (little endian):
+
+    offset 0   4s   magic b'MAZB'
+    offset 4   B    format version (1)
+    offset 5   B    bits per cell: 4 (two cells per byte) or 8 (one byte per cell)
+    offset 6   H    flags: bit 0 set if a cost layer follows the walls
+    offset 8   I    rows
+    offset 12  I    cols
+    offset 16       wall masks by cell id (see maze_core), row by row
+    then            with flag bit 0: the cost of entering every cell, one
+                    byte per cell (1..255) by cell id (see terrain.py)
+
+With 4 bits per cell the mask of an even cell id is in the low nibble of
+its byte and the following odd cell in the high nibble. A 5000x5000 maze
+is 12.5MB packed this way instead of hundreds of MB as CSV.
+
+open_maze() maps a file instead of reading it. With 8 bits per cell the
+body already is the wall array of a MazeGrid, so the grid uses the mapping
+directly: opening costs O(1) and pages are read in as the searches touch
+them. Files with 4 bits per cell are unpacked from the mapping with NumPy
+in one vectorized pass. A cost layer is always one byte per cell and is
+used from the mapping in both cases. Convert a CSV maze with
+
+    python mazefile.py maze_config.csv maze_config.maze --bits 8
+"""
+
+import argparse
+import mmap
+import struct
+
+import numpy as np
+
+from maze_core import MazeGrid, grid_of
+
+
+MAGIC = b'MAZB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHII')
+COSTS = 1   # header flag: a cost layer follows the wall masks
+
+# Cells converted per chunk while writing, keeps the temporary arrays small
+_CHUNK = 1 << 22
+
+
+def pack_nibbles(masks):
+    '''Pack a uint8 array of wall masks two per byte (an odd tail gets a 0 high nibble)'''
+    masks = np.asarray(masks, dtype=np.uint8)
+    if masks.size & 1:
+        masks = np.append(masks, np.uint8(0))
+    return masks[0::2] | (masks[1::2] << 4)
+
+
+def unpack_nibbles(packed, size):
+    '''Inverse of pack_nibbles for size cells'''
+    packed = np.asarray(packed, dtype=np.uint8)
+    masks = np.empty(packed.size * 2, dtype=np.uint8)
+    masks[0::2] = packed & 0x0F
+    masks[1::2] = packed >> 4
+    return masks[:size]
+
+
+def is_maze_file(path):
+    '''True if path starts with the binary maze file magic'''
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_header(f, rows, cols, bits=4, flags=0):
+    f.write(HEADER.pack(MAGIC, VERSION, bits, flags, rows, cols))
+
+
+def read_header(f):
+    '''Read and check the header; returns (rows, cols, bits per cell, flags)'''
+    data = f.read(HEADER.size)
+    if len(data) != HEADER.size:
+        raise ValueError('truncated maze file header')
+    magic, version, bits, flags, rows, cols = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError('not a binary maze file')
+    if version != VERSION:
+        raise ValueError(f'unsupported maze file version {version}')
+    if bits not in (4, 8):
+        raise ValueError(f'unsupported cell size of {bits} bits')
+    return rows, cols, bits, flags
+
+
+def save(maze, path, bits=4):
+    '''Write a maze (and its cost layer, if any) to path, streaming in chunks'''
+    grid = grid_of(maze)
+    walls = np.frombuffer(grid.walls, dtype=np.uint8)
+    with open(path, 'wb') as f:
+        write_header(f, grid.rows, grid.cols, bits, COSTS if grid.costs is not None else 0)
+        for i in range(0, grid.size, _CHUNK):
+            chunk = walls[i:i + _CHUNK]
+            f.write((pack_nibbles(chunk) if bits == 4 else chunk).tobytes())
+        if grid.costs is not None:
+            f.write(memoryview(grid.costs).cast('B'))
+
+
+def load(path):
+    '''Read a whole binary maze file into a MazeGrid'''
+    with open(path, 'rb') as f:
+        rows, cols, bits, flags = read_header(f)
+        size = rows * cols
+        body = np.frombuffer(f.read(), dtype=np.uint8)
+    expected = (size + 1) // 2 if bits == 4 else size
+    layers = expected + (size if flags & COSTS else 0)
+    if body.size < layers:
+        raise ValueError('truncated maze file')
+    masks = unpack_nibbles(body[:expected], size) if bits == 4 else body[:size]
+    costs = bytearray(body[expected:layers].tobytes()) if flags & COSTS else None
+    return MazeGrid(rows, cols, bytearray(masks.tobytes()), costs)
+
+
+def open_maze(path):
+    '''
+    Map a binary maze file into a MazeGrid. The mapping is copy-on-write:
+    the grid can be edited (e.g. wall toggles) without touching the file.
+    '''
+    with open(path, 'rb') as f:
+        rows, cols, bits, flags = read_header(f)
+        # the mapping stays valid after the file object is closed
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    size = rows * cols
+    expected = (size + 1) // 2 if bits == 4 else size
+    body = memoryview(mapping)[HEADER.size:HEADER.size + expected]
+    costs = None
+    if flags & COSTS:
+        costs = memoryview(mapping)[HEADER.size + expected:HEADER.size + expected + size]
+        if len(costs) < size:
+            raise ValueError('truncated maze file')
+    if len(body) < expected:
+        raise ValueError('truncated maze file')
+    if bits == 8:
+        return MazeGrid(rows, cols, body, costs)
+
+    walls = bytearray(size)
+    masks = np.frombuffer(walls, dtype=np.uint8)
+    packed = np.frombuffer(body, dtype=np.uint8)
+    half = _CHUNK // 2
+    for i in range(0, packed.size, half):
+        cells = unpack_nibbles(packed[i:i + half], min(_CHUNK, size - 2 * i))
+        masks[2 * i:2 * i + cells.size] = cells
+    return MazeGrid(rows, cols, walls, costs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a CSV maze to the binary maze format")
+    parser.add_argument("csv", help="Maze CSV file in the cell,E,W,N,S layout")
+    parser.add_argument("output", help="Binary maze file to write")
+    parser.add_argument("--bits", type=int, choices=(4, 8), default=8,
+                        help="Bits per cell: 8 opens zero-copy, 4 halves the file size")
+    args = parser.parse_args()
+
+    grid = MazeGrid.from_csv(args.csv)
+    save(grid, args.output, args.bits)
+    print(f"Saved the {grid.rows}x{grid.cols} maze of {args.csv} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
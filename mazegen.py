@@ -0,0 +1,247 @@
+"""
+Maze generators for benchmark and load-test mazes.
+
+Three classic algorithms carve a perfect maze (exactly one path between any
+two cells) straight into the wall-mask bytearray of a MazeGrid, so even a
+5000x5000 maze needs a few bytes per cell instead of a dict per cell:
+
+    backtracker --> randomized depth-first search, long winding corridors
+    kruskal     --> random edge order with union-find, many short dead ends
+    wilson      --> loop-erased random walks, a uniform spanning tree (the
+                    slowest of the three on large mazes)
+
+A braid factor then opens one extra wall at that fraction of the dead ends,
+which adds loops and therefore several alternative routes. The same seed
+always produces the same maze.
+
+    python mazegen.py 5000 5000 -a kruskal --seed 7 --braid 0.1 -o big.maze
+
+Files ending in .csv are written in the maze_config.csv layout, everything
+else in the packed binary format of mazefile.py.
+"""
+
+import argparse
+from array import array
+
+import numpy as np
+
+from maze_core import MazeGrid, E, W, N, S
+import mazefile
+
+
+# Random numbers are drawn from NumPy in blocks and handed out one by one,
+# which is much cheaper than a call into the random module per step.
+_BLOCK = 1 << 16
+
+
+def _uniform(rng):
+    '''Endless iterator of floats in [0, 1) drawn from rng'''
+    while True:
+        yield from rng.random(_BLOCK).tolist()
+
+
+def _chunked(values):
+    '''Iterate a large NumPy array as Python ints without one huge list'''
+    for i in range(0, values.size, _BLOCK):
+        yield from values[i:i + _BLOCK].tolist()
+
+
+def _moves(cols):
+    '''(bit, opposite bit, id offset) of the E, W, N, S moves'''
+    return (E, W, 1), (W, E, -1), (N, S, -cols), (S, N, cols)
+
+
+def backtracker(rows, cols, rng):
+    '''Recursive backtracker (iterative depth-first search); returns the wall masks'''
+    size = rows * cols
+    walls = bytearray(size)
+    visited = bytearray(size)
+    rand = _uniform(rng).__next__
+    east, west, north, south = _moves(cols)
+    last_row = size - cols
+
+    start = int(rng.integers(size))
+    visited[start] = 1
+    stack = array('l', [start])
+    while stack:
+        cid = stack[-1]
+        y = cid % cols
+        options = []
+        if y < cols - 1 and not visited[cid + 1]:
+            options.append(east)
+        if y > 0 and not visited[cid - 1]:
+            options.append(west)
+        if cid >= cols and not visited[cid - cols]:
+            options.append(north)
+        if cid < last_row and not visited[cid + cols]:
+            options.append(south)
+        if not options:
+            stack.pop()
+            continue
+        bit, opposite, offset = options[int(rand() * len(options))]
+        child = cid + offset
+        walls[cid] |= bit
+        walls[child] |= opposite
+        visited[child] = 1
+        stack.append(child)
+    return walls
+
+
+def kruskal(rows, cols, rng):
+    '''Randomized Kruskal over all interior walls; returns the wall masks'''
+    size = rows * cols
+    walls = bytearray(size)
+    parent = array('l', range(size))
+
+    # Edge e joins cell e // 2 with its east (e even) or south (e odd) neighbour
+    dtype = np.int32 if 2 * size < 2 ** 31 else np.int64
+    cells = np.arange(size, dtype=dtype)
+    edges = np.concatenate((cells[cells % cols < cols - 1] * 2, cells[:size - cols] * 2 + 1))
+    del cells
+    rng.shuffle(edges)
+
+    def find(cid):
+        while parent[cid] != cid:
+            parent[cid] = parent[parent[cid]]  # path halving
+            cid = parent[cid]
+        return cid
+
+    joins = size - 1
+    for edge in _chunked(edges):
+        if not joins:
+            break
+        cid = edge >> 1
+        if edge & 1:
+            other, bit, opposite = cid + cols, S, N
+        else:
+            other, bit, opposite = cid + 1, E, W
+        a, b = find(cid), find(other)
+        if a != b:
+            parent[a] = b
+            walls[cid] |= bit
+            walls[other] |= opposite
+            joins -= 1
+    return walls
+
+
+def wilson(rows, cols, rng):
+    '''Wilson's algorithm (uniform spanning tree); returns the wall masks'''
+    size = rows * cols
+    walls = bytearray(size)
+    in_tree = bytearray(size)
+    exit_move = bytearray(size)  # last direction taken out of each cell of the walk
+    rand = _uniform(rng).__next__
+    moves = _moves(cols)
+    last_row = size - cols
+
+    in_tree[int(rng.integers(size))] = 1
+    for walk_start in _chunked(rng.permutation(size)):
+        if in_tree[walk_start]:
+            continue
+        # Random walk until the tree is hit. Overwriting the exit direction
+        # of a revisited cell erases the loop the walk just made.
+        cid = walk_start
+        while not in_tree[cid]:
+            y = cid % cols
+            while True:
+                move = int(rand() * 4)
+                if ((move == 0 and y < cols - 1) or (move == 1 and y > 0) or
+                        (move == 2 and cid >= cols) or (move == 3 and cid < last_row)):
+                    break
+            exit_move[cid] = move
+            cid += moves[move][2]
+        # Add the loop-erased walk to the tree
+        cid = walk_start
+        while not in_tree[cid]:
+            bit, opposite, offset = moves[exit_move[cid]]
+            walls[cid] |= bit
+            walls[cid + offset] |= opposite
+            in_tree[cid] = 1
+            cid += offset
+    return walls
+
+
+ALGORITHMS = {
+    'backtracker': backtracker,
+    'kruskal': kruskal,
+    'wilson': wilson,
+}
+
+# Number of open directions of every wall mask
+_OPEN_COUNT = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.uint8)
+_OPEN_COUNTS = _OPEN_COUNT.tolist()
+
+
+def braid(walls, rows, cols, factor, rng):
+    '''
+    Open one more wall at roughly `factor` of the dead ends, preferring a
+    wall into another dead end so both are removed at once.
+    '''
+    if factor <= 0:
+        return
+    masks = np.frombuffer(walls, dtype=np.uint8)
+    dead_ends = np.flatnonzero(_OPEN_COUNT[masks] == 1)
+    chosen = dead_ends[rng.random(dead_ends.size) < factor]
+    rng.shuffle(chosen)
+    size = rows * cols
+    moves = _moves(cols)
+    open_count = _OPEN_COUNTS
+    for cid in chosen.tolist():
+        if open_count[walls[cid]] != 1:
+            continue  # already opened from a neighbouring dead end
+        y = cid % cols
+        candidates = []
+        for bit, opposite, offset in moves:
+            other = cid + offset
+            if walls[cid] & bit or not 0 <= other < size:
+                continue
+            if (bit == E and y == cols - 1) or (bit == W and y == 0):
+                continue
+            candidates.append((open_count[walls[other]] != 1, bit, opposite, other))
+        if not candidates:
+            continue
+        candidates.sort(key=lambda c: c[0])
+        best = [c for c in candidates if c[0] == candidates[0][0]]
+        _, bit, opposite, other = best[int(rng.integers(len(best)))]
+        walls[cid] |= bit
+        walls[other] |= opposite
+
+
+def generate(rows, cols, algorithm='backtracker', seed=None, braid_factor=0.0):
+    '''
+    Generate a maze as a MazeGrid.
+    algorithm-->    Key of ALGORITHMS
+    seed-->         Any value accepted by numpy.random.default_rng; the same
+                    seed and arguments always give the same maze
+    braid_factor--> Fraction of dead ends that get an extra opening (0..1)
+    '''
+    if rows < 1 or cols < 1:
+        raise ValueError('a maze needs at least one row and one column')
+    rng = np.random.default_rng(seed)
+    walls = ALGORITHMS[algorithm](rows, cols, rng)
+    braid(walls, rows, cols, braid_factor, rng)
+    return MazeGrid(rows, cols, walls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a maze file")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("cols", type=int)
+    parser.add_argument("-a", "--algorithm", choices=sorted(ALGORITHMS), default='backtracker')
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible maze")
+    parser.add_argument("--braid", type=float, default=0.0, help="Fraction of dead ends to open (0..1)")
+    parser.add_argument("-o", "--output", default='maze.maze', help="Output file (.csv or binary)")
+    parser.add_argument("--bits", type=int, choices=(4, 8), default=4,
+                        help="Bits per cell of binary files (8 can be opened zero-copy)")
+    args = parser.parse_args()
+
+    grid = generate(args.rows, args.cols, args.algorithm, args.seed, args.braid)
+    if args.output.lower().endswith('.csv'):
+        grid.to_csv(args.output)
+    else:
+        mazefile.save(grid, args.output, args.bits)
+    print(f"Saved a {args.rows}x{args.cols} {args.algorithm} maze to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
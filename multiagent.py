@@ -0,0 +1,506 @@
+"""
+Multi-agent pathfinding with Conflict-Based Search.
+
+Every agent has a start and a goal on the same maze. In one time step each
+agent moves to an open neighbour or waits, and a plan is collision free
+when no two agents are in the same cell at the same time (vertex conflict)
+or swap cells through the same passage (edge conflict). An agent that has
+arrived stays on its goal, so other agents must not pass it afterwards.
+
+Conflict-Based Search (CBS) plans on two levels:
+
+    high level  a tree of constraint sets. Every node plans each agent on
+                its own under the agent's constraints. At the earliest
+                conflict of agents a and b at time t the node gets two
+                children, one forbidding a and one forbidding b the
+                conflicting cell (or move) at t, and only that agent is
+                planned again.
+    low level   space-time A* for one agent over (cell, t) states. The
+                heuristic is the exact BFS distance to the goal, and among
+                the states of equal f the one with the fewest conflicts with
+                the other agents' paths goes first.
+
+Every node keeps a lower bound on the cost of each agent (its optimal cost
+under the node's constraints). The high level expands from a focal list:
+the open nodes whose sum of costs is within `suboptimality` times the
+lowest bound, fewest conflicts first. With suboptimality 1 that is CBS and
+the sum of costs is optimal. With w > 1 the search is bounded-suboptimal
+in the manner of Enhanced CBS (ECBS): the sum of costs stays within w times
+the optimum, and the search heads for conflict-free plans instead of
+proving each cost level first.
+
+For w > 1 the tree gets a second root from prioritized planning: the agents
+are planned one after the other, each treating the paths of the ones before
+as obstacles. On fleets of many agents that plan has few conflicts or none,
+and as long as its cost is within the bound it is where the search starts.
+
+Every step costs 1, so the low level keeps its open list in buckets by f,
+as in terrain.py. The goal distances of all agents come from one
+vectorized multi-source wavefront (4 bytes per cell and agent), and the
+paths of a node are checked for conflicts with NumPy on an (agents, time
+steps) matrix of cell ids.
+"""
+
+import heapq
+import time
+from collections import Counter, namedtuple
+from itertools import count
+
+import numpy as np
+
+from maze_core import grid_of, E, W, N, S
+
+
+# paths--> one list of (x, y) cells per agent, indexed by time step; an agent
+#          stays on the last cell of its path after its end
+# cost-->  sum over the agents of the time step of their final arrival
+MultiAgentResult = namedtuple('MultiAgentResult', 'paths cost makespan expanded generated')
+
+
+class _Node:
+    '''A node of the constraint tree; constraints are shared with the parent chain'''
+    __slots__ = ('parent', 'constraint', 'paths', 'arrays', 'bounds', 'cost', 'bound',
+                 'conflicts', 'conflict', 'expanded')
+
+    def __init__(self, parent, constraint):
+        self.parent = parent
+        self.constraint = constraint   # (agent, t, cell, next cell or None)
+        self.expanded = False
+
+    def set_paths(self, paths, arrays, bounds, size):
+        '''Paths of the node as lists and NumPy arrays of cell ids, with the cost bounds'''
+        self.paths = paths
+        self.arrays = arrays
+        self.bounds = bounds
+        self.cost = sum(len(path) - 1 for path in paths)
+        self.bound = sum(bounds)
+        self.conflicts, self.conflict = _conflicts(arrays, size)
+
+    def constraints(self, agent, size):
+        '''
+        The constraints of agent along the chain to the root: the forbidden
+        t*size+cell states, the forbidden (t, cell, next cell) moves and the
+        last time step at which every constrained cell is forbidden
+        '''
+        vertex, edges, last = set(), set(), {}
+        node = self
+        while node is not None:
+            if node.constraint is not None and node.constraint[0] == agent:
+                _, t, cell, other = node.constraint
+                if other is None:
+                    vertex.add(t * size + cell)
+                    last[cell] = max(last.get(cell, -1), t)
+                else:
+                    edges.add((t, cell, other))
+            node = node.parent
+        return vertex, edges, last
+
+
+def _distances(grid, goal_ids):
+    '''
+    BFS distances to every goal, one int32 array per goal. All goals grow
+    their wavefront in the same NumPy passes over (goal, cell) indices, so
+    the Python loop runs once per layer of the farthest goal.
+    '''
+    size = grid.size
+    walls = np.frombuffer(grid.walls, dtype=np.uint8)
+    moves = ((E, 1), (W, -1), (N, -grid.cols), (S, grid.cols))
+    dist = np.full((len(goal_ids), size), -1, dtype=np.int32)
+    flat = dist.reshape(-1)
+    frontier = np.arange(len(goal_ids), dtype=np.int64) * size + np.asarray(goal_ids, dtype=np.int64)
+    flat[frontier] = 0
+    layer = 0
+    while frontier.size:
+        layer += 1
+        masks = walls[frontier % size]
+        reached = []
+        for bit, offset in moves:
+            children = frontier[(masks & bit) != 0] + offset
+            children = children[flat[children] < 0]
+            flat[children] = layer
+            reached.append(children)
+        frontier = np.unique(np.concatenate(reached))
+    return list(dist)
+
+
+def _positions(arrays):
+    '''(agents, time steps) matrix of cell ids, every path held on its last cell'''
+    horizon = max(len(path) for path in arrays)
+    positions = np.empty((len(arrays), horizon), dtype=np.int64)
+    for agent, path in enumerate(arrays):
+        positions[agent, :len(path)] = path
+        positions[agent, len(path):] = path[-1]
+    return positions
+
+
+def _conflicts(arrays, size):
+    '''
+    Number of conflicts among the paths (arrays of ids) and the earliest one,
+    as (a, b, t, cell, next cell): a vertex conflict has next cell None, an
+    edge conflict has a moving from cell to next cell at t while b moves back.
+    '''
+    positions = _positions(arrays)
+
+    # vertex conflicts: equal neighbours in every column sorted by cell id
+    ranked = np.sort(positions, axis=0)
+    same = ranked[1:] == ranked[:-1]
+    total = int(np.count_nonzero(same))
+    first = None
+    if total:
+        t = int(np.flatnonzero(same.any(axis=0))[0])
+        cell = int(ranked[1:, t][same[:, t]][0])
+        a, b = np.flatnonzero(positions[:, t] == cell)[:2].tolist()
+        first = (a, b, t, cell, None)
+
+    # edge conflicts: a move whose reverse is made at the same time step.
+    # Moves are hashed with their time step (wrapping in int64) and the few
+    # candidates are checked exactly.
+    before, after = positions[:, :-1], positions[:, 1:]
+    agents, steps = np.nonzero(before != after)
+    if agents.size:
+        cells, nexts = before[agents, steps], after[agents, steps]
+        with np.errstate(over='ignore'):
+            keys = (cells * size + nexts) * 1000003 + steps
+            reverse = (nexts * size + cells) * 1000003 + steps
+        swaps = {}
+        for i in np.flatnonzero(np.isin(reverse, keys)).tolist():
+            swaps[int(steps[i]), int(cells[i]), int(nexts[i])] = int(agents[i])
+        for (step, cell, nxt), a in sorted(swaps.items()):
+            b = swaps.get((step, nxt, cell))
+            if b is None or a > b:
+                continue
+            total += 1
+            if first is None or step + 1 < first[2]:
+                first = (a, b, step + 1, cell, nxt)
+    return total, first
+
+
+def _reservations(arrays, size):
+    '''
+    Conflict avoidance table of the paths: t*size+cell -> number of agents
+    there, and goal cell -> time step from which its agent stays on it
+    '''
+    keys = np.concatenate([np.arange(len(path)) * size + path for path in arrays])
+    parked = {int(path[-1]): len(path) - 1 for path in arrays}
+    return Counter(keys.tolist()), parked
+
+
+def _obstacles(arrays, size, agent):
+    '''
+    The paths of all agents but agent as obstacles for _plan_agent:
+    t*size+cell -> agent there, and goal cell -> time step of arrival
+    '''
+    others = [path for other, path in enumerate(arrays) if other != agent]
+    owners = [other for other, path in enumerate(arrays) if other != agent for _ in range(len(path))]
+    keys = np.concatenate([np.arange(len(path)) * size + path for path in others])
+    return dict(zip(keys.tolist(), owners)), {int(path[-1]): len(path) - 1 for path in others}
+
+
+def _plan_agent(grid, moves, dist, start_id, goal_id, constraints, reserved, parked, own, deadline,
+                limit=None):
+    '''
+    Space-time A* for one agent, breaking ties between equal f values by the
+    number of conflicts with the other agents.
+    moves-->       Expansion table with a wait (offset 0) added to every entry
+    dist-->        Distances to the goal by cell id, the heuristic
+    constraints--> As returned by _Node.constraints
+    reserved, parked--> As returned by _reservations. With own None they are
+                   obstacles instead: reserved maps t*size+cell to the agent
+                   there, and no state may be taken, swapped or parked on.
+    own-->         Current path of the agent, whose entries in reserved are
+                   not conflicts
+    limit-->       Give up after this many expansions
+    Returns the path ids, or None if the agent cannot reach its goal under
+    the constraints (or the deadline or limit has passed).
+    '''
+    size = grid.size
+    walls = grid.walls
+    vertex, edges, last = constraints
+    goal_after = last.get(goal_id, -1)    # the agent may only stay on its goal after this
+    horizon = max(last.values(), default=0) + size
+    hard = own is None
+    own_length = len(own) if own is not None else 0
+    push, pop = heapq.heappush, heapq.heappop
+    counter = count()
+
+    f_min = dist[start_id]
+    buckets = {f_min: [(0, 0, 0, (start_id, 0, 0, None))]}  # f -> heap by conflicts, then depth
+    closed = set()
+    expanded = 0
+
+    while buckets:
+        bucket = buckets.get(f_min)
+        if not bucket:
+            buckets.pop(f_min, None)
+            f_min += 1
+            continue
+        node = pop(bucket)[3]
+        cell, t, conflicts, _ = node
+        key = t * size + cell
+        if key in closed:
+            continue
+        closed.add(key)
+        if cell == goal_id and t > goal_after:
+            path = []
+            while node is not None:
+                path.append(node[0])
+                node = node[3]
+            path.reverse()
+            return path
+        expanded += 1
+        if limit is not None and expanded > limit:
+            return None
+        if deadline is not None and not expanded & 1023 and time.perf_counter() > deadline:
+            return None
+
+        nt = t + 1
+        if nt > horizon:
+            continue
+        base = nt * size
+        for offset in moves[walls[cell]]:
+            child = cell + offset
+            child_key = base + child
+            if child_key in vertex or child_key in closed:
+                continue
+            if offset and (nt, cell, child) in edges:
+                continue
+            if hard:
+                if child_key in reserved or (parked.get(child, nt + 1) <= nt and child != goal_id):
+                    continue
+                there = reserved.get(t * size + child)
+                if there is not None and reserved.get(child_key - child + cell) == there:
+                    continue    # would swap places with that agent
+            child_conflicts = conflicts
+            others = reserved.get(child_key)
+            if others is not None:
+                child_conflicts += others - (nt < own_length and own[nt] == child)
+            since = parked.get(child)
+            if since is not None and since <= nt and child != goal_id:
+                child_conflicts += 1
+            child_f = nt + dist[child]
+            entry = (child_conflicts, -nt, next(counter), (child, nt, child_conflicts, node))
+            if child_f in buckets:
+                push(buckets[child_f], entry)
+            else:
+                buckets[child_f] = [entry]
+    return None
+
+
+def plan_agents(maze, agents, suboptimality=1.0, time_limit=None, max_nodes=None):
+    '''
+    Collision-free paths for several agents on one maze.
+    maze-->          A MazeGrid or anything maze_core.grid_of accepts
+    agents-->        List of ((x, y) start, (x, y) goal) pairs
+    suboptimality--> 1 for CBS (optimal sum of costs); w > 1 for a sum of
+                     costs at most w times the optimum, found much faster
+    time_limit-->    Seconds after which the search gives up
+    max_nodes-->     Constraint tree nodes after which the search gives up
+    Returns a MultiAgentResult, or None if no plan was found within the
+    limits. Raises ValueError if two agents share a start or a goal or an
+    agent cannot reach its goal at all.
+    '''
+    grid = grid_of(maze)
+    size = grid.size
+    if suboptimality < 1:
+        raise ValueError('suboptimality must be at least 1')
+    if any(not (1 <= x <= grid.rows and 1 <= y <= grid.cols) for pair in agents for x, y in pair):
+        raise ValueError('agent cell outside the maze')
+    starts = [grid.cell_id(start) for start, _ in agents]
+    goals = [grid.cell_id(goal) for _, goal in agents]
+    for name, ids in (('start', starts), ('goal', goals)):
+        if len(set(ids)) != len(ids):
+            raise ValueError(f'two agents share a {name} cell')
+    if not agents:
+        return MultiAgentResult([], 0, 0, 0, 0)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    dists = [memoryview(dist) for dist in _distances(grid, goals)]
+    shortest = [dist[start_id] for dist, start_id in zip(dists, starts)]
+    for agent, length in enumerate(shortest):
+        if length < 0:
+            raise ValueError(f'agent {agent} cannot reach its goal {agents[agent][1]}')
+    moves = tuple(offsets + (0,) for offsets in grid.expansion_table('NWSE'))
+    no_constraints = (set(), set(), {})
+
+    def plan(agent, constraints, reserved, parked, own, limit=None):
+        return _plan_agent(grid, moves, dists[agent], starts[agent], goals[agent],
+                           constraints, reserved, parked, own, deadline, limit)
+
+    def root(paths, bounds):
+        node = _Node(None, None)
+        node.set_paths(paths, [np.array(path, dtype=np.int64) for path in paths], bounds, size)
+        return node
+
+    # shortest paths, each agent avoiding the ones planned before it where that is free
+    paths = []
+    reserved, parked = Counter(), {}
+    for agent in range(len(agents)):
+        path = plan(agent, no_constraints, reserved, parked, ())
+        if path is None:
+            return None
+        paths.append(path)
+        reserved.update(t * size + cell for t, cell in enumerate(path))
+        parked[path[-1]] = len(path) - 1
+    roots = [root(paths, [len(path) - 1 for path in paths])]
+
+    if suboptimality > 1:
+        # prioritized planning, longest trips first; an agent that finds no way
+        # around the others within the expansion limit takes the shortest path
+        # with the fewest conflicts with them instead
+        paths = [None] * len(agents)
+        owners, parked, visits = {}, {}, {}
+        for agent in sorted(range(len(agents)), key=lambda a: -shortest[a]):
+            goal_id = goals[agent]
+            path = plan(agent, (set(), set(), {goal_id: visits.get(goal_id, -1)}), owners, parked, None,
+                        limit=8 * (shortest[agent] + grid.rows + grid.cols))
+            if path is None:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return None
+                path = plan(agent, no_constraints, dict.fromkeys(owners, 1), parked, ())
+            paths[agent] = path
+            for t, cell in enumerate(path):
+                owners.setdefault(t * size + cell, agent)
+                visits[cell] = t
+            parked[path[-1]] = len(path) - 1
+        pp = root(paths, shortest)
+        # every node keeps its cost within w times its bound, or the open
+        # node of lowest bound could be left out of the focal list
+        if pp.cost <= suboptimality * pp.bound:
+            roots.append(pp)
+
+    counter = count()
+    open_list = [(node.bound, next(counter), node) for node in roots]
+    heapq.heapify(open_list)
+    bound = suboptimality * open_list[0][0]
+    focal = [(node.conflicts, node.cost, next(counter), node) for node in roots if node.cost <= bound]
+    heapq.heapify(focal)
+    expanded, generated = 0, len(roots)
+
+    while True:
+        while open_list and open_list[0][2].expanded:
+            heapq.heappop(open_list)
+        if not open_list:
+            return None
+        new_bound = suboptimality * open_list[0][0]
+        if new_bound > bound:
+            for _, _, node in open_list:
+                if not node.expanded and bound < node.cost <= new_bound:
+                    heapq.heappush(focal, (node.conflicts, node.cost, next(counter), node))
+            bound = new_bound
+        # the open node of lowest bound is always within the bound, but never
+        # leave the search on an empty focal list
+        node = heapq.heappop(focal)[3] if focal else open_list[0][2]
+        if node.expanded:
+            continue
+        node.expanded = True
+        if node.conflicts == 0:
+            break
+        expanded += 1
+        if ((max_nodes is not None and expanded > max_nodes) or
+                (deadline is not None and time.perf_counter() > deadline)):
+            return None
+
+        a, b, t, cell, nxt = node.conflict
+        if nxt is None:
+            branches = ((a, (a, t, cell, None)), (b, (b, t, cell, None)))
+        else:
+            branches = ((a, (a, t, cell, nxt)), (b, (b, t, nxt, cell)))
+        reserved, parked = _reservations(node.arrays, size)
+        children = []
+        for agent, constraint in branches:
+            child = _Node(node, constraint)
+            constraints = child.constraints(agent, size)
+            paths, arrays, bounds = list(node.paths), list(node.arrays), list(node.bounds)
+            path = None
+            if suboptimality > 1:
+                # first try a way around all the other agents; its cost is not
+                # optimal, so the agent keeps the lower bound of the parent and
+                # the way is only taken while the child stays within w times it
+                path = plan(agent, constraints, *_obstacles(node.arrays, size, agent), None,
+                            limit=8 * (shortest[agent] + grid.rows + grid.cols))
+                if (path is not None and node.cost - len(node.paths[agent]) + len(path)
+                        > suboptimality * node.bound):
+                    path = None
+            if path is None:
+                # the agent's own goal is in parked too; _plan_agent skips it
+                path = plan(agent, constraints, reserved, parked, node.paths[agent])
+                if path is None:
+                    continue
+                bounds[agent] = len(path) - 1   # optimal under the constraints
+            paths[agent] = path
+            arrays[agent] = np.array(path, dtype=np.int64)
+            child.set_paths(paths, arrays, bounds, size)
+            generated += 1
+            children.append(child)
+        for child in children:
+            heapq.heappush(open_list, (child.bound, next(counter), child))
+            if child.cost <= bound:
+                heapq.heappush(focal, (child.conflicts, child.cost, next(counter), child))
+
+    return MultiAgentResult([grid.cells(path) for path in node.paths], node.cost,
+                            max(len(path) for path in node.paths) - 1, expanded, generated)
+
+
+def parse_agents(data):
+    '''
+    Read the agents of a request body. Each agent is either
+    {"start": [x, y], "goal": [x, y]} or [[sx, sy], [gx, gy]].
+    '''
+    agents = []
+    for entry in data.get('agents', []):
+        if isinstance(entry, dict):
+            start, goal = entry['start'], entry['goal']
+        else:
+            start, goal = entry
+        agents.append((tuple(int(v) for v in start), tuple(int(v) for v in goal)))
+    return agents
+
+
+def plan_request(maze, data, time_limit=10.0):
+    '''
+    JSON-ready result of a multi-agent request body: the agents (see
+    parse_agents), an optional "suboptimality" and an optional
+    "time_limit" in seconds, capped at time_limit.
+    '''
+    try:
+        agents = parse_agents(data)
+        suboptimality = float(data.get('suboptimality', 1.0))
+        limit = min(float(data.get('time_limit', time_limit)), time_limit)
+        started = time.perf_counter()
+        result = plan_agents(maze, agents, suboptimality, time_limit=limit)
+    except (KeyError, TypeError, ValueError) as error:
+        return {'error': f'Invalid agents: {error}'}
+    elapsed = time.perf_counter() - started
+    if result is None:
+        return {'error': f'No collision-free plan found within {limit:g} seconds'}
+    return {
+        'paths': [[[x, y] for x, y in path] for path in result.paths],
+        'cost': result.cost,
+        'makespan': result.makespan,
+        'expanded': result.expanded,
+        'generated': result.generated,
+        'agent_count': len(agents),
+        'algorithm': 'cbs' if suboptimality == 1 else 'ecbs',
+        'execution_time': round(elapsed, 4)
+    }
+
+
+def trace_agents(m, paths, delay=300, kill=False):
+    '''
+    Animate the paths of plan_agents on a maze_visual.maze, one agent per
+    path, all moving at the same time (one cell or wait per delay).
+    Returns the agents.
+    '''
+    from maze_visual import agent, COLOR  # Tk is only needed to draw
+
+    colors = [c for c in COLOR if c not in (COLOR.dark, COLOR.light)]
+    moving = {}
+    for i, path in enumerate(paths):
+        x, y = path[0]
+        # tracePath stops an agent that reaches its goal, but a planned path
+        # may cross its goal and leave again to let others by; a goal outside
+        # the maze makes the end of the path stop the agent instead
+        a = agent(m, x, y, goal=(0, 0), filled=True, color=colors[i % len(colors)])
+        moving[a] = list(path[1:])
+    m.tracePath(moving, kill=kill, delay=delay)
+    return list(moving)
@@ -1,4 +1,128 @@
 // Pathfinding Algorithm Visualization
+
+// Binary search results (wire.py on the server), requested with this Accept
+// type. Cell ids are (x - 1) * cols + (y - 1), all numbers little endian.
+const MAZE_RESULT_TYPE = 'application/x-maze-result';
+
+function readVarints(bytes, start, end) {
+    // LEB128; multiplying instead of shifting keeps values above 2^31 exact
+    const values = [];
+    let value = 0;
+    let scale = 1;
+    for (let i = start; i < end; i++) {
+        value += (bytes[i] & 0x7f) * scale;
+        if (bytes[i] < 0x80) {
+            values.push(value);
+            value = 0;
+            scale = 1;
+        } else {
+            scale *= 128;
+        }
+    }
+    return values;
+}
+
+function readRuns(bytes, start, end, runs) {
+    // run heads first (value << 1 | longer than 1), then the extra lengths
+    const tokens = readVarints(bytes, start, end);
+    const values = [];
+    let extra = runs;
+    for (let r = 0; r < runs; r++) {
+        const length = tokens[r] % 2 ? tokens[extra++] + 2 : 1;
+        const value = Math.floor(tokens[r] / 2);
+        for (let k = 0; k < length; k++) values.push(value);
+    }
+    return values;
+}
+
+function unzigzag(value) {
+    return value % 2 ? -(value + 1) / 2 : value / 2;
+}
+
+function directionCode(bytes, start, index) {
+    return (bytes[start + (index >> 2)] >> ((index & 3) * 2)) & 3;
+}
+
+function decodeMazeResult(buffer) {
+    const view = new DataView(buffer);
+    const bytes = new Uint8Array(buffer);
+    if (String.fromCharCode(...bytes.subarray(0, 4)) !== 'MZRS') {
+        throw new Error('Not a binary search result');
+    }
+    const exploredEncoding = bytes[5];
+    const pathEncoding = bytes[6];
+    const nameLength = bytes[7];
+    const cols = view.getUint32(12, true);
+    const exploredCount = view.getUint32(16, true);
+    const pathLength = view.getUint32(20, true);
+    const exploredSize = view.getUint32(24, true);
+    const runs = view.getUint32(28, true);
+    const algorithm = String.fromCharCode(...bytes.subarray(32, 32 + nameLength));
+    const start = 32 + nameLength;
+    const end = start + exploredSize;
+    const steps = [1, -1, -cols, cols]; // E, W, N, S
+
+    const readIds = (offset, count) => Float64Array.from({ length: count }, (_, i) => view.getUint32(offset + 4 * i, true));
+
+    let explored;
+    if (exploredEncoding === 2) {
+        // parent groups: every cell is one step away from an earlier one
+        explored = new Float64Array(exploredCount);
+        if (exploredCount) {
+            explored[0] = view.getUint32(start, true);
+            const directions = start + 4;
+            const groups = readRuns(bytes, directions + Math.ceil((exploredCount - 1) / 4), end, runs);
+            let cell = 1;
+            let parent = 0;
+            for (const group of groups) {
+                parent += unzigzag(Math.floor(group / 4));
+                for (let k = 0; k <= group % 4; k++, cell++) {
+                    explored[cell] = explored[parent] + steps[directionCode(bytes, directions, cell - 1)];
+                }
+            }
+        }
+    } else if (exploredEncoding === 1) {
+        // delta runs
+        explored = new Float64Array(exploredCount);
+        let id = 0;
+        readRuns(bytes, start, end, runs).forEach((delta, i) => {
+            id += unzigzag(delta);
+            explored[i] = id;
+        });
+    } else {
+        explored = readIds(start, exploredCount);
+    }
+
+    let path;
+    if (pathEncoding === 1 && pathLength) {
+        path = new Float64Array(pathLength);
+        path[0] = view.getUint32(end, true);
+        for (let i = 1; i < pathLength; i++) {
+            path[i] = path[i - 1] + steps[directionCode(bytes, end + 4, i - 1)];
+        }
+    } else {
+        path = readIds(end, pathLength);
+    }
+
+    const toCell = (id) => [Math.floor(id / cols) + 1, id % cols + 1];
+    return {
+        explored: Array.from(explored, toCell),
+        path: Array.from(path, toCell),
+        explored_count: exploredCount,
+        path_length: pathLength,
+        algorithm: algorithm
+    };
+}
+
+async function readSearchResult(response) {
+    // errors (and servers without the binary format) still answer in JSON
+    const type = response.headers.get('Content-Type') || '';
+    if (type.startsWith(MAZE_RESULT_TYPE)) {
+        return decodeMazeResult(await response.arrayBuffer());
+    }
+    return response.json();
+}
+
 class PathfindingVisualizer {
     constructor() {
         this.canvas = document.getElementById('mazeCanvas');
@@ -37,7 +161,7 @@ class PathfindingVisualizer {
         try {
             const response = await fetch('/api/pathfinding', {
                 method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
+                headers: { 'Content-Type': 'application/json', 'Accept': MAZE_RESULT_TYPE },
                 body: JSON.stringify({
                     algorithm: algorithm,
                     start: this.start,
@@ -45,7 +169,7 @@ class PathfindingVisualizer {
                 })
             });
 
-            const data = await response.json();
+            const data = await readSearchResult(response);
 
             if (data.error) {
                 throw new Error(data.error);
@@ -88,14 +212,14 @@ class PathfindingVisualizer {
         this.isRunning = true;
         this.updateButtonStates(true);
 
-        const algorithms = ['dfs', 'bfs', 'astar'];
+        const algorithms = ['dfs', 'bfs', 'astar', 'bidirectional_bfs', 'bidirectional_astar', 'jps', 'dijkstra', 'terrain_astar', 'hierarchical', 'goal_field', 'dstar_lite'];
         const results = {};
 
         try {
             for (const algorithm of algorithms) {
                 const response = await fetch('/api/pathfinding', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
+                    headers: { 'Content-Type': 'application/json', 'Accept': MAZE_RESULT_TYPE },
                     body: JSON.stringify({
                         algorithm: algorithm,
                         start: this.start,
@@ -103,7 +227,7 @@ class PathfindingVisualizer {
                     })
                 });
 
-                const data = await response.json();
+                const data = await readSearchResult(response);
                 results[algorithm] = data;
             }
 
@@ -188,7 +312,7 @@ class PathfindingVisualizer {
                 <h6>Algorithm Details:</h6>
                 <ul class="list-unstyled">
                     <li><strong>Algorithm:</strong> ${data.algorithm.toUpperCase()}</li>
-                    <li><strong>Optimal:</strong> ${data.algorithm === 'bfs' || data.algorithm === 'astar' ? 'Yes' : 'No'}</li>
+                    <li><strong>Optimal:</strong> ${data.algorithm !== 'dfs' ? 'Yes' : 'No'}</li>
                     <li><strong>Start:</strong> (${data.path[0] ? data.path[0][0] : this.start[0]}, ${data.path[0] ? data.path[0][1] : this.start[1]})</li>
                     <li><strong>Goal:</strong> (${data.path[data.path.length - 1] ? data.path[data.path.length - 1][0] : this.goal[0]}, ${data.path[data.path.length - 1] ? data.path[data.path.length - 1][1] : this.goal[1]})</li>
                 </ul>
@@ -202,7 +326,7 @@ class PathfindingVisualizer {
         let html = '<div class="row">';
 
         for (const [algorithm, data] of Object.entries(results)) {
-            const isOptimal = algorithm === 'bfs' || algorithm === 'astar';
+            const isOptimal = algorithm !== 'dfs';
             html += `
                 <div class="col-md-4">
                     <div class="card">
@@ -0,0 +1,184 @@
+"""
+Headless maze renderer: walls, explored cells and paths to PNG with NumPy.
+
+The Tk maze draws one canvas item per wall and moves agents cell by cell,
+which needs a display and takes seconds on large mazes. This module builds
+the image directly as an RGB array instead:
+
+    * every cell is a block of `cell_size` pixels, with a shared 1 pixel
+      border on which the walls are drawn,
+    * cell colors (background, explored, path) are set in a (rows, cols, 3)
+      table and blown up to pixel blocks with np.repeat,
+    * walls are written through a boolean mask of the grid-line pixels.
+
+The PNG is encoded with zlib from the standard library, so nothing beyond
+NumPy is needed.
+
+    python render.py maze_config.csv -a astar --heatmap -o astar.png
+"""
+
+import argparse
+import struct
+import zlib
+from itertools import chain
+
+import numpy as np
+
+from maze_core import grid_of, E, W, N, S
+
+
+# RGB values of the Tk colors used by maze_visual.COLOR
+THEMES = {
+    'dark': {'background': (28, 28, 28), 'wall': (255, 255, 255)},   # gray11 / white
+    'light': {'background': (255, 255, 255), 'wall': (0, 0, 0)},
+}
+EXPLORED = (0, 178, 238)    # DeepSkyBlue2, the footprint of the blue agent
+PATH = (255, 99, 71)        # tomato, the footprint of the red agent
+GOAL = (0, 139, 0)          # green4
+
+# Heat map from the first to the last explored cell
+_HEAT = np.array([(48, 18, 59), (40, 120, 240), (30, 220, 160), (240, 220, 40), (200, 30, 10)], dtype=float)
+
+
+def heat_colors(n):
+    '''n RGB colors running along the heat map, as a uint8 (n, 3) array'''
+    if n <= 0:
+        return np.empty((0, 3), dtype=np.uint8)
+    t = np.linspace(0, len(_HEAT) - 1, n)
+    anchors = np.arange(len(_HEAT))
+    return np.stack([np.interp(t, anchors, _HEAT[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+
+def _ids(grid, cells):
+    '''
+    (x, y) cells to a NumPy array of cell ids. A 1-D integer array is taken
+    to hold cell ids already (e.g. DistanceField.explored_ids()).
+    '''
+    if isinstance(cells, np.ndarray) and cells.ndim == 1:
+        return cells.astype(np.int64, copy=False)
+    if not len(cells):
+        return np.empty(0, dtype=np.int64)
+    xy = np.fromiter(chain.from_iterable(cells), dtype=np.int64, count=2 * len(cells))
+    return (xy[0::2] - 1) * grid.cols + (xy[1::2] - 1)
+
+
+def _walls(grid):
+    '''
+    Closed walls along the grid lines:
+        horizontal[i, j]--> wall on row line i (above row i+1) across column j+1
+        vertical[i, j]-->   wall on column line j (left of column j+1) across row i+1
+    A wall counts as closed if either of the two cells has it closed.
+    '''
+    masks = grid.to_numpy()
+    horizontal = np.zeros((grid.rows + 1, grid.cols), dtype=bool)
+    horizontal[:-1] |= (masks & N) == 0
+    horizontal[1:] |= (masks & S) == 0
+    vertical = np.zeros((grid.rows, grid.cols + 1), dtype=bool)
+    vertical[:, :-1] |= (masks & W) == 0
+    vertical[:, 1:] |= (masks & E) == 0
+    return horizontal, vertical
+
+
+def render(maze, explored=(), path=(), heatmap=False, cell_size=None, theme='dark'):
+    '''
+    Rasterize a maze and a search result into an RGB uint8 array.
+    maze-->      A MazeGrid or anything maze_core.grid_of accepts
+    explored-->  Explored cells in visit order, as returned by the searches,
+                 or a 1-D array of cell ids
+    path-->      Path cells (or ids); the last one is marked as the goal
+    heatmap-->   Color explored cells by visit order instead of one color
+    cell_size--> Pixels per cell including one border line, default chosen
+                 from the maze size (2 for a 2000x2000 maze)
+    theme-->     'dark' or 'light'
+    '''
+    grid = grid_of(maze)
+    rows, cols = grid.rows, grid.cols
+    colors = THEMES[theme]
+    if cell_size is None:
+        cell_size = int(min(20, max(2, 4000 // max(rows, cols))))
+    s = cell_size
+
+    # Color of every cell, then painted onto its pixel block
+    cell_colors = np.empty((rows * cols, 3), dtype=np.uint8)
+    cell_colors[:] = colors['background']
+    explored_ids = _ids(grid, explored)
+    if explored_ids.size:
+        if heatmap:
+            # assigned back to front: with repeated ids the last assignment
+            # wins, so the first visit of a cell decides its color
+            cell_colors[explored_ids[::-1]] = heat_colors(explored_ids.size)[::-1]
+        else:
+            cell_colors[explored_ids] = EXPLORED
+    path_ids = _ids(grid, path)
+    if path_ids.size:
+        cell_colors[path_ids] = PATH
+        cell_colors[path_ids[-1]] = GOAL
+    cell_colors = cell_colors.reshape(rows, cols, 3)
+
+    height, width = rows * s + 1, cols * s + 1
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:-1, :-1] = np.repeat(np.repeat(cell_colors, s, axis=0), s, axis=1)
+    image[-1], image[:, -1] = image[-2], image[:, -2]
+
+    # Walls on the grid-line pixels, plus the lattice points they touch
+    horizontal, vertical = _walls(grid)
+    walls = np.zeros((height, width), dtype=bool)
+    walls[0::s, :-1] = np.repeat(horizontal, s, axis=1)
+    walls[:-1, 0::s] |= np.repeat(vertical, s, axis=0)
+    corners = np.zeros((rows + 1, cols + 1), dtype=bool)
+    corners[:, :-1] |= horizontal
+    corners[:, 1:] |= horizontal
+    corners[:-1] |= vertical
+    corners[1:] |= vertical
+    walls[0::s, 0::s] |= corners
+    image.reshape(-1, 3)[np.flatnonzero(walls)] = colors['wall']
+    return image
+
+
+def encode_png(image, level=1):
+    '''PNG bytes of an RGB uint8 (height, width, 3) array'''
+    height, width, _ = image.shape
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)  # filter byte 0 per row
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8 bit RGB
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(raw.tobytes(), level)) + chunk(b'IEND', b''))
+
+
+def save_png(filename, maze, explored=(), path=(), **options):
+    '''Render a maze and search result (see render) and write it as PNG'''
+    with open(filename, 'wb') as f:
+        f.write(encode_png(render(maze, explored, path, **options)))
+
+
+def main():
+    import mazefile
+    from maze_csv import load_csv
+    from task1 import DFS, BFS, AStar
+
+    parser = argparse.ArgumentParser(description="Render a maze and a search result to PNG")
+    parser.add_argument("maze", help="Maze CSV or binary maze file")
+    parser.add_argument("-a", "--algorithm", choices=('dfs', 'bfs', 'astar'), help="Search to draw")
+    parser.add_argument("--heatmap", action="store_true", help="Color explored cells by visit order")
+    parser.add_argument("--cell-size", type=int, default=None, help="Pixels per cell")
+    parser.add_argument("--theme", choices=sorted(THEMES), default='dark')
+    parser.add_argument("-o", "--output", default='maze.png')
+    args = parser.parse_args()
+
+    grid = mazefile.open_maze(args.maze) if mazefile.is_maze_file(args.maze) else load_csv(args.maze)
+    explored, path = [], []
+    if args.algorithm:
+        search = {'dfs': DFS, 'bfs': BFS, 'astar': AStar}[args.algorithm]
+        explored, path = search(grid, (grid.rows, grid.cols), (1, 1))
+    save_png(args.output, grid, explored, path, heatmap=args.heatmap,
+             cell_size=args.cell_size, theme=args.theme)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
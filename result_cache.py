@@ -0,0 +1,92 @@
+"""
+Bounded LRU cache for serialized search results.
+
+The web maze is fixed, so the same (algorithm, start, goal) query always
+produces the same explored list and path. The API handlers keep the JSON
+payload they already built and serve repeats straight from this cache.
+
+Keys start with the content hash of the maze (MazeGrid.fingerprint()), so
+a different or edited maze never sees stale results. The cache is limited
+both by entry count and by the total size of the stored payloads, and is
+safe to share between the threads of the Flask server.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def cache_key(fingerprint, algorithm, start, goal, encoding='json', heuristic=None):
+    '''
+    Key of one query; start and goal are normalized to (x, y) int tuples.
+    encoding-->  Response format of the payload, e.g. 'json' or 'binary'
+    heuristic--> Heuristic the search runs with, None for the ones without
+    '''
+    return (fingerprint, algorithm, tuple(int(v) for v in start), tuple(int(v) for v in goal), encoding,
+            heuristic)
+
+
+class ResultCache:
+    '''
+    Thread-safe LRU mapping key -> serialized payload (JSON str or bytes).
+    max_entries--> Maximum number of stored payloads
+    max_bytes-->   Maximum total payload size; a payload larger than this
+                   on its own is never stored
+    '''
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        '''The cached payload for key, or None'''
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key, payload):
+        '''Store payload under key, evicting least recently used entries'''
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._entries[key] = payload
+            self.nbytes += size
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        '''Counters for monitoring, as a JSON friendly dict'''
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._entries)
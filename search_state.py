@@ -0,0 +1,99 @@
+"""
+Compact per-search bookkeeping for the maze searches.
+
+A SearchState replaces the `visited_positions` membership tests and the
+`pathtoreverse` dictionary of the original searches with two bit-packed
+arrays indexed by cell id (see maze_core):
+
+    visited --> 1 bit per cell
+    parents --> 2 bits per cell, the direction leading back to the parent
+
+Together that is 3 bits per cell (about 94 KB for a 500x500 maze), and every
+visited test or parent lookup is O(1). The order in which cells are visited
+is kept as an array of ids so the searches can still return the ordered
+`visited_positions` list the API and `tracePath` expect.
+"""
+
+from array import array
+
+from maze_core import grid_of
+
+
+class SearchState:
+    '''
+    Visited bitmap, packed parent directions and visit order of one search.
+    grid--> The MazeGrid (or any maze accepted by maze_core.grid_of)
+    '''
+
+    def __init__(self, grid):
+        grid = grid_of(grid)
+        self.grid = grid
+        self.visited = bytearray((grid.size + 7) >> 3)
+        self.parents = bytearray((grid.size + 3) >> 2)
+        self.order = array('l')
+        # parent direction code (0..3) <-> id offset from child to parent
+        self._offsets = (1, -1, -grid.cols, grid.cols)
+        self._codes = {1: 0, -1: 1, -grid.cols: 2, grid.cols: 3}
+
+    def is_visited(self, cid):
+        return self.visited[cid >> 3] >> (cid & 7) & 1
+
+    def visit(self, cid, parent=None):
+        '''Mark a cell as visited, record it in the visit order and set its parent'''
+        self.visited[cid >> 3] |= 1 << (cid & 7)
+        self.order.append(cid)
+        if parent is not None:
+            self.set_parent(cid, parent)
+
+    def set_parent(self, cid, parent):
+        shift = (cid & 3) << 1
+        i = cid >> 2
+        self.parents[i] = (self.parents[i] & ~(3 << shift)) | (self._codes[parent - cid] << shift)
+
+    def parent(self, cid):
+        return cid + self._offsets[self.parents[cid >> 2] >> ((cid & 3) << 1) & 3]
+
+    def path_ids(self, start_id, goal_id):
+        '''
+        Follow the parents from goal back to start and return the ids in
+        start -> goal order, or an empty list if the goal was never reached
+        (or its parents do not lead back to start within the size of the maze).
+        '''
+        if not self.is_visited(goal_id):
+            return []
+        path = [goal_id]
+        cid = goal_id
+        while cid != start_id:
+            if len(path) > self.grid.size:
+                return []
+            cid = self.parent(cid)
+            path.append(cid)
+        path.reverse()
+        return path
+
+    def explored(self):
+        '''The visited cells as (x, y) tuples, in visit order'''
+        return self.grid.cells(self.order)
+
+    def path(self, start, goal):
+        '''The start -> goal path as (x, y) tuples'''
+        grid = self.grid
+        return grid.cells(self.path_ids(grid.cell_id(start), grid.cell_id(goal)))
+
+    @property
+    def nbytes(self):
+        return len(self.visited) + len(self.parents) + self.order.itemsize * len(self.order)
+
+
+def collect(steps):
+    '''
+    Run a step-wise search to the end. steps is a generator that yields
+    arrays of newly explored cell ids and returns the path ids (such as
+    astar.astar_steps). Returns (explored ids, path ids).
+    '''
+    explored = array('l')
+    while True:
+        try:
+            explored.extend(next(steps))
+        except StopIteration as done:
+            return explored, done.value
@@ -0,0 +1,180 @@
+"""
+Resumable search sessions for stepping through a search in the UI.
+
+A SearchSession wraps the step-wise form of a search (see streaming.py).
+The generator is the state machine: its frontier, visited bitmap and packed
+parents stay alive between requests, and it only runs as far as the client
+has asked for. The explored cell ids produced so far are kept in one
+compact array, so
+
+    next(count) --> the following count explored cells
+    seek(step)  --> jump to any step; forward runs the search further,
+                    backward only moves the cursor and reports the cells
+                    to take off the canvas
+
+never search again and never re-send cells the client already has.
+
+SessionStore keeps the sessions of all clients under an LRU policy with a
+time to live: a session unused for `ttl` seconds is dropped, and creating
+one more than `max_sessions` drops the least recently used one.
+"""
+
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from maze_core import grid_of
+from streaming import search_steps
+
+
+# Explored cells computed per generator step; a seek may run the search
+# this far past the requested step
+STEP_CHUNK = 64
+
+
+class SearchSession:
+    '''
+    One search, computed lazily and replayed from a cursor.
+    steps-->       Step-wise search generator (see search_state.collect)
+    fingerprint--> MazeGrid.fingerprint() of the maze when the search started,
+                   so callers can tell that the maze has been edited since
+    heuristic-->   Name of the heuristic the search runs with, if it takes one
+    '''
+
+    def __init__(self, maze, algorithm, steps, fingerprint=None, heuristic=None):
+        self.grid = grid_of(maze)
+        self.algorithm = algorithm
+        self.heuristic = heuristic
+        self.fingerprint = fingerprint
+        self.explored = array('l')  # explored ids computed so far, in order
+        self.path = None            # path ids, once the search has finished
+        self.cursor = 0             # number of explored cells the client shows
+        self.lock = threading.Lock()
+        self._steps = steps
+
+    @property
+    def finished(self):
+        return self.path is not None
+
+    def _compute(self, count):
+        '''Run the search until count cells are explored or it finishes'''
+        while self.path is None and len(self.explored) < count:
+            try:
+                self.explored.extend(next(self._steps))
+            except StopIteration as done:
+                self.path = done.value
+                self._steps = None   # frees the frontier and visited state
+
+    def seek(self, step):
+        '''
+        Move the cursor to step, clamped to the explored cells. Returns the
+        ids that became visible and the ids that were taken back.
+        '''
+        self._compute(step)
+        step = max(0, min(step, len(self.explored)))
+        previous, self.cursor = self.cursor, step
+        if step >= previous:
+            return self.explored[previous:step], array('l')
+        return array('l'), self.explored[step:previous]
+
+    def next(self, count):
+        '''Advance the cursor by count explored cells'''
+        return self.seek(self.cursor + count)
+
+    def to_dict(self, added=(), removed=()):
+        '''JSON-ready state; the path is included once the cursor reaches the end'''
+        done = self.finished and self.cursor == len(self.explored)
+        state = {
+            'algorithm': self.algorithm,
+            'cursor': self.cursor,
+            'computed': len(self.explored),
+            'finished': self.finished,
+            'done': done,
+            'added': [[x, y] for x, y in self.grid.cells(added)],
+            'removed': [[x, y] for x, y in self.grid.cells(removed)],
+        }
+        if self.heuristic is not None:
+            state['heuristic'] = self.heuristic
+        if self.finished:
+            state['explored_count'] = len(self.explored)
+            state['path_length'] = len(self.path)
+        if done:
+            state['path'] = [[x, y] for x, y in self.grid.cells(self.path)]
+        return state
+
+
+class SessionStore:
+    '''
+    Thread-safe LRU of SearchSession objects with a time to live.
+    max_sessions--> Sessions kept at most; the least recently used one goes first
+    ttl-->          Seconds after its last use that a session expires
+    '''
+
+    def __init__(self, max_sessions=64, ttl=600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()   # id -> (session, last use)
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (_, last_use) = next(iter(self._sessions.items()))
+            if now - last_use <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def create(self, maze, algorithm, start, goal, search=None, fingerprint=None, heuristic=None):
+        '''
+        Start a session. Step-wise searches do not run until the first
+        next/seek; any other algorithm is run through search right away.
+        search, heuristic--> As in streaming.search_steps
+        fingerprint--> Stored on the session, see SearchSession
+        Returns (session id, session), or None if the algorithm is unknown.
+        '''
+        steps = search_steps(maze, algorithm, start, goal, search, STEP_CHUNK, heuristic)
+        if steps is None:
+            return None
+        session = SearchSession(maze, algorithm, steps, fingerprint, heuristic)
+        session_id = secrets.token_urlsafe(12)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session_id] = (session, now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session_id, session
+
+    def get(self, session_id):
+        '''The session, or None if it is unknown or expired; refreshes its TTL'''
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            return entry[0]
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'ttl': self.ttl,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
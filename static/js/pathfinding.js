@@ -8,6 +8,8 @@ class PathfindingDemo {
         this.path = [];
         this.isAnimating = false;
         this.animationSpeed = 5;
+        this.session = null; // server-side search session of the step controls
+        this.isPlaying = false;
 
         this.initializeEventListeners();
         this.drawMaze();
@@ -17,6 +19,10 @@ class PathfindingDemo {
         document.getElementById('runBtn').addEventListener('click', () => this.runAlgorithm());
         document.getElementById('resetBtn').addEventListener('click', () => this.reset());
         document.getElementById('compareBtn').addEventListener('click', () => this.compareAlgorithms());
+        document.getElementById('stepBtn').addEventListener('click', () => this.stepSession(this.animationSpeed));
+        document.getElementById('stepBackBtn').addEventListener('click', () => this.stepSession(-this.animationSpeed));
+        document.getElementById('playPauseBtn').addEventListener('click', () => this.togglePlay());
+        document.getElementById('seekSlider').addEventListener('change', (e) => this.seekSession(parseInt(e.target.value)));
         document.getElementById('speedSlider').addEventListener('input', (e) => {
             this.animationSpeed = parseInt(e.target.value);
             document.getElementById('speedValue').textContent = e.target.value;
@@ -71,8 +77,16 @@ class PathfindingDemo {
         runBtn.disabled = true;
         runBtn.innerHTML = '<div class="spinner"></div> Running...';
 
+        this.closeSession();
+        this.isAnimating = true;
+        this.explored = [];
+        this.path = [];
+        this.drawMaze();
+
         try {
-            const response = await fetch('/api/run_algorithm', {
+            // Explored cells arrive in chunks while the search runs and are
+            // drawn straight away instead of after the whole result is in
+            const response = await fetch('/api/run_algorithm_stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -80,18 +94,27 @@ class PathfindingDemo {
                 body: JSON.stringify({
                     algorithm: algorithm,
                     start: [20, 20],
-                    goal: [1, 1]
+                    goal: [1, 1],
+                    format: 'ndjson'
                 })
             });
 
-            const data = await response.json();
-
-            if (data.error) {
-                throw new Error(data.error);
+            let data = null;
+            for await (const message of this.readMessages(response)) {
+                if (message.error) {
+                    throw new Error(message.error);
+                }
+                if (message.type === 'explored') {
+                    await this.animateCells(message.cells, this.explored, '#ffc107', 50);
+                } else if (message.type === 'path') {
+                    this.path = message.path;
+                } else if (message.type === 'done') {
+                    data = message;
+                }
+            }
+            if (!data) {
+                throw new Error('The search stream ended early');
             }
-
-            this.explored = data.explored;
-            this.path = data.path;
 
             // Display results
             resultsDiv.innerHTML = `
@@ -103,8 +126,8 @@ class PathfindingDemo {
                 </div>
             `;
 
-            // Animate the algorithm
-            await this.animateAlgorithm();
+            // Animate final path
+            await this.animateCells(this.path, [], '#007bff', 100);
 
         } catch (error) {
             resultsDiv.innerHTML = `
@@ -113,36 +136,179 @@ class PathfindingDemo {
                 </div>
             `;
         } finally {
+            this.isAnimating = false;
             runBtn.disabled = false;
             runBtn.innerHTML = '<i class="fas fa-play me-2"></i>Run Algorithm';
         }
     }
 
-    async animateAlgorithm() {
-        this.isAnimating = true;
+    async *readMessages(response) {
+        // One JSON object per line (NDJSON); a line may span several reads
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (line.trim()) yield JSON.parse(line);
+            }
+        }
+        if (buffer.trim()) yield JSON.parse(buffer);
+    }
+
+    async animateCells(cells, drawn, color, delay) {
+        // drawn collects the cells, so the pace stays the same across chunks
+        for (const [x, y] of cells) {
+            this.drawCell(x - 1, y - 1, color, '');
+            drawn.push([x, y]);
+
+            if (drawn.length % this.animationSpeed === 0) {
+                await this.sleep(delay);
+            }
+        }
+    }
+
+    async openSession() {
+        // Start a resumable search for the selected algorithm; nothing is
+        // searched until cells are asked for
+        const algorithm = document.getElementById('algorithmSelect').value;
+        if (this.session && this.session.algorithm === algorithm) return;
+
+        this.closeSession();
+        const data = await this.postJSON('/api/search_session', {
+            algorithm: algorithm,
+            start: [20, 20],
+            goal: [1, 1]
+        });
+        this.session = { id: data.session, algorithm: algorithm, cursor: 0, pathShown: false };
+        this.explored = [];
+        this.path = [];
         this.drawMaze();
+    }
 
-        // Animate explored nodes
-        for (let i = 0; i < this.explored.length; i++) {
-            const [x, y] = this.explored[i];
-            this.drawCell(x - 1, y - 1, '#ffc107', '');
+    closeSession() {
+        this.isPlaying = false;
+        this.updatePlayButton();
+        if (this.session) {
+            fetch(`/api/search_session/${this.session.id}`, { method: 'DELETE' });
+            this.session = null;
+        }
+    }
 
-            if (i % this.animationSpeed === 0) {
-                await this.sleep(50);
+    async moveSession(body) {
+        const data = await this.postJSON(`/api/search_session/${this.session.id}`, body);
+        const session = this.session;
+
+        if (session.pathShown && !data.done) {
+            // stepping back from the end: repaint without the path
+            session.pathShown = false;
+            this.explored.length -= data.removed.length;
+            this.drawMaze();
+            this.explored.forEach(([x, y]) => this.drawCell(x - 1, y - 1, '#ffc107', ''));
+        } else {
+            for (const [x, y] of data.removed) {
+                this.drawCell(x - 1, y - 1, '#ffffff', '');
             }
+            this.explored.length -= data.removed.length;
+        }
+        for (const [x, y] of data.added) {
+            this.drawCell(x - 1, y - 1, '#ffc107', '');
+            this.explored.push([x, y]);
+        }
+        if (data.done && !session.pathShown) {
+            session.pathShown = true;
+            this.path = data.path;
+            this.path.forEach(([x, y]) => this.drawCell(x - 1, y - 1, '#007bff', ''));
+            this.showSessionResults(data);
         }
 
-        // Animate final path
-        for (let i = 0; i < this.path.length; i++) {
-            const [x, y] = this.path[i];
-            this.drawCell(x - 1, y - 1, '#007bff', '');
+        session.cursor = data.cursor;
+        const slider = document.getElementById('seekSlider');
+        slider.max = data.finished ? data.computed : data.computed + 100;
+        slider.value = data.cursor;
+        document.getElementById('stepValue').textContent = data.cursor;
+        return data;
+    }
 
-            if (i % this.animationSpeed === 0) {
-                await this.sleep(100);
+    async stepSession(count) {
+        if (this.isAnimating) return;
+        try {
+            await this.openSession();
+            if (count >= 0) {
+                return await this.moveSession({ action: 'next', count: count });
             }
+            return await this.moveSession({ action: 'seek', step: Math.max(0, this.session.cursor + count) });
+        } catch (error) {
+            this.showError(error.message);
         }
+    }
 
-        this.isAnimating = false;
+    async seekSession(step) {
+        if (this.isAnimating) return;
+        try {
+            await this.openSession();
+            await this.moveSession({ action: 'seek', step: step });
+        } catch (error) {
+            this.showError(error.message);
+        }
+    }
+
+    async togglePlay() {
+        if (this.isAnimating) return;
+        this.isPlaying = !this.isPlaying;
+        this.updatePlayButton();
+
+        while (this.isPlaying) {
+            const data = await this.stepSession(this.animationSpeed);
+            if (!data || data.done) break;
+            await this.sleep(50);
+        }
+        this.isPlaying = false;
+        this.updatePlayButton();
+    }
+
+    updatePlayButton() {
+        document.getElementById('playPauseBtn').innerHTML =
+            `<i class="fas fa-${this.isPlaying ? 'pause' : 'play'}"></i>`;
+    }
+
+    async postJSON(url, body) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body)
+        });
+        const data = await response.json();
+        if (data.error) {
+            if (url.startsWith('/api/search_session/')) this.session = null;
+            throw new Error(data.error);
+        }
+        return data;
+    }
+
+    showSessionResults(data) {
+        document.getElementById('results').innerHTML = `
+            <div class="alert alert-success">
+                <h6>Algorithm: ${data.algorithm.toUpperCase()}</h6>
+                <p><strong>Nodes Explored:</strong> ${data.explored_count}</p>
+                <p><strong>Path Length:</strong> ${data.path_length}</p>
+            </div>
+        `;
+    }
+
+    showError(message) {
+        document.getElementById('results').innerHTML = `
+            <div class="alert alert-danger">
+                <strong>Error:</strong> ${message}
+            </div>
+        `;
     }
 
     async compareAlgorithms() {
@@ -207,6 +373,9 @@ class PathfindingDemo {
     }
 
     reset() {
+        this.closeSession();
+        document.getElementById('seekSlider').max = 0;
+        document.getElementById('stepValue').textContent = 0;
         this.explored = [];
         this.path = [];
         this.isAnimating = false;
@@ -0,0 +1,208 @@
+"""
+Streaming search results.
+
+/api/run_algorithm returns only once the search has finished, with every
+explored cell in one JSON array. The searches here are generators instead:
+they yield the newly explored cell ids in chunks while they run and return
+the path ids at the end (the protocol of astar.astar_steps and
+search_state.collect). search_events() turns such a generator into a
+sequence of small messages,
+
+    {"type": "explored", "cells": [[x, y], ...]}     one per chunk
+    {"type": "path", "path": [[x, y], ...]}
+    {"type": "done", "explored_count": ..., "path_length": ..., "algorithm": ...}
+    {"type": "error", "error": ...}                  instead of the above
+
+which are written as NDJSON (one JSON object per line) or as Server-Sent
+Events. A client starts drawing as soon as the first chunk arrives and the
+server never holds more than one chunk of serialized cells.
+
+DFS, BFS, A* and the terrain searches stream while they search. Searches without a step-wise form
+(bidirectional, JPS, hierarchical, ...) are run to the end first and their
+result is streamed in the same chunks.
+"""
+
+import json
+from collections import deque
+
+from maze_core import grid_of
+from search_state import SearchState
+from astar import astar_steps
+from heuristics import table_heuristic, DEFAULT_HEURISTIC
+from terrain import dijkstra_steps, cheapest_manhattan
+
+
+# Explored cells per message; small enough for a first frame within
+# milliseconds, large enough to keep the per-message overhead low
+CHUNK_SIZE = 512
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+
+def dfs_steps(maze, start, goal, chunk_size=CHUNK_SIZE):
+    '''
+    Depth-first search, yielding explored ids in chunks of chunk_size (None
+    yields them all at the end, as astar_steps does). task1.DFS runs it to
+    the end with search_state.collect.
+    '''
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    table = grid.expansion_table('ESWN')  # reversed priority, the stack pops the last one first
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    order = state.order
+    sent, flush_at = 0, chunk_size
+
+    frontiers = [start_id]
+    state.visit(start_id)
+    while frontiers:
+        current = frontiers.pop()
+        if current == goal_id:
+            break
+        for offset in table[walls[current]]:
+            child = current + offset
+            if not state.is_visited(child):
+                state.visit(child, current)
+                frontiers.append(child)
+        if chunk_size and len(order) >= flush_at:
+            yield order[sent:]
+            sent = len(order)
+            flush_at = sent + chunk_size
+
+    yield order[sent:]
+    return state.path_ids(start_id, goal_id)
+
+
+def bfs_steps(maze, start, goal, chunk_size=CHUNK_SIZE):
+    '''Breadth-first search as dfs_steps, the search of task1.BFS'''
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    table = grid.expansion_table('NWSE')
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    order = state.order
+    sent, flush_at = 0, chunk_size
+
+    frontiers = deque([start_id])
+    state.visit(start_id)
+    while frontiers:
+        current = frontiers.popleft()
+        if current == goal_id:
+            break
+        for offset in table[walls[current]]:
+            child = current + offset
+            if not state.is_visited(child):
+                state.visit(child, current)
+                frontiers.append(child)
+        if chunk_size and len(order) >= flush_at:
+            yield order[sent:]
+            sent = len(order)
+            flush_at = sent + chunk_size
+
+    yield order[sent:]
+    return state.path_ids(start_id, goal_id)
+
+
+def astar_table_steps(maze, start, goal, chunk_size=CHUNK_SIZE, heuristic=DEFAULT_HEURISTIC):
+    '''A* as in task1.AStar (heuristic named as in heuristics.HEURISTICS, larger g first on ties)'''
+    grid = grid_of(maze)
+    h = table_heuristic(grid, heuristic, grid.cell_id(goal))
+    return astar_steps(grid, start, goal, heuristic=h, order='NWSE', tie_break='max_g',
+                       chunk_size=chunk_size)
+
+
+def terrain_astar_steps(maze, start, goal, chunk_size=CHUNK_SIZE):
+    '''A* over the terrain costs as in task1.TerrainAStar'''
+    grid = grid_of(maze)
+    h = cheapest_manhattan(grid, grid.cell_id(goal))
+    return dijkstra_steps(grid, start, goal, heuristic=h, order='NWSE', chunk_size=chunk_size)
+
+
+def terrain_dijkstra_steps(maze, start, goal, chunk_size=CHUNK_SIZE):
+    '''Dijkstra over the terrain costs as in task1.Dijkstra'''
+    return dijkstra_steps(maze, start, goal, order='NWSE', chunk_size=chunk_size)
+
+
+STEP_SEARCHES = {
+    'dfs': dfs_steps,
+    'bfs': bfs_steps,
+    'astar': astar_table_steps,
+    'dijkstra': terrain_dijkstra_steps,
+    'terrain_astar': terrain_astar_steps,
+}
+
+
+def result_steps(grid, explored, path, chunk_size=CHUNK_SIZE):
+    '''The step protocol over a finished (explored, path) search result'''
+    ids = [grid.cell_id(cell) for cell in explored]
+    for i in range(0, len(ids), chunk_size):
+        yield ids[i:i + chunk_size]
+    return [grid.cell_id(cell) for cell in path]
+
+
+def search_steps(maze, algorithm, start, goal, search=None, chunk_size=CHUNK_SIZE, heuristic=None):
+    '''
+    Step-wise form of any algorithm, or None if it is unknown.
+    search-->     Callable (maze, start, goal) -> (explored, path), or None for
+                  an unknown algorithm, used when algorithm has no step-wise
+                  form in STEP_SEARCHES
+    heuristic-->  heuristics.HEURISTICS name for the algorithms that take one
+                  (see heuristics.heuristic_choice), None for the others;
+                  search has to apply it itself
+    '''
+    grid = grid_of(maze)
+    if algorithm in STEP_SEARCHES:
+        if heuristic is not None:
+            return STEP_SEARCHES[algorithm](grid, start, goal, chunk_size, heuristic=heuristic)
+        return STEP_SEARCHES[algorithm](grid, start, goal, chunk_size)
+    result = search(maze, start, goal) if search is not None else None
+    if result is None:
+        return None
+    return result_steps(grid, *result, chunk_size=chunk_size)
+
+
+def search_events(maze, algorithm, start, goal, search=None, chunk_size=CHUNK_SIZE, heuristic=None):
+    '''
+    Messages (dicts) of one streamed search; search and heuristic as in
+    search_steps.
+    The explored count is only known at the end, so it is sent in the
+    closing "done" message.
+    '''
+    grid = grid_of(maze)
+    steps = search_steps(maze, algorithm, start, goal, search, chunk_size, heuristic)
+    if steps is None:
+        yield {'type': 'error', 'error': 'Invalid algorithm'}
+        return
+
+    explored_count = 0
+    while True:
+        try:
+            ids = next(steps)
+        except StopIteration as done:
+            path = grid.cells(done.value)
+            break
+        if len(ids):
+            explored_count += len(ids)
+            yield {'type': 'explored', 'cells': grid.cells(ids)}
+
+    yield {'type': 'path', 'path': path}
+    done = {'type': 'done', 'explored_count': explored_count,
+            'path_length': len(path), 'algorithm': algorithm}
+    if heuristic is not None:
+        done['heuristic'] = heuristic
+    yield done
+
+
+def encode_events(events, fmt='ndjson'):
+    '''Serialize messages as NDJSON lines or Server-Sent Events'''
+    if fmt == 'sse':
+        for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+    else:
+        for event in events:
+            yield json.dumps(event, separators=(',', ':')) + '\n'
@@ -1,24 +1,44 @@
 # Importing modules and libraries
-from maze_visual import maze, agent
+# maze_visual (and with it tkinter) is imported by main() only, so the web
+# apps can import the searches on servers without a display
 import sys
 import argparse
 # Import any other modules you want to use here
 import math
-from queue import PriorityQueue
+from maze_core import grid_of
+from search_state import collect
+from wavefront import distance_field
+from astar import astar_search
+from bidirectional import bidirectional_bfs, bidirectional_astar
+from jps import jump_point_search
+from hierarchy import build_hierarchy
+from terrain import dijkstra_search, cheapest_manhattan
+from heuristics import table_heuristic, heuristic_factory, register_maze_file, DEFAULT_HEURISTIC
+from streaming import dfs_steps, bfs_steps
 
 
 # DO NOT CHANGE THESE LINES OF CODE
 # ----------------------------------
 ROWS = 20 # Number of rows in the maze
 COLS = 20 # Number of columns in the maze
-m = maze(ROWS, COLS) # Initialize the maze
-
-# Load the maze from the csv file. You may need to change this path depending on where you save the files.
-# m.LoadMaze(loadMaze='maze_config.csv', theme="dark") //
-# m.LoadMaze(loadMaze='C:\Users\emwal\Downloads\PA1 (4)\maze_config.csv', theme="dark")
-m.LoadMaze(loadMaze='maze_config.csv', theme="dark")
+MAZE_FILE = 'maze_config.csv' # You may need to change this path depending on where you save the files.
+m = None # The Tk maze, created and loaded by load_maze() when main() runs
 # ----------------------------------
 
+
+def load_maze():
+    '''
+    Create the Tk maze window and load MAZE_FILE into it. This is the only
+    place that needs a display.
+    '''
+    global m
+    from maze_visual import maze
+    m = maze(ROWS, COLS) # Initialize the maze
+    m.LoadMaze(loadMaze=MAZE_FILE, theme="dark")
+    register_maze_file(m, MAZE_FILE)   #'alt' landmarks come from MAZE_FILE.alt.npz once built
+    return m
+
+
 def DFS(maze, start, goal):
     '''
     This function should implement the Depth First Search algorithm.
@@ -39,45 +59,13 @@ def DFS(maze, start, goal):
     # NOTE: Think sbout what direction you should explore first in the event of multiple options. For the purpose of this assignment, the start 
     #       position is always bottom right and the goal is always top left. Also think about what gets popped first using either stack or recursion.
     
-    frontiers=[start] #child node
-    order=['E','S','W','N']            #order is opposite to pritority because of LIFO nature of stack
-    visited_positions.append(start)    #adding the start node to visited & frontiers list
-    pathtoreverse={}
-
-    while(len(frontiers)!=0):        #if the frontiers list is not empty
-        currentNode=frontiers.pop()  #popping the last element in the frontiers list
-        if currentNode==goal:        #if the goal is found, then break
-            break
-        for direction in order:
-            if maze.maze_map[currentNode][direction]==True:
-                x, y = currentNode  # x=1st coordinate, y=2nd coordinate
-                if direction == 'E':            #traversing in the order opposite to that of priority
-                    childNode = (x, y+1)
-                elif direction == 'S':
-                    childNode = (x+1, y)
-                elif direction == 'W':
-                    childNode = (x, y-1)
-                elif direction == 'N':
-                    childNode = (x-1, y)
-                if childNode not in visited_positions:
-                    visited_positions.append(childNode)
-                    frontiers.append(childNode)
-                    pathtoreverse[childNode]=currentNode
-
-                    
-    path_to_goal = [goal]   
-    tempnode = goal
-
-    while tempnode != start:               # the loop continues to run until the start node hasnt reached
-        tempnode = pathtoreverse[tempnode] #tempnode= descendant retrieved from the pathtoreverse dictionary
-        path_to_goal.append(tempnode)      #append the descendant to the list
-
-    path_to_goal.reverse()                #reverse the list to start from the 'start' node
-    # print(path_to_goal)
-
-    # print(visited_positions)
-    # from pprint import pprint
-    # print(maze.maze_map)
+    grid=grid_of(maze)               #compact wall masks, cells are integer ids
+    #the search itself is streaming.dfs_steps (a stack, directions pushed in the order
+    #opposite to their priority because of its LIFO nature); run it to the end
+    explored,path=collect(dfs_steps(grid, start, goal, chunk_size=None))
+
+    visited_positions = grid.cells(explored)
+    path_to_goal = grid.cells(path)   #the parents followed back from the goal, then reversed
 
     return visited_positions, path_to_goal
 
@@ -101,42 +89,38 @@ def BFS(maze, start, goal):
 
     # TODO: Implement Breadth-First Search (BFS) algorithm here
 
-    frontiers=[start] #child node
-    order=['N','W','S','E']     #order is equal to pritority because of FIFO nature of queue
-    visited_positions.append(start)    #adding the start node to visited & frontiers list
-    pathtoreverse={}
-
-    while(len(frontiers)!=0):        #if the frontiers list is not empty
-        currentNode=frontiers.pop(0)  #popping the first element in the frontiers list
-        if currentNode==goal:        #if the goal is found, then break
-            break
-        for direction in order:
-            if maze.maze_map[currentNode][direction]==True:  #for those whose direction is '1'
-                x, y = currentNode  # x=1st coordinate, y=2nd coordinate
-                if direction == 'N':             #traversing in the order of priority
-                    childNode = (x-1, y)
-                elif direction == 'W':
-                    childNode = (x, y-1)
-                elif direction == 'S':
-                    childNode = (x+1, y)
-                elif direction == 'E':            
-                    childNode = (x, y+1)
-
-                if childNode not in visited_positions:
-                    visited_positions.append(childNode)
-                    frontiers.append(childNode)
-                    pathtoreverse[childNode]=currentNode
-
-                    
-    path_to_goal = [goal]   
-    tempnode = goal
-
-    while tempnode != start:               # the loop continues to run until the start node hasnt reached
-        tempnode = pathtoreverse[tempnode] #tempnode= descendant retrieved from the pathtoreverse dictionary
-        path_to_goal.append(tempnode)      #append the descendant to the list
-
-    path_to_goal.reverse()                #reverse the list to start from the 'start' node
+    grid=grid_of(maze)               #compact wall masks, cells are integer ids
+    #the search itself is streaming.bfs_steps (a FIFO queue, directions in the order
+    #of their priority); run it to the end
+    explored,path=collect(bfs_steps(grid, start, goal, chunk_size=None))
+
+    visited_positions = grid.cells(explored)
+    path_to_goal = grid.cells(path)   #the parents followed back from the goal, then reversed
+
+    return visited_positions, path_to_goal
+
+
+
+
+def WavefrontBFS(maze, start, goal):
+    '''
+    Breadth First Search computed as a whole-maze distance field with NumPy.
+    Every step expands the complete frontier at once (see wavefront.py), so
+    the loop runs once per distance layer instead of once per cell.
+    The inputs and outputs are the same as BFS:
+        a list containing all the positions up to the goal's distance layer, layer by layer
+        a list containing the positions in the final path from the start to the goal
+    The path is a shortest path, but ties between equally short paths may be
+    broken differently than in BFS.
+    '''
+    field = distance_field(maze, start)     #distances + parent directions of every cell from start
+    goalDistance = field.distance(goal)
+
+    if goalDistance < 0:                    #goal is not reachable, report everything that was explored
+        return field.explored(), []
 
+    visited_positions = field.explored(goalDistance)
+    path_to_goal = field.path(goal)
 
     return visited_positions, path_to_goal
 
@@ -160,13 +144,17 @@ def heuristic(position, goal):
         h = math.sqrt((x2 - x1)**2 + (y2 - y1)**2) ##formula applied
     return h
 
-def AStar(maze, start, goal):
+def AStar(maze, start, goal, landmarks=None, heuristic_name=DEFAULT_HEURISTIC):
     '''
     This function should implement the A* algorithm.
     The inputs to this function are:
         maze: The maze object
         start: The start position of the agent as a tuple (x,y)
         goal: The goal position of the agent as a tuple (x,y)
+        landmarks: Optional landmarks.LandmarkTable of this maze. When given, the
+                   heuristic is the larger of the chosen one and the ALT bound
+        heuristic_name: Heuristic from heuristics.HEURISTICS, the Euclidean distance
+                   (the heuristic function above) by default
     The function should return:
         a list containing all the positions visited by the search algorithm
         a list containing the positions in the final path from the start to the goal
@@ -179,74 +167,97 @@ def AStar(maze, start, goal):
     # NOTE: You can assume the cost of moving one step is 1 for this maze
     #       You can use the Euclidean distance as the heuristic function for this assignment
     
-    order=['N','W','S','E']     #order is equal to pritority because of FIFO nature of queue
-    visited_positions.append(start)    #adding the start node to visited & frontiers list
-    pathtoreverse={}
-    
-    #we use dictionaries in a* search to account for values of each node in the maze 
-    gn = {}
-    fn = {}
-
-    for i in range(1, 21):
-        for j in range(1, 21):
-            node = (i, j)
-            gn[node] = float('inf')
-            fn[node] = float('inf')
-            
-    
-    ##for start node
-    gn[start]=0         #gn measures distance from start node, so for start node, its 0
-    fn[start]=0+heuristic(start,goal)    #fn=gn+hn= 0+hn
-    
-    frontiers=PriorityQueue()            #a priority queue used in A* search
-    frontiers.put((fn[start],heuristic(start,goal),start))  #putting the start node in the queue in the form of tuple
-    
-    
-    while not frontiers.empty():                 
-        currentTuple = frontiers.get()
-        currentNode = currentTuple[2]     #extracting the 2nd index from the tuple of priority queue
-
-        if currentNode == goal:
-            break
-
-        for direction in order:
-            if maze.maze_map[currentNode][direction] == True:
-                x, y = currentNode
-                if direction == 'N':
-                    childNode = (x-1, y)
-                elif direction == 'W':
-                    childNode = (x, y-1)
-                elif direction == 'S':
-                    childNode = (x+1, y)
-                elif direction == 'E':
-                    childNode = (x, y+1)
-
-                newgn = gn[currentNode] + 1         #next gn =current cost +1
-                newfn = newgn + heuristic(childNode, goal) #total=fn=gn+hn
-
-                if newfn < fn[childNode]:     # we choose nodes with lower fn (low cost)
-                    gn[childNode] = newgn
-                    fn[childNode] = newfn
-                    frontiers.put((newfn,heuristic(childNode,goal),childNode))  
-                    visited_positions.append(childNode)
-                    pathtoreverse[childNode]=currentNode
-                    
-                    
-                               
-    path_to_goal = [goal]   
-    tempnode = goal
-
-    while tempnode != start:               # the loop continues to run until the start node hasnt reached
-        tempnode = pathtoreverse[tempnode] #tempnode= descendant retrieved from the pathtoreverse dictionary
-        path_to_goal.append(tempnode)      #append the descendant to the list
-
-    path_to_goal.reverse()                #reverse the list to start from the 'start' node
-                    
+    grid=grid_of(maze)               #compact wall masks, cells are integer ids
+
+    # hn of every cell computed once for this goal (the same values as heuristic()
+    # for 'euclidean'), so the search only looks them up by cell id
+    hn=table_heuristic(grid, heuristic_name, grid.cell_id(goal), landmarks)
+
+    # heapq based A* with a closed set (see astar.py). Among nodes with equal fn the
+    # one with the larger gn (i.e. smaller hn) is expanded first, then the smaller (x,y)
+    visited_positions, path_to_goal = astar_search(grid, start, goal, heuristic=hn, order='NWSE', tie_break='max_g')
 
     return visited_positions, path_to_goal
 
 
 
+def BidirectionalBFS(maze, start, goal):
+    '''
+    Breadth First Search run from the start and the goal at the same time until
+    the two searches meet (see bidirectional.py).
+    The inputs and outputs are the same as BFS. The visited positions of both
+    searches are listed together in the order they were found.
+    '''
+    result = bidirectional_bfs(maze, start, goal, order='NWSE')
+    return result.explored, result.path
+
+
+
+
+def BidirectionalAStar(maze, start, goal, heuristic_name=DEFAULT_HEURISTIC):
+    '''
+    A* Search run from the start towards the goal and from the goal towards the
+    start until the best meeting point is proven optimal (see bidirectional.py).
+    Both directions use the same heuristic as AStar, the Euclidean one by default.
+    The inputs and outputs are the same as AStar.
+    '''
+    result = bidirectional_astar(maze, start, goal, heuristic=heuristic_factory(heuristic_name), order='NWSE')
+    return result.explored, result.path
+
+
+
+def JumpPointSearch(maze, start, goal):
+    '''
+    Jump Point Search for mazes where every step costs 1 (see jps.py).
+    Straight corridors are scanned without putting their cells in the priority
+    queue, which pays off on open grids with few walls.
+    The inputs are the same as AStar. The function returns:
+        a list containing the jump points found by the search
+        a list containing every position of the final path from the start to the goal
+    '''
+    return jump_point_search(maze, start, goal)
+
+
+
+def HierarchicalSearch(maze, start, goal, hierarchy=None):
+    '''
+    Shortest path search on the contracted corridor graph of the maze, with a
+    cluster level on top for very large mazes (see hierarchy.py).
+    The inputs are the same as BFS, plus:
+        hierarchy: the result of hierarchy.build_hierarchy(maze). Build it once and
+                   pass it in for repeated queries; it is built here when missing
+    The function returns:
+        a list containing the junction cells settled by the search
+        a list containing every position of the final path from the start to the goal
+    '''
+    if hierarchy is None:
+        hierarchy = build_hierarchy(maze)
+    return hierarchy.query(start, goal)
+
+
+
+def Dijkstra(maze, start, goal):
+    '''
+    Cheapest path search for terrain mazes, where entering a cell costs the value
+    of its cost layer (see terrain.py) instead of 1. The open list is a bucket
+    queue, so the weighted search runs about as fast as BFS on a unit maze.
+    The inputs and outputs are the same as BFS.
+    '''
+    return dijkstra_search(maze, start, goal, order='NWSE')
+
+
+
+def TerrainAStar(maze, start, goal):
+    '''
+    A* Search over the terrain costs, with the Manhattan distance times the cheapest
+    cell cost as the heuristic (see terrain.py).
+    The inputs and outputs are the same as AStar.
+    '''
+    grid=grid_of(maze)
+    return dijkstra_search(grid, start, goal, heuristic=cheapest_manhattan(grid, grid.cell_id(goal)), order='NWSE')
+
+
+
 # DO NOT CHANGE THE LINES OF CODE BELOW
 # -------------------------------------
 # This part of the code calls the search algorithms implemented above and displays the results on the maze
@@ -258,6 +269,8 @@ def main():
 
     args = parser.parse_args()
 
+    from maze_visual import agent
+    m = load_maze()
     start = (ROWS, COLS)
     goal = (1,1)
 
@@ -0,0 +1,181 @@
+"""
+Weighted terrain: Dijkstra and A* with a bucket queue.
+
+A terrain maze gives every cell the cost of entering it, an integer from 1
+to 255 stored next to the wall masks (MazeGrid.costs, one byte per cell,
+loaded from the cost column of a CSV maze or the cost layer of a binary
+maze file). A maze without costs is searched as if every cost were 1.
+
+With small integer costs the priority queue does not need to compare
+anything. Every f value the search can push lies in a window of
+`span` consecutive integers above the one being expanded, so the open list
+is a ring of `span` lists (Dial's bucket queue): pushing appends to the
+list of its f value, popping takes from the current list and moves to the
+next non-empty one. Both are O(1) list operations instead of the O(log n)
+sift of a binary heap, and there is no tuple or tie-break key per entry:
+
+    Dijkstra      span = max cost + 1
+    A*            span = 2 * max cost + 1, for a consistent integer heuristic
+                  that changes by at most the max cost per step (such as
+                  cheapest_manhattan below)
+
+Equal f values are expanded last in, first out, which prefers the deeper
+entry like the 'max_g' tie break of astar.py.
+"""
+
+from array import array
+
+import numpy as np
+
+from maze_core import grid_of
+from search_state import SearchState, collect
+
+
+MAX_COST = 255
+
+
+def costs_of(grid):
+    '''The cost layer of a grid, or all 1s for a maze without terrain'''
+    if grid.costs is not None:
+        return grid.costs
+    return b'\x01' * grid.size
+
+
+def cheapest_manhattan(grid, goal_id):
+    '''
+    Manhattan distance to goal_id times the cheapest cell cost, as a function
+    of a cell id. Every step costs at least that much, so the estimate is
+    admissible and consistent.
+    '''
+    cheapest = int(np.frombuffer(costs_of(grid), dtype=np.uint8).min())
+    cols = grid.cols
+    gx, gy = divmod(goal_id, cols)
+
+    def h(cid):
+        x, y = divmod(cid, cols)
+        return (abs(x - gx) + abs(y - gy)) * cheapest
+    return h
+
+
+def dijkstra_steps(maze, start, goal, heuristic=None, order='NWSE', stats=None, chunk_size=None):
+    '''
+    Generator form of dijkstra_search with the same arguments, following the
+    step protocol of astar.astar_steps.
+    chunk_size--> Yield the ids of newly discovered cells every time that
+                  many have piled up; None yields them all at the end
+    '''
+    grid = grid_of(maze)
+    state = SearchState(grid)
+    walls = grid.walls
+    costs = costs_of(grid)
+    table = grid.expansion_table(order)
+    start_id = grid.cell_id(start)
+    goal_id = grid.cell_id(goal)
+    h = heuristic
+
+    top = int(np.frombuffer(costs, dtype=np.uint8).max())
+    span = 2 * top + 1 if h else top + 1
+    buckets = [[] for _ in range(span)]
+
+    g = array('l', [-1]) * grid.size       # best known cost, -1 = not seen
+    f = array('l', [-1]) * grid.size       # f of the live queue entry of a cell
+    closed = bytearray((grid.size + 7) >> 3)
+
+    g[start_id] = 0
+    f[start_id] = current_f = h(start_id) if h else 0
+    buckets[current_f % span].append(start_id)
+    state.visit(start_id)
+    queued = 1
+    expanded = pushed = stale = 0
+    sent, flush_at = 0, chunk_size
+
+    while queued:
+        bucket = buckets[current_f % span]
+        while not bucket:
+            current_f += 1
+            bucket = buckets[current_f % span]
+        current = bucket.pop()
+        queued -= 1
+        if closed[current >> 3] >> (current & 7) & 1 or f[current] != current_f:
+            stale += 1          # superseded by a cheaper entry, or already expanded
+            continue
+        if current == goal_id:
+            break
+        closed[current >> 3] |= 1 << (current & 7)
+        expanded += 1
+
+        cost = g[current]
+        for offset in table[walls[current]]:
+            child = current + offset
+            if closed[child >> 3] >> (child & 7) & 1:
+                continue
+            new_cost = cost + costs[child]
+            old_cost = g[child]
+            if old_cost < 0 or new_cost < old_cost:
+                g[child] = new_cost
+                if old_cost < 0:
+                    state.visit(child, current)
+                else:
+                    state.set_parent(child, current)
+                new_f = new_cost + h(child) if h else new_cost
+                if not current_f <= new_f < current_f + span:
+                    raise ValueError('the heuristic must be consistent and change by '
+                                     f'at most {top} per step')
+                f[child] = new_f
+                buckets[new_f % span].append(child)
+                queued += 1
+                pushed += 1
+
+        if chunk_size and len(state.order) >= flush_at:
+            yield state.order[sent:]
+            sent = len(state.order)
+            flush_at = sent + chunk_size
+
+    if stats is not None:
+        stats.update(expanded=expanded, pushed=pushed, stale=stale,
+                     cost=g[goal_id] if g[goal_id] >= 0 else None)
+
+    yield state.order[sent:]
+    return state.path_ids(start_id, goal_id)
+
+
+def dijkstra_search(maze, start, goal, heuristic=None, order='NWSE', stats=None):
+    '''
+    Cheapest path from start to goal over the cell costs of the maze.
+    maze-->      A MazeGrid or anything maze_core.grid_of accepts
+    start, goal--> (x, y) cells
+    heuristic--> None for Dijkstra, or a callable cell id -> integer estimate
+                 for A*; it must be consistent and change by at most the
+                 largest cell cost per step (see cheapest_manhattan)
+    order-->     Order in which the directions of a cell are expanded
+    stats-->     Optional dict that receives expanded/pushed/stale counters and
+                 the cost of the path (None if the goal is unreachable)
+    Returns the explored cells (in discovery order) and the path, both as
+    lists of (x, y) tuples. The path is empty if the goal is unreachable.
+    '''
+    grid = grid_of(maze)
+    explored, path = collect(dijkstra_steps(grid, start, goal, heuristic, order, stats))
+    return grid.cells(explored), grid.cells(path)
+
+
+def path_cost(maze, path):
+    '''Total cost of a path of (x, y) cells: every cell after the first is entered once'''
+    grid = grid_of(maze)
+    costs = costs_of(grid)
+    return sum(costs[grid.cell_id(cell)] for cell in path[1:])
+
+
+def random_terrain(maze, max_cost=9, patch=8, seed=None):
+    '''
+    Give a maze a random cost layer of patches of patch x patch cells, each
+    with a cost from 1 to max_cost, e.g. to try the weighted searches.
+    '''
+    grid = grid_of(maze)
+    if not 1 <= max_cost <= MAX_COST:
+        raise ValueError(f'cell costs range from 1 to {MAX_COST}, got {max_cost}')
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(1, max_cost + 1, size=(-(-grid.rows // patch), -(-grid.cols // patch)),
+                          dtype=np.uint8)
+    costs = np.repeat(np.repeat(coarse, patch, axis=0), patch, axis=1)[:grid.rows, :grid.cols]
+    grid.costs = bytearray(np.ascontiguousarray(costs).tobytes())
+    return grid
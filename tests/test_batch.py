@@ -0,0 +1,19 @@
+from batch import BatchRunner
+from mazegen import generate
+from task1 import Dijkstra
+from terrain import dijkstra_search, path_cost, random_terrain
+
+
+def test_pooled_terrain_batch_uses_the_costs():
+    grid = random_terrain(generate(30, 30, seed=4, braid_factor=0.5), seed=4)
+    queries = [((30, 30), (1, 1)), ((1, 30), (30, 1)), ((15, 1), (1, 15)), ((30, 15), (15, 30))]
+    runner = BatchRunner({'dijkstra': Dijkstra}, workers=2, chunk_size=1)
+    try:
+        results = runner.run(grid, queries, ['dijkstra'], include_paths=True)
+        assert runner._pool is not None   # the queries ran in the workers
+    finally:
+        runner._reset()
+    for (start, goal), result in zip(queries, results):
+        _, expected = dijkstra_search(grid, start, goal)
+        path = [tuple(cell) for cell in result['path']]
+        assert path_cost(grid, path) == path_cost(grid, expected)
@@ -0,0 +1,26 @@
+from bidirectional import bidirectional_astar, bidirectional_bfs
+from heuristics import heuristic_factory
+from mazegen import generate
+
+
+def check(result, path_length):
+    assert len(result.path) == path_length
+    assert len(set(result.explored)) == len(result.explored) == len(result.from_goal)
+    assert result.forward_count + result.backward_count >= len(result.explored)
+
+
+def test_explored_cells_are_listed_once():
+    grid = generate(20, 20, seed=5, braid_factor=0.5)
+    shortest = len(bidirectional_bfs(grid, (20, 20), (1, 1)).path)
+    check(bidirectional_bfs(grid, (20, 20), (1, 1)), shortest)
+    for name in ('euclidean', 'manhattan', 'zero'):
+        result = bidirectional_astar(grid, (20, 20), (1, 1), heuristic=heuristic_factory(name))
+        check(result, shortest)
+        assert len(result.explored) <= grid.size
+
+
+def test_same_start_and_goal():
+    grid = generate(5, 5, seed=1)
+    result = bidirectional_astar(grid, (3, 3), (3, 3))
+    assert result.explored == [(3, 3)] and result.path == [(3, 3)]
+    assert (result.forward_count, result.backward_count) == (1, 0)
@@ -0,0 +1,39 @@
+import numpy as np
+
+import heuristics
+import landmarks
+from heuristics import heuristic_table, landmarks_for, register_maze_file
+from landmarks import landmark_path
+from mazegen import generate
+
+
+def test_alt_landmarks_are_saved_next_to_the_maze_file(tmp_path, monkeypatch):
+    grid = generate(12, 12, seed=2, braid_factor=0.3)
+    maze_path = str(tmp_path / 'maze.csv')
+    grid.to_csv(maze_path)
+    register_maze_file(grid, maze_path)
+    heuristics._landmarks.clear()
+
+    table = landmarks_for(grid)
+    assert table.matches(grid)
+    saved = landmark_path(maze_path)
+    assert landmarks.LandmarkTable.load(saved).landmarks == table.landmarks
+
+    # a new process reads the saved tables instead of building them again
+    heuristics._landmarks.clear()
+    def build(*args, **kwargs):
+        raise AssertionError('landmarks built again')
+    monkeypatch.setattr(landmarks.LandmarkTable, 'build', build)
+    goal_id = grid.cell_id((1, 1))
+    assert np.array_equal(heuristic_table(grid, 'alt', goal_id), table.heuristic_table(
+        goal_id, base=heuristic_table(grid, 'manhattan', goal_id)))
+
+
+def test_edited_maze_is_not_saved(tmp_path):
+    grid = generate(8, 8, seed=3)
+    maze_path = str(tmp_path / 'maze.csv')
+    register_maze_file(grid, maze_path)
+    grid.set_open((4, 4), 'E', not grid.is_open((4, 4), 'E'))
+    heuristics._landmarks.clear()
+    assert landmarks_for(grid).matches(grid)
+    assert not (tmp_path / 'maze.csv.alt.npz').exists()
@@ -0,0 +1,51 @@
+from maze_core import grid_of
+from mazegen import generate
+from multiagent import plan_agents, plan_request
+
+
+def assert_collision_free(grid, agents, result):
+    steps = max(len(path) for path in result.paths)
+
+    def at(path, t):
+        return path[min(t, len(path) - 1)]
+
+    for (start, goal), path in zip(agents, result.paths):
+        assert path[0] == start and path[-1] == goal
+        for a, b in zip(path, path[1:]):
+            assert a == b or grid.cell_id(b) in grid.neighbors(grid.cell_id(a))
+    for t in range(steps):
+        cells = [at(path, t) for path in result.paths]
+        assert len(set(cells)) == len(cells)
+        if t:
+            moves = {(at(path, t - 1), at(path, t)) for path in result.paths}
+            assert not any((b, a) in moves for a, b in moves if a != b)
+    assert result.cost == sum(len(path) - 1 for path in result.paths)
+
+
+# 9x7 Kruskal maze on which the focal list of ECBS used to run empty
+AGENTS = [((1, 6), (1, 6)), ((7, 7), (5, 7)), ((1, 4), (3, 7))]
+
+
+def maze():
+    return grid_of(generate(9, 7, 'kruskal', seed=611720, braid_factor=0.5))
+
+
+def test_cbs_is_optimal():
+    grid = maze()
+    result = plan_agents(grid, AGENTS)
+    assert_collision_free(grid, AGENTS, result)
+    assert result.cost == 10
+
+
+def test_ecbs_stays_within_the_bound():
+    grid = maze()
+    result = plan_agents(grid, AGENTS, 1.1, time_limit=5)
+    assert_collision_free(grid, AGENTS, result)
+    assert result.cost <= 1.1 * 10
+
+
+def test_plan_request_ecbs():
+    body = {'agents': [[list(start), list(goal)] for start, goal in AGENTS], 'suboptimality': 1.1}
+    response = plan_request(maze(), body, time_limit=5)
+    assert 'error' not in response
+    assert response['cost'] <= 11
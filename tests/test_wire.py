@@ -0,0 +1,29 @@
+from bidirectional import bidirectional_bfs
+from mazegen import generate
+from task1 import BFS
+from wire import decode_result, encode_result
+
+
+def round_trip(grid, explored, path, algorithm):
+    result = decode_result(encode_result(grid, explored, path, algorithm))
+    assert result['explored'] == [list(cell) for cell in explored]
+    assert result['path'] == [list(cell) for cell in path]
+    return result
+
+
+def test_round_trip_bfs():
+    grid = generate(18, 21, 'kruskal', seed=9, braid_factor=0.3)
+    explored, path = BFS(grid, (18, 21), (1, 1))
+    round_trip(grid, explored, path, 'bfs')
+
+
+def test_round_trip_single_cell():
+    grid = generate(5, 5, seed=1)
+    round_trip(grid, [(1, 1)], [(1, 1)], 'bfs')
+
+
+def test_round_trip_repeated_cell():
+    # a cell listed twice, as a meeting cell explored from both sides
+    grid = generate(18, 21, 'kruskal', seed=9, braid_factor=0.3)
+    result = bidirectional_bfs(grid, (6, 20), (6, 21))
+    round_trip(grid, result.explored + result.path[-1:], result.path, 'bidirectional_bfs')
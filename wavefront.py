@@ -0,0 +1,142 @@
+"""
+Vectorized wavefront BFS over the compact maze grid.
+
+`distance_field` expands the whole BFS frontier at once with NumPy: for every
+direction the frontier ids whose wall mask has that bit open are shifted by
+the direction's id offset, and the children that are still unreached become
+the next layer. The Python loop therefore runs once per distance layer
+(O(diameter)) instead of once per cell, and every layer costs O(frontier)
+NumPy work, so the whole field is O(V) array operations in total.
+
+The result is a DistanceField: the distance of every cell from the source
+and the direction back to each cell's parent, from which any path out of
+the source, or the explored order up to a given distance, can be read off
+without searching again.
+"""
+
+import numpy as np
+
+from maze_core import grid_of, E, W, N, S
+
+
+# Parent direction codes are the ones SearchState uses, indexing the id
+# offset that leads from a cell back to its parent: E, W, N, S.
+def _parent_offsets(cols):
+    return np.array([1, -1, -cols, cols], dtype=np.int64)
+
+
+class DistanceField:
+    '''
+    BFS distances and parent directions of every cell from one source cell.
+    dist-->   int32 array of distances by cell id (-1 where unreachable)
+    parent--> int8 array of parent direction codes by cell id (-1 for the
+              source and unreachable cells)
+    '''
+
+    def __init__(self, grid, source_id, dist, parent):
+        self.grid = grid
+        self.source_id = source_id
+        self.dist = dist
+        self.parent = parent
+        self._offsets = _parent_offsets(grid.cols).tolist()
+
+    @property
+    def source(self):
+        return self.grid.cell(self.source_id)
+
+    def distance(self, cell):
+        '''Number of steps from the source to cell, or -1 if unreachable'''
+        return int(self.dist[self.grid.cell_id(cell)])
+
+    def path_ids(self, target_id):
+        '''Ids from the source to target_id, or an empty list if unreachable'''
+        path = self.route_ids(target_id)
+        path.reverse()
+        return path
+
+    def route_ids(self, start_id):
+        '''
+        Ids from start_id back to the source by following the parents. Rooted
+        at a goal (with symmetric walls) the parents are next hops, so this
+        is a shortest start -> goal path in O(path length).
+        '''
+        if self.dist[start_id] < 0:
+            return []
+        parent, offsets = self.parent, self._offsets
+        route = [start_id]
+        cid = start_id
+        while cid != self.source_id:
+            cid += offsets[parent[cid]]
+            route.append(cid)
+        return route
+
+    @property
+    def nbytes(self):
+        return self.dist.nbytes + self.parent.nbytes
+
+    def path(self, cell):
+        '''Shortest path from the source to cell as (x, y) tuples'''
+        return self.grid.cells(self.path_ids(self.grid.cell_id(cell)))
+
+    def explored_ids(self, max_dist=None):
+        '''
+        Reached cell ids ordered by distance layer (and by id inside a layer),
+        optionally stopping after the layer max_dist.
+        '''
+        dist = self.dist
+        reached = dist >= 0 if max_dist is None else (dist >= 0) & (dist <= max_dist)
+        ids = np.flatnonzero(reached)
+        return ids[np.argsort(dist[ids], kind='stable')]
+
+    def explored(self, max_dist=None):
+        return self.grid.cells(self.explored_ids(max_dist).tolist())
+
+    def as_grids(self):
+        '''The distance and parent arrays reshaped to (rows, cols)'''
+        shape = (self.grid.rows, self.grid.cols)
+        return self.dist.reshape(shape), self.parent.reshape(shape)
+
+
+def distance_field(maze, source, order='NWSE'):
+    '''
+    Compute the BFS distance field of a maze from a source cell.
+    maze-->   A MazeGrid or anything maze_core.grid_of accepts
+    source--> The (x, y) cell to grow the wavefront from
+    order-->  Direction priority used when two parents reach a cell in the
+              same layer (the first direction in order wins)
+    '''
+    grid = grid_of(maze)
+    cols = grid.cols
+    walls = np.frombuffer(grid.walls, dtype=np.uint8)
+    dist = np.full(grid.size, -1, dtype=np.int32)
+    parent = np.full(grid.size, -1, dtype=np.int8)
+
+    # (wall bit, id offset of the move, parent code stored in the child)
+    moves = {
+        'E': (E, 1, 1),
+        'W': (W, -1, 0),
+        'N': (N, -cols, 3),
+        'S': (S, cols, 2),
+    }
+    moves = [moves[d] for d in order]
+
+    source_id = grid.cell_id(source)
+    dist[source_id] = 0
+    frontier = np.array([source_id], dtype=np.int64)
+    layer = 0
+    while frontier.size:
+        layer += 1
+        masks = walls[frontier]
+        reached = []
+        for bit, offset, code in moves:
+            children = frontier[(masks & bit) != 0] + offset
+            # children claimed by an earlier direction of this layer already
+            # have their distance set, so the first direction in order wins
+            children = children[dist[children] < 0]
+            dist[children] = layer
+            parent[children] = code
+            reached.append(children)
+        frontier = np.concatenate(reached)
+        frontier.sort()
+
+    return DistanceField(grid, source_id, dist, parent)
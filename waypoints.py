@@ -0,0 +1,226 @@
+"""
+Routes that visit several waypoints on the way to a goal.
+
+A route from start through every waypoint (in any order) to the goal is
+an open travelling salesman tour with fixed ends. It is planned in three
+steps:
+
+    distances  one BFS distance field per waypoint and one for the goal,
+               taken from a FieldCache (see field_cache.py), so a maze that
+               has already been asked about reuses them. The field of a
+               point gives the distance from every other point to it, which
+               fills one column of the distance matrix.
+    order      exact Held-Karp dynamic programming over subsets for up to
+               HELD_KARP_MAX waypoints, vectorized with NumPy one subset
+               size at a time. For more waypoints, a nearest neighbour
+               tour improved by 2-opt and Or-opt moves until none helps.
+    path       the legs are read off the cached fields by following next
+               hops (DistanceField.route_ids) and stitched together.
+
+The distances are BFS step counts, so terrain costs are not taken into
+account.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from maze_core import grid_of
+from field_cache import FieldCache
+
+
+# Held-Karp keeps 2**n * n distances and time grows alike: 4 MB and about
+# 50 ms at 15 waypoints
+HELD_KARP_MAX = 15
+
+# order-->  the waypoints as (x, y) cells in the order they are visited
+# path-->   every cell of the route from start to goal
+# length--> number of steps of the route
+# method--> 'held_karp' (optimal order) or 'two_opt' (local optimum)
+WaypointRoute = namedtuple('WaypointRoute', 'order path length method')
+
+
+def distance_matrix(maze, points, fields):
+    '''
+    Steps from every point to every point, as an int64 matrix (-1 where
+    unreachable): row i holds the distances from points[i].
+    points--> (x, y) cells
+    fields--> Distance fields rooted at the points, one per point; None for
+              a point no route ends at (its column is left -1)
+    '''
+    grid = grid_of(maze)
+    ids = np.array([grid.cell_id(point) for point in points], dtype=np.int64)
+    matrix = np.full((len(points), len(points)), -1, dtype=np.int64)
+    for j, computed in enumerate(fields):
+        if computed is not None:
+            matrix[:, j] = computed.dist[ids]
+    return matrix
+
+
+def held_karp(matrix):
+    '''
+    Optimal visiting order of the waypoints 1..n of an (n+2) x (n+2) distance
+    matrix whose first point is the start and last point the goal. Returns
+    (order as a list of matrix indices, length).
+    '''
+    n = len(matrix) - 2
+    if n == 0:
+        return [], int(matrix[0, 1])
+    between = matrix[1:-1, 1:-1]
+    full = (1 << n) - 1
+    # best[mask, j]: shortest way from the start through the waypoints of mask, ending at j
+    best = np.full((1 << n, n), np.iinfo(np.int64).max // 4, dtype=np.int64)
+    came = np.zeros((1 << n, n), dtype=np.int8)
+    bits = 1 << np.arange(n)
+    best[bits, np.arange(n)] = matrix[0, 1:-1]
+
+    masks = np.arange(1 << n)
+    sizes = np.zeros(1 << n, dtype=np.int64)
+    for j in range(n):
+        sizes += (masks >> j) & 1
+    for size in range(2, n + 1):
+        layer = masks[sizes == size]
+        for j in range(n):
+            ending = layer[(layer & bits[j]) != 0]
+            candidates = best[ending ^ bits[j]] + between[:, j]
+            came[ending, j] = previous = candidates.argmin(axis=1)
+            best[ending, j] = candidates[np.arange(len(ending)), previous]
+
+    totals = best[full] + matrix[1:-1, -1]
+    last = int(totals.argmin())
+    length = int(totals[last])
+    order, mask = [], full
+    for _ in range(n):
+        order.append(last + 1)
+        mask, last = mask ^ (1 << last), int(came[mask, last])
+    order.reverse()
+    return order, length
+
+
+def _tour_length(matrix, tour):
+    return sum(matrix[a][b] for a, b in zip(tour, tour[1:]))
+
+
+def two_opt(matrix):
+    '''
+    Visiting order of the waypoints of the distance matrix (laid out as for
+    held_karp) from a nearest neighbour tour, improved by 2-opt (reverse a
+    stretch) and Or-opt (move a run of 1 to 3 waypoints elsewhere) until no
+    move shortens it. The distances must be symmetric.
+    Returns (order, length).
+    '''
+    matrix = matrix.tolist()
+    goal = len(matrix) - 1
+    left = set(range(1, goal))
+    tour = [0]
+    while left:
+        row = matrix[tour[-1]]
+        nearest = min(left, key=row.__getitem__)
+        left.remove(nearest)
+        tour.append(nearest)
+    tour.append(goal)
+
+    improved = True
+    while improved:
+        improved = False
+        # 2-opt: reverse tour[i:j+1]; the ends of the tour stay in place
+        for i in range(1, len(tour) - 2):
+            a, b = tour[i - 1], tour[i]
+            for j in range(i + 1, len(tour) - 1):
+                c, d = tour[j], tour[j + 1]
+                if matrix[a][c] + matrix[b][d] < matrix[a][b] + matrix[c][d]:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    a, b = tour[i - 1], tour[i]
+                    improved = True
+        # Or-opt: move tour[i:i+run] between two other neighbours
+        for run in (1, 2, 3):
+            i = 1
+            while i + run < len(tour):
+                before, first, last, after = tour[i - 1], tour[i], tour[i + run - 1], tour[i + run]
+                removed = matrix[before][first] + matrix[last][after] - matrix[before][after]
+                rest = tour[:i] + tour[i + run:]
+                moved = tour[i:i + run]
+                best_gain, best_at, best_reversed = 0, None, False
+                for k in range(len(rest) - 1):
+                    p, q = rest[k], rest[k + 1]
+                    forward = matrix[p][first] + matrix[last][q] - matrix[p][q]
+                    backward = matrix[p][last] + matrix[first][q] - matrix[p][q]
+                    for added, flipped in ((forward, False), (backward, True)):
+                        if removed - added > best_gain:
+                            best_gain, best_at, best_reversed = removed - added, k + 1, flipped
+                if best_at is not None:
+                    if best_reversed:
+                        moved.reverse()
+                    tour = rest[:best_at] + moved + rest[best_at:]
+                    improved = True
+                i += 1
+    return tour[1:-1], _tour_length(matrix, tour)
+
+
+def plan_route(maze, start, waypoints, goal=(1, 1), fields=None, fingerprint=None):
+    '''
+    Shortest route found from start through all waypoints to goal.
+    maze-->        A MazeGrid or anything maze_core.grid_of accepts
+    start, goal--> (x, y) cells
+    waypoints-->   (x, y) cells to visit, in any order
+    fields-->      FieldCache to take the distance fields from (a new one
+                   if None, which caches nothing between calls)
+    fingerprint--> MazeGrid.fingerprint() of maze, if the caller keeps it
+    Returns a WaypointRoute. Raises ValueError if a cell is outside the maze
+    or a waypoint or the goal cannot be reached.
+    '''
+    grid = grid_of(maze)
+    points = [tuple(start)] + [tuple(point) for point in waypoints] + [tuple(goal)]
+    if any(not (1 <= x <= grid.rows and 1 <= y <= grid.cols) for x, y in points):
+        raise ValueError('waypoint outside the maze')
+    if fields is None:
+        fields = FieldCache()
+    fingerprint = fingerprint or grid.fingerprint()
+
+    # every point but the start is the end of some leg
+    rooted = [None] + [fields.field(grid, point, fingerprint) for point in points[1:]]
+    matrix = distance_matrix(grid, points, rooted)
+    unreachable = np.flatnonzero((matrix[:-1, 1:] < 0).any(axis=0))
+    if unreachable.size:
+        raise ValueError(f'{points[int(unreachable[0]) + 1]} cannot be reached')
+
+    if len(waypoints) <= HELD_KARP_MAX:
+        order, length = held_karp(matrix)
+        method = 'held_karp'
+    else:
+        order, length = two_opt(matrix)
+        method = 'two_opt'
+
+    tour = [0] + order + [len(points) - 1]
+    path_ids = [grid.cell_id(points[0])]
+    for a, b in zip(tour, tour[1:]):
+        path_ids.extend(rooted[b].route_ids(grid.cell_id(points[a]))[1:])
+    return WaypointRoute([points[i] for i in order], grid.cells(path_ids), length, method)
+
+
+def route_request(maze, data, fields=None, fingerprint=None):
+    '''
+    JSON-ready result of a waypoint request body:
+    {"start": [x, y], "waypoints": [[x, y], ...], "goal": [x, y]}, where the
+    start defaults to the bottom-right cell of the maze and the goal to (1, 1).
+    fields, fingerprint--> As in plan_route
+    '''
+    grid = grid_of(maze)
+    try:
+        start = tuple(int(v) for v in data.get('start', [grid.rows, grid.cols]))
+        goal = tuple(int(v) for v in data.get('goal', [1, 1]))
+        waypoints = [tuple(int(v) for v in point) for point in data.get('waypoints', [])]
+        started = time.perf_counter()
+        route = plan_route(maze, start, waypoints, goal, fields, fingerprint)
+    except (TypeError, ValueError) as error:
+        return {'error': f'Invalid waypoints: {error}'}
+    return {
+        'order': [[x, y] for x, y in route.order],
+        'path': [[x, y] for x, y in route.path],
+        'path_length': len(route.path),
+        'distance': route.length,
+        'waypoint_count': len(waypoints),
+        'method': route.method,
+        'execution_time': round(time.perf_counter() - started, 4)
+    }